@@ -334,6 +334,7 @@ def binary_upload_options():
     return response, 204
 
 @app.route("/status")
+@app.route("/api/status")
 def status():
     """API status endpoint"""
     status_info = {
@@ -341,6 +342,13 @@ def status():
         "database": "connected"
     }
     
+    # Add the circuit breaker state of the AI providers
+    try:
+        from utils.ai_resilience import get_circuit_breaker_stats
+        status_info["ai_providers"] = get_circuit_breaker_stats()
+    except Exception as e:
+        logger.warning(f"Could not retrieve AI provider health: {str(e)}")
+    
     # Add basic database health information if possible
     try:
         # Check if database is available
@@ -11,8 +11,36 @@ async def initialize():
     """Initialize the automation system"""
     logger.info("Initializing automation system")
     
-    # To be implemented
-    pass
+    # Importing the connectors registers their webhook and spool handlers
+    from automation.platforms import facebook, instagram, whatsapp
+    from automation.workflows.message_processing import (
+        initialize_workflows, resume_interrupted_messages, start_spool_workers
+    )
+    
+    initialize_workflows()
+    
+    # Finish messages interrupted by the last shutdown (no-op without a checkpoint store)
+    await resume_interrupted_messages()
+    
+    # Drain webhook events spooled before a restart (no-op unless spooling is enabled)
+    await start_spool_workers()
+
+async def shutdown():
+    """Shut down the automation system, e.g. before the worker exits"""
+    logger.info("Shutting down automation system")
+    
+    from automation.platforms import facebook, instagram, whatsapp
+    from automation.platforms.outbound import outbound_sender
+    from automation.workflows.message_processing import stop_spool_workers
+    
+    # Events being processed are redelivered from the spool after the restart
+    await stop_spool_workers()
+    
+    for platform in (facebook, instagram, whatsapp):
+        await platform.connector.close()
+        
+    # Send the replies already queued, then release the pooled session and workers
+    await outbound_sender.close()
 
 def initialize_sync():
     """Synchronous version of initialize for non-async contexts"""
@@ -12,7 +12,10 @@ import time
 from typing import Dict, List, Any, Optional, Tuple, Union
 import base64
 
-from utils.ai_client import AIClient
+from utils.ai_client import AIClient, CompletionStream
+from automation.core.workflow_engine import WorkflowStep
+from automation.core.message_processor import ensure_message
+from automation.ai.routing import response_router
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -55,14 +58,18 @@ class ResponseGenerator:
             # Format system message based on requirements
             system_message = self._get_system_message(format_json)
             
+            # Keep the prompt within the model's token budget
+            assembled = self.ai_client.assemble_prompt(system_message, prompt, conversation_history)
+            
             # Send request to AI client
             response = self.ai_client.send_chat_request(
-                system_message=system_message,
-                user_message=prompt,
-                conversation_history=conversation_history,
+                system_message=assembled.system_message,
+                user_message=assembled.user_message,
+                conversation_history=assembled.conversation_history,
                 max_tokens=max_tokens,
                 temperature=temperature,
-                json_format=format_json
+                json_format=format_json,
+                user_id=user_id
             )
             
             # Calculate metrics
@@ -104,6 +111,35 @@ class ResponseGenerator:
                 'success': False
             }
     
+    def stream_response(self,
+                        prompt: str,
+                        conversation_history: Optional[List[Dict[str, str]]] = None,
+                        max_tokens: int = 1000,
+                        temperature: float = 0.7,
+                        user_id: Optional[str] = None) -> CompletionStream:
+        """
+        Stream an AI response as it is generated
+        
+        Args:
+            prompt: User prompt/query
+            conversation_history: Previous conversation context
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            user_id: User ID for tracking
+            
+        Returns:
+            Async iterator of text deltas; its content holds the full text once finished
+        """
+        assembled = self.ai_client.assemble_prompt(self._get_system_message(), prompt, conversation_history)
+        return self.ai_client.stream_chat_request(
+            system_message=assembled.system_message,
+            user_message=assembled.user_message,
+            conversation_history=assembled.conversation_history,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            user_id=user_id
+        )
+        
     def generate_conversation_summary(self, conversation: List[Dict[str, str]]) -> str:
         """
         Generate a summary of a conversation
@@ -404,4 +440,48 @@ class ResponseGenerator:
             """
 
 # Create singleton instance
-response_generator = ResponseGenerator()
\ No newline at end of file
+response_generator = ResponseGenerator()
+
+# Messages the router does not answer locally go to the generator's client
+response_router.ai_client = response_generator.ai_client
+
+# Workflow step for response generation
+async def generate_response_step(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Workflow step for generating a response to a processed message
+    
+    Args:
+        context: Workflow context with the processed message and retrieved knowledge
+        
+    Returns:
+        Context with the generated response
+    """
+    message = ensure_message(context['message'])
+    
+    if not message or not message.content:
+        return {'response': None}
+        
+    # Answer greetings, help and similar intents without calling the model;
+    # the router records the latency of both routes
+    response = await response_router.generate_response(
+        message=message.content,
+        conversation_history=context.get('conversation_history'),
+        user_id=context.get('user_id'),
+        enhance_with_knowledge=False,
+        platform=message.platform,
+        knowledge_items=context.get('knowledge') or []
+    )
+    
+    return {
+        'response': response
+    }
+
+
+# Create workflow step
+generate_response_workflow_step = WorkflowStep(
+    name="generate_response",
+    handler=generate_response_step,
+    required_inputs=["message"],
+    optional_inputs=["knowledge", "conversation_history", "user_id"],
+    output_keys=["response"]
+)
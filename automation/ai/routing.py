@@ -0,0 +1,300 @@
+"""
+Response Routing for Dana AI
+
+Greetings, farewells and help requests do not need a language model. This
+module puts a routing layer in front of AIClient.generate_response that first
+matches the message against the rules-based intents and answers locally when
+the match confidence reaches the tenant's threshold, so those messages skip
+the model call. Every decision is recorded so the thresholds can be tuned
+from real traffic.
+
+Local answers are off unless ai.local_routing is set. Only built-in intents
+with fixed templates are answered locally (the 'status' templates report
+made-up counts to the business owner and must never reach a customer);
+a tenant's own intents are always allowed.
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Deque, Sequence, Tuple
+
+from automation.core.config import get_config
+from automation.core.tracing import DEFAULT_LATENCY_BUCKETS_MS, LatencyHistogram
+from automation.ai.rules_based_generator import INTENTS, Intent, IntentMatch, build_response_context, get_intent_matcher
+
+logger = logging.getLogger(__name__)
+
+# Minimum intent confidence for a local answer
+DEFAULT_ROUTING_THRESHOLD = 0.6
+
+# Built-in intents whose templates are fit to send to a customer
+DEFAULT_LOCAL_INTENTS = ('greeting', 'farewell', 'help')
+
+# Local answers take well under a millisecond, so add finer buckets
+ROUTING_LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5) + DEFAULT_LATENCY_BUCKETS_MS
+
+
+class RoutingDecision:
+    """
+    Where a message was routed and why
+    """
+
+    __slots__ = ('route', 'tenant_id', 'intent', 'confidence', 'threshold', 'timestamp')
+
+    def __init__(self, route: str, tenant_id: Optional[str], intent: Optional[str],
+                 confidence: float, threshold: float):
+        self.route = route
+        self.tenant_id = tenant_id
+        self.intent = intent
+        self.confidence = confidence
+        self.threshold = threshold
+        self.timestamp = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'route': self.route,
+            'tenant_id': self.tenant_id,
+            'intent': self.intent,
+            'confidence': self.confidence,
+            'threshold': self.threshold,
+            'timestamp': self.timestamp
+        }
+
+
+class ResponseRouter:
+    """
+    Routes messages to a local rules-based answer or to the AI client
+    """
+
+    def __init__(self,
+                 ai_client=None,
+                 default_threshold: float = DEFAULT_ROUTING_THRESHOLD,
+                 tenant_thresholds: Optional[Dict[str, float]] = None,
+                 enabled: bool = False,
+                 max_decisions: int = 1000,
+                 allowed_intents: Sequence[str] = DEFAULT_LOCAL_INTENTS):
+        """
+        Initialize the router
+
+        Args:
+            ai_client: AIClient used for messages that are not answered locally
+                (created on first use if not given)
+            default_threshold: Minimum intent confidence for a local answer
+            tenant_thresholds: Thresholds overriding the default per tenant
+            enabled: Whether local answers are allowed at all
+            max_decisions: Number of recent decisions kept for inspection
+            allowed_intents: Built-in intents that may be answered locally
+        """
+        self._ai_client = ai_client
+        self.default_threshold = self._validate_threshold(default_threshold)
+        self.tenant_thresholds: Dict[str, float] = {}
+        for tenant_id, threshold in (tenant_thresholds or {}).items():
+            self.set_tenant_threshold(tenant_id, threshold)
+        self.enabled = enabled
+        self.allowed_intents = frozenset(allowed_intents)
+
+        self.decisions: Deque[RoutingDecision] = deque(maxlen=max_decisions)
+        self.counts = {'local': 0, 'llm': 0}
+        self.local_intents: Dict[str, int] = {}
+        # Messages that matched an intent but fell short of the threshold
+        self.below_threshold: Dict[str, int] = {}
+        bounds_ns = [int(bound * 1e6) for bound in ROUTING_LATENCY_BUCKETS_MS]
+        self.latency = {'local': LatencyHistogram(bounds_ns), 'llm': LatencyHistogram(bounds_ns)}
+
+    @staticmethod
+    def _validate_threshold(threshold: float) -> float:
+        # Thresholds above 1 are allowed and turn local answers off
+        if threshold < 0:
+            raise ValueError("threshold must not be negative")
+        return float(threshold)
+
+    @property
+    def ai_client(self):
+        """AI client used for the model path"""
+        if self._ai_client is None:
+            from utils.ai_client import AIClient
+            self._ai_client = AIClient()
+        return self._ai_client
+
+    @ai_client.setter
+    def ai_client(self, ai_client):
+        self._ai_client = ai_client
+
+    def set_tenant_threshold(self, tenant_id: str, threshold: Optional[float]):
+        """
+        Set the minimum intent confidence for local answers to a tenant
+
+        Args:
+            tenant_id: Tenant (user) ID
+            threshold: Confidence between 0 and 1 (above 1 disables local
+                answers), or None to use the default again
+        """
+        if threshold is None:
+            self.tenant_thresholds.pop(tenant_id, None)
+        else:
+            self.tenant_thresholds[tenant_id] = self._validate_threshold(threshold)
+
+    def is_allowed(self, intent: Intent) -> bool:
+        """
+        Check whether an intent may be answered locally
+
+        Args:
+            intent: Matched intent
+
+        Returns:
+            True for allowed built-in intents and for tenant intents
+        """
+        return intent.name in self.allowed_intents or not any(intent is builtin for builtin in INTENTS)
+
+    def get_threshold(self, tenant_id: Optional[str] = None) -> float:
+        """
+        Get the threshold applying to a tenant
+
+        Args:
+            tenant_id: Tenant (user) ID
+
+        Returns:
+            The tenant's threshold, or the default
+        """
+        if tenant_id is not None:
+            return self.tenant_thresholds.get(tenant_id, self.default_threshold)
+        return self.default_threshold
+
+    def route(self, text: str, tenant_id: Optional[str] = None) -> Tuple[RoutingDecision, Optional[IntentMatch]]:
+        """
+        Decide where a message should be answered and record the decision
+
+        Args:
+            text: Message text
+            tenant_id: Tenant (user) ID
+
+        Returns:
+            Tuple of the decision and the intent match, if any
+        """
+        threshold = self.get_threshold(tenant_id)
+        intent_match = get_intent_matcher(tenant_id).match(text) if self.enabled and text else None
+        allowed = intent_match is not None and self.is_allowed(intent_match.intent)
+
+        if allowed and intent_match.confidence >= threshold:
+            route = 'local'
+            self.local_intents[intent_match.intent.name] = self.local_intents.get(intent_match.intent.name, 0) + 1
+        else:
+            route = 'llm'
+            if allowed:
+                self.below_threshold[intent_match.intent.name] = self.below_threshold.get(intent_match.intent.name, 0) + 1
+
+        decision = RoutingDecision(
+            route,
+            tenant_id,
+            intent_match.intent.name if intent_match else None,
+            intent_match.confidence if intent_match else 0.0,
+            threshold
+        )
+        self.counts[route] += 1
+        self.decisions.append(decision)
+        return decision, intent_match
+
+    def try_local(self, text: str, tenant_id: Optional[str] = None,
+                  platform: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Answer a message locally if its intent is matched confidently enough
+
+        Args:
+            text: Message text
+            tenant_id: Tenant (user) ID
+            platform: Platform the reply is sent on
+
+        Returns:
+            Response in the AIClient format, or None if the message should go to the model
+        """
+        start_ns = time.perf_counter_ns()
+        decision, intent_match = self.route(text, tenant_id)
+        if decision.route != 'local':
+            return None
+
+        content = intent_match.intent.generate_response(build_response_context(platform or 'social media'))
+        self.latency['local'].observe(time.perf_counter_ns() - start_ns)
+        logger.debug(f"Answered {decision.intent} locally (confidence {decision.confidence})")
+        return {
+            'content': content,
+            'model': 'rules_based',
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            'metadata': {'route': 'local', 'intent': decision.intent, 'confidence': decision.confidence}
+        }
+
+    async def generate_response(self,
+                                message: str,
+                                system_prompt: Optional[str] = None,
+                                conversation_history: Optional[List[Dict[str, str]]] = None,
+                                provider: Optional[str] = None,
+                                user_id: Optional[str] = None,
+                                enhance_with_knowledge: bool = True,
+                                platform: Optional[str] = None,
+                                knowledge_items: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Generate a response, locally when possible and with the AI client otherwise
+
+        Args:
+            message: User message to respond to
+            system_prompt: System prompt for the model
+            conversation_history: Previous conversation messages
+            provider: Specific model provider to use
+            user_id: User ID, which is also the tenant the intents and threshold belong to
+            enhance_with_knowledge: Whether the model prompt is enhanced from the knowledge base
+            platform: Platform the reply is sent on
+            knowledge_items: Already retrieved knowledge to add to the model prompt
+
+        Returns:
+            Dictionary with response content and metadata
+        """
+        response = self.try_local(message, user_id, platform)
+        if response is not None:
+            return response
+
+        start_ns = time.perf_counter_ns()
+        response = await self.ai_client.generate_response(
+            message=message,
+            system_prompt=system_prompt,
+            conversation_history=conversation_history,
+            provider=provider,
+            user_id=user_id,
+            enhance_with_knowledge=enhance_with_knowledge,
+            knowledge_items=knowledge_items
+        )
+        self.latency['llm'].observe(time.perf_counter_ns() - start_ns)
+        response.setdefault('metadata', {})['route'] = 'llm'
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get routing counts, latency and recent decisions
+
+        Returns:
+            Routing statistics
+        """
+        total = self.counts['local'] + self.counts['llm']
+        return {
+            'enabled': self.enabled,
+            'allowed_intents': sorted(self.allowed_intents),
+            'default_threshold': self.default_threshold,
+            'tenant_thresholds': dict(self.tenant_thresholds),
+            'total': total,
+            'local': self.counts['local'],
+            'llm': self.counts['llm'],
+            'local_rate': self.counts['local'] / total if total else 0.0,
+            'local_intents': dict(self.local_intents),
+            'below_threshold': dict(self.below_threshold),
+            'latency': {route: histogram.to_dict() for route, histogram in self.latency.items()},
+            'recent_decisions': [decision.to_dict() for decision in list(self.decisions)[-20:]]
+        }
+
+
+# Create global router instance
+response_router = ResponseRouter(
+    default_threshold=get_config('ai', 'routing_threshold', DEFAULT_ROUTING_THRESHOLD),
+    tenant_thresholds=get_config('ai', 'routing_tenant_thresholds'),
+    enabled=get_config('ai', 'local_routing', False),
+    allowed_intents=get_config('ai', 'local_routing_intents', DEFAULT_LOCAL_INTENTS)
+)
@@ -3,12 +3,29 @@ Rules-based Response Generator
 
 This module implements a rule-based, local response generator that doesn't require external APIs.
 It can be used to generate AI-like responses based on pattern matching and templates.
+
+Intents are matched with a prefilter rather than a single-scan matcher: an
+Aho-Corasick automaton over the literal text each pattern requires picks the
+candidate patterns in one pass, and the candidate regexes then still run
+one by one. The literals are read with the re module's private parser; if
+it is missing or its format changes, every pattern is simply run on every
+message.
 """
 
 import logging
 import json
 import re
-from typing import Dict, Any, List, Optional, Union
+# Private modules: literal extraction is skipped without them
+try:
+    from re import _constants as sre_constants, _parser as sre_parse  # Python 3.11+
+except ImportError:
+    try:
+        import sre_constants
+        import sre_parse
+    except ImportError:
+        sre_constants = sre_parse = None
+from typing import Dict, Any, List, Optional, Union, Tuple, Pattern, Set
+from collections import deque
 import random
 from datetime import datetime
 
@@ -79,6 +96,236 @@ class Intent:
         """Generate a response for this intent"""
         template = random.choice(self.templates)
         return template.format(**context)
+        
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Intent':
+        """Create from dictionary with name, patterns and templates"""
+        return cls(data['name'], data['patterns'], data['templates'])
+
+
+class IntentMatch:
+    """Result of matching a message against a set of intents"""
+    
+    __slots__ = ('intent', 'priority', 'start', 'end', 'confidence')
+    
+    def __init__(self, intent: Intent, priority: int, start: int, end: int, confidence: float):
+        self.intent = intent
+        self.priority = priority
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+        
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'intent': self.intent.name,
+            'priority': self.priority,
+            'span': [self.start, self.end],
+            'confidence': self.confidence
+        }
+
+
+def _shortest(option: Set[str]) -> int:
+    return min(len(text) for text in option)
+
+
+def _literal_options(sequence) -> List[Set[str]]:
+    """
+    Find literal text that any match of a parsed pattern must contain
+    
+    Args:
+        sequence: Parsed (sub)pattern from the re parser
+        
+    Returns:
+        Sets of lowercase alternatives; every match contains at least one
+        alternative of each set
+    """
+    options: List[Set[str]] = []
+    run: List[str] = []
+    
+    def flush():
+        if run:
+            options.append({''.join(run).lower()})
+            run.clear()
+            
+    def best(nested: List[Set[str]]) -> Optional[Set[str]]:
+        # The most selective option is the one whose shortest alternative is longest
+        return max(nested, key=_shortest) if nested else None
+        
+    for op, av in sequence:
+        if op is sre_constants.LITERAL and av < 128:
+            run.append(chr(av))
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            found = best(_literal_options(av[-1]))
+        elif op is sre_constants.BRANCH:
+            branches = [best(_literal_options(branch)) for branch in av[1]]
+            found = set().union(*branches) if all(branches) else None
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            found = best(_literal_options(av[2]))
+        else:
+            found = None
+        if found and all(found):
+            options.append(found)
+    flush()
+    return options
+
+
+class _LiteralAutomaton:
+    """Aho-Corasick automaton finding which of many literals occur in a text in one pass"""
+    
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        
+    def add(self, literal: str, value: int):
+        state = 0
+        for char in literal:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(value)
+        
+    def build(self):
+        """Compute failure links; call after adding all literals"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+                
+    def find(self, text: str) -> Set[int]:
+        """Values of all literals occurring in the text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class IntentMatcher:
+    """
+    Matches text against many intents, prefiltered by their required literals
+    
+    The literal text each pattern requires is extracted once and loaded into
+    an Aho-Corasick automaton. A message is scanned once to find the patterns
+    that can possibly match, and only those are run, in intent order, so the
+    winner is the same intent a loop over Intent.match() would return.
+    Patterns whose literals cannot be extracted are run on every message.
+    """
+    
+    def __init__(self, intents: List[Intent]):
+        """
+        Compile the matcher
+        
+        Args:
+            intents: Intents in priority order (earlier intents win)
+        """
+        self.intents = list(intents)
+        self._patterns: List[Tuple[int, Pattern]] = []
+        # Patterns without a required literal are always run
+        self._unfiltered: List[int] = []
+        self._automaton = _LiteralAutomaton()
+        
+        pattern_options: List[List[Set[str]]] = []
+        for priority, intent in enumerate(self.intents):
+            for pattern in intent.patterns:
+                self._patterns.append((priority, pattern))
+                options: List[Set[str]] = []
+                if sre_parse is not None:
+                    try:
+                        options = _literal_options(sre_parse.parse(pattern.pattern, pattern.flags))
+                    except Exception as e:
+                        # The private parser changed: fall back to running the pattern
+                        logger.debug(f"Could not extract literals from {pattern.pattern!r}: {str(e)}")
+                        options = []
+                pattern_options.append(options)
+                    
+        # Index each pattern under its rarest required literals, so a literal
+        # shared by many intents (e.g. "order") does not make them all candidates
+        frequency: Dict[str, int] = {}
+        for options in pattern_options:
+            for option in options:
+                for literal in option:
+                    frequency[literal] = frequency.get(literal, 0) + 1
+                    
+        for pattern_id, options in enumerate(pattern_options):
+            if not options:
+                self._unfiltered.append(pattern_id)
+                continue
+            chosen = min(options, key=lambda option: (sum(frequency[literal] for literal in option),
+                                                      -_shortest(option)))
+            for literal in chosen:
+                self._automaton.add(literal, pattern_id)
+                
+        self._automaton.build()
+        
+    def _candidates(self, text: str) -> List[int]:
+        """IDs of the patterns that may match the text, in priority order"""
+        candidates = self._automaton.find(text.lower())
+        candidates.update(self._unfiltered)
+        return sorted(candidates)
+        
+    def _to_match(self, text: str, priority: int, start: int, end: int) -> IntentMatch:
+        # Confidence is the share of the message covered by the matched phrase
+        length = len(text.strip()) or 1
+        confidence = min(1.0, max(end - start, 1) / length)
+        return IntentMatch(self.intents[priority], priority, start, end, round(confidence, 3))
+        
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """
+        Find the winning intent for a text
+        
+        Args:
+            text: Message text
+            
+        Returns:
+            The match of the highest-priority intent, or None
+        """
+        for pattern_id in self._candidates(text):
+            priority, pattern = self._patterns[pattern_id]
+            found = pattern.search(text)
+            if found:
+                return self._to_match(text, priority, found.start(), found.end())
+        return None
+        
+    def match_all(self, text: str) -> List[IntentMatch]:
+        """
+        Find every intent matching a text
+        
+        Args:
+            text: Message text
+            
+        Returns:
+            First match per intent, in priority order
+        """
+        matches: Dict[int, IntentMatch] = {}
+        for pattern_id in self._candidates(text):
+            priority, pattern = self._patterns[pattern_id]
+            if priority in matches:
+                continue
+            found = pattern.search(text)
+            if found:
+                matches[priority] = self._to_match(text, priority, found.start(), found.end())
+        return list(matches.values())
+
 
 # Define common intents
 INTENTS = [
@@ -129,6 +376,73 @@ INTENTS = [
     )
 ]
 
+# Compiled matcher for the built-in intents
+default_matcher = IntentMatcher(INTENTS)
+
+# Compiled matchers with tenant-specific intents ahead of the built-in ones
+_tenant_matchers: Dict[str, IntentMatcher] = {}
+
+
+def load_tenant_intents(tenant_id: str, intents: List[Union[Intent, Dict[str, Any]]]):
+    """
+    Load custom intents for a tenant
+    
+    Tenant intents take priority over the built-in intents and replace any
+    previously loaded for the tenant. The combined matcher is compiled once here.
+    
+    Args:
+        tenant_id: Tenant (user) ID
+        intents: Intents or dictionaries with name, patterns and templates
+    """
+    tenant_intents = [intent if isinstance(intent, Intent) else Intent.from_dict(intent) for intent in intents]
+    _tenant_matchers[tenant_id] = IntentMatcher(tenant_intents + INTENTS)
+    logger.info(f"Loaded {len(tenant_intents)} custom intents for tenant {tenant_id}")
+
+
+def clear_tenant_intents(tenant_id: str):
+    """
+    Remove the custom intents of a tenant
+    
+    Args:
+        tenant_id: Tenant (user) ID
+    """
+    _tenant_matchers.pop(tenant_id, None)
+
+
+def get_intent_matcher(tenant_id: Optional[str] = None) -> IntentMatcher:
+    """
+    Get the intent matcher for a tenant
+    
+    Args:
+        tenant_id: Tenant (user) ID, or None for the built-in intents
+        
+    Returns:
+        The tenant's matcher, or the default matcher
+    """
+    if tenant_id is not None:
+        return _tenant_matchers.get(tenant_id, default_matcher)
+    return default_matcher
+
+
+def build_response_context(platform: str = 'social media') -> Dict[str, Any]:
+    """
+    Build the default values used to fill response templates
+    
+    Args:
+        platform: Platform the reply is sent on
+        
+    Returns:
+        Template context
+    """
+    return {
+        'platform': platform,
+        'answer': 'I don\'t have specific information on that.',
+        'message_count': random.randint(1, 10),
+        'task_count': random.randint(0, 5),
+        'snippet': 'No relevant information found.'
+    }
+
+
 async def rules_based_provider(message: Dict[str, Any], context: Any) -> str:
     """
     Generate response using rule-based approach
@@ -146,18 +460,12 @@ async def rules_based_provider(message: Dict[str, Any], context: Any) -> str:
         platform = message.get('platform', 'social media')
         
         # Default response context
-        response_context = {
-            'platform': platform,
-            'answer': 'I don\'t have specific information on that.',
-            'message_count': random.randint(1, 10),
-            'task_count': random.randint(0, 5),
-            'snippet': 'No relevant information found.'
-        }
+        response_context = build_response_context(platform)
         
-        # Find matching intent
-        for intent in INTENTS:
-            if intent.match(content):
-                return intent.generate_response(response_context)
+        # Find matching intent in a single scan
+        intent_match = get_intent_matcher(message.get('user_id')).match(content)
+        if intent_match:
+            return intent_match.intent.generate_response(response_context)
         
         # If we have knowledge, use it for response
         if hasattr(message, 'knowledge') and message['knowledge']:
@@ -0,0 +1,179 @@
+"""
+Streaming AI Replies for Dana AI
+
+This module relays a streamed completion to the Socket.IO room of a
+conversation (conversation_<id>) as it is generated, so the reply starts
+appearing with the first token instead of after the whole completion. The
+first delta is emitted immediately; later deltas are batched for a few
+milliseconds to keep the number of socket messages down. When the stream
+finishes, the full reply is persisted as an 'ai' message.
+
+Platform replies are sent through the platform APIs, so nothing in the app
+streams into conversation rooms yet; this is the building block for a
+dashboard route that generates a reply with ResponseGenerator.stream_response().
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# Seconds deltas are collected before they are emitted (after the first one)
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+
+def _emit_to_conversation(event: str, payload: Dict[str, Any], conversation_id: str):
+    """Emit a stream event over Socket.IO"""
+    # Import here to avoid loading the Flask app with this module
+    from socket_server import notify_message_stream
+    notify_message_stream(event, payload, conversation_id)
+
+
+def _save_ai_message(conversation_id: str, user_id: str, content: str) -> Optional[Dict[str, Any]]:
+    """
+    Persist a finished AI reply and notify the user's clients
+
+    Args:
+        conversation_id: The conversation ID
+        user_id: Owner of the conversation
+        content: Reply text
+
+    Returns:
+        The stored message, or None if it could not be stored
+    """
+    from utils.supabase import get_supabase_client
+    from socket_server import notify_new_message
+
+    supabase = get_supabase_client()
+    now = datetime.now().isoformat()
+    message_result = supabase.table('messages').insert({
+        'conversation_id': conversation_id,
+        'content': content,
+        'sender_type': 'ai',
+        'created_at': now
+    }).execute()
+    if not message_result.data:
+        return None
+
+    new_message = message_result.data[0]
+    supabase.table('conversations').update({'updated_at': now}).eq('id', conversation_id).execute()
+    notify_new_message(new_message, conversation_id, user_id)
+    return new_message
+
+
+async def _persist_in_executor(conversation_id: str, user_id: str, content: str) -> Optional[Dict[str, Any]]:
+    # The database client blocks, so keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(
+        None, _save_ai_message, conversation_id, user_id, content
+    )
+
+
+async def stream_to_conversation(stream: AsyncIterator[str],
+                                 conversation_id: str,
+                                 user_id: str,
+                                 emit: Optional[Callable[[str, Dict[str, Any], str], None]] = None,
+                                 persist: Optional[Callable[[str, str, str], Awaitable[Optional[Dict[str, Any]]]]] = None,
+                                 flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> Dict[str, Any]:
+    """
+    Relay a streamed AI reply to a conversation room and persist it when done
+
+    Clients receive 'message_stream_start', then 'message_delta' events with
+    the text in order (index counts the events), then 'message_stream_end'
+    with the stored message or an error.
+
+    Args:
+        stream: Async iterator of text deltas, e.g. from ResponseGenerator.stream_response()
+        conversation_id: The conversation ID
+        user_id: Owner of the conversation
+        emit: Function emitting (event, payload, conversation_id); defaults to Socket.IO
+        persist: Coroutine function storing (conversation_id, user_id, content);
+            defaults to inserting an 'ai' message
+        flush_interval: Seconds later deltas are batched before they are emitted
+
+    Returns:
+        Dictionary with the stream ID, content, stored message and timings,
+        or with 'error' if the stream failed
+    """
+    emit = emit or _emit_to_conversation
+    persist = persist or _persist_in_executor
+    stream_id = str(uuid.uuid4())
+    started_at = time.perf_counter()
+    time_to_first_token = None
+    parts: List[str] = []
+    pending: List[str] = []
+    index = 0
+    loop = asyncio.get_running_loop()
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def flush():
+        nonlocal index, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        if not pending:
+            return
+        emit('message_delta', {
+            'stream_id': stream_id,
+            'conversation_id': conversation_id,
+            'index': index,
+            'delta': "".join(pending)
+        }, conversation_id)
+        pending.clear()
+        index += 1
+
+    emit('message_stream_start', {'stream_id': stream_id, 'conversation_id': conversation_id}, conversation_id)
+
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            pending.append(delta)
+            if time_to_first_token is None:
+                time_to_first_token = time.perf_counter() - started_at
+                flush()
+            elif timer is None:
+                # Emit the batch on time even if the next delta is slow to arrive
+                timer = loop.call_later(flush_interval, flush)
+        flush()
+    except asyncio.CancelledError:
+        if timer is not None:
+            timer.cancel()
+        raise
+    except Exception as e:
+        flush()
+        logger.error(f"Error streaming reply to conversation {conversation_id}: {str(e)}", exc_info=True)
+        emit('message_stream_end', {
+            'stream_id': stream_id,
+            'conversation_id': conversation_id,
+            'error': str(e)
+        }, conversation_id)
+        return {'stream_id': stream_id, 'content': "".join(parts), 'error': str(e)}
+
+    content = "".join(parts)
+    message = None
+    try:
+        message = await persist(conversation_id, user_id, content)
+    except Exception as e:
+        logger.error(f"Error saving streamed reply to conversation {conversation_id}: {str(e)}", exc_info=True)
+
+    duration = time.perf_counter() - started_at
+    emit('message_stream_end', {
+        'stream_id': stream_id,
+        'conversation_id': conversation_id,
+        'content': content,
+        'message': message
+    }, conversation_id)
+    logger.info(f"Streamed reply to conversation {conversation_id}: first token after "
+                f"{(time_to_first_token or 0) * 1000:.0f}ms, done after {duration * 1000:.0f}ms")
+
+    return {
+        'stream_id': stream_id,
+        'content': content,
+        'message': message,
+        'deltas_emitted': index,
+        'time_to_first_token': time_to_first_token,
+        'duration': duration
+    }
@@ -0,0 +1,205 @@
+"""
+Workflow Checkpointing for Dana AI
+
+This module persists the workflow context after each completed step so an
+execution interrupted by a worker restart can be resumed without running
+the completed steps again. The checkpoint is deleted when the workflow
+succeeds, unless the execution keeps it until its result has been used:
+the message workflows keep theirs until the reply is queued, so a reply
+lost to a restart is sent without generating it again.
+
+The store is synchronous; the workflow engine runs its queries in a thread
+(asyncio.to_thread) so a slow disk never stalls the event loop.
+"""
+
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_default(value: Any) -> Any:
+    """Make context values JSON-serializable for checkpoints"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} cannot be checkpointed")
+
+
+class Checkpoint:
+    """
+    Saved state of an interrupted workflow execution
+    """
+
+    __slots__ = ('execution_id', 'workflow', 'completed_steps', 'context', 'updated_at')
+
+    def __init__(self, execution_id: str, workflow: str, completed_steps: List[str],
+                 context: Dict[str, Any], updated_at: float):
+        self.execution_id = execution_id
+        self.workflow = workflow
+        self.completed_steps = completed_steps
+        self.context = context
+        self.updated_at = updated_at
+
+
+class SQLiteCheckpointStore:
+    """
+    Durable checkpoint store backed by a local SQLite database
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS workflow_checkpoints (
+                execution_id TEXT PRIMARY KEY,
+                workflow TEXT NOT NULL,
+                completed_steps TEXT NOT NULL,
+                context TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+
+    def save(self, execution_id: str, workflow: str, completed_steps: Iterable[str],
+             context: Dict[str, Any]) -> bool:
+        """
+        Save the context after a completed step
+
+        Runtime metadata (timings, deadline, pools) is not persisted.
+
+        Args:
+            execution_id: Execution ID
+            workflow: Workflow name
+            completed_steps: Names of the steps completed so far
+            context: The workflow context data
+
+        Returns:
+            Whether the checkpoint was written
+        """
+        context_json = self._encode(execution_id, context)
+        if context_json is None:
+            return False
+        self._write(execution_id, workflow, json.dumps(sorted(completed_steps)), context_json)
+        return True
+
+    async def save_async(self, execution_id: str, workflow: str, completed_steps: Iterable[str],
+                         context: Dict[str, Any]) -> bool:
+        """
+        Save the context after a completed step, from a coroutine
+
+        The context is serialized on the event loop, since steps still running
+        may change it, and only the write runs in a thread.
+
+        Args:
+            execution_id: Execution ID
+            workflow: Workflow name
+            completed_steps: Names of the steps completed so far
+            context: The workflow context data
+
+        Returns:
+            Whether the checkpoint was written
+        """
+        context_json = self._encode(execution_id, context)
+        if context_json is None:
+            return False
+        await asyncio.to_thread(self._write, execution_id, workflow, json.dumps(sorted(completed_steps)),
+                                context_json)
+        return True
+
+    @staticmethod
+    def _encode(execution_id: str, context: Dict[str, Any]) -> Optional[str]:
+        """Serialize the context without its runtime metadata"""
+        snapshot = {key: value for key, value in context.items() if key != '_metadata'}
+        try:
+            return json.dumps(snapshot, default=_snapshot_default)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not checkpoint execution {execution_id}: {str(e)}")
+            return None
+
+    def _write(self, execution_id: str, workflow: str, completed_steps_json: str, context_json: str):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO workflow_checkpoints "
+                "(execution_id, workflow, completed_steps, context, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (execution_id, workflow, completed_steps_json, context_json, time.time())
+            )
+
+    def load(self, execution_id: str) -> Optional[Checkpoint]:
+        """
+        Load the checkpoint of an execution
+
+        Args:
+            execution_id: Execution ID
+
+        Returns:
+            The checkpoint or None if there is none
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT execution_id, workflow, completed_steps, context, updated_at "
+                "FROM workflow_checkpoints WHERE execution_id = ?",
+                (execution_id,)
+            ).fetchone()
+        return self._to_checkpoint(row) if row else None
+
+    def delete(self, execution_id: str):
+        """
+        Delete the checkpoint of a finished execution
+
+        Args:
+            execution_id: Execution ID
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM workflow_checkpoints WHERE execution_id = ?", (execution_id,)
+            )
+
+    def list_pending(self, older_than: float = 0) -> List[Checkpoint]:
+        """
+        List checkpoints of executions that did not finish
+
+        Args:
+            older_than: Only include checkpoints not updated for this many seconds
+
+        Returns:
+            Checkpoints, oldest first
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT execution_id, workflow, completed_steps, context, updated_at "
+                "FROM workflow_checkpoints WHERE updated_at <= ? ORDER BY updated_at",
+                (time.time() - older_than,)
+            ).fetchall()
+        return [self._to_checkpoint(row) for row in rows]
+
+    def close(self):
+        """Close the database connection"""
+        self._connection.close()
+
+    @staticmethod
+    def _to_checkpoint(row) -> Checkpoint:
+        execution_id, workflow, completed_steps, context, updated_at = row
+        return Checkpoint(execution_id, workflow, json.loads(completed_steps), json.loads(context), updated_at)
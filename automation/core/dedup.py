@@ -0,0 +1,351 @@
+"""
+Webhook Deduplication for Dana AI
+
+Platforms redeliver webhooks when our response times out. This module keeps a
+bounded index of recently seen platform message IDs (Facebook/Instagram mid,
+WhatsApp message id) so redeliveries can be dropped before they are
+normalized and sent through the workflow and the AI model again.
+
+A message being processed is only leased: if the worker dies or the
+workflow is cancelled before the reply is queued, the lease expires and a
+redelivery is processed instead of being dropped. Once the reply is queued
+the ID is marked done and remembered for the full TTL.
+
+Coroutines use the *_async methods: the SQLite index runs its queries in a
+thread (asyncio.to_thread) so a slow disk never stalls the event loop, while
+the in-memory index only takes a short lock and is called directly.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Set, Deque, Tuple
+
+from automation.core.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Deduplication defaults
+DEFAULT_DEDUP_TTL = 24 * 60 * 60  # Platforms stop redelivering well within a day
+DEFAULT_DEDUP_BUCKETS = 24
+DEFAULT_DEDUP_MAX_ENTRIES = 100000
+DEFAULT_DEDUP_LEASE = 180  # Longer than a message workflow, shorter than the spool lease
+
+
+class DedupIndex:
+    """
+    Base class for message deduplication indexes
+    """
+
+    def __init__(self, ttl: float = DEFAULT_DEDUP_TTL, lease: float = DEFAULT_DEDUP_LEASE):
+        """
+        Initialize the index
+
+        Args:
+            ttl: Seconds a message ID is remembered
+            lease: Seconds a claimed message ID is held before it is marked done
+        """
+        self.ttl = ttl
+        self.lease = lease
+        self.checked = 0
+        self.duplicates = 0
+
+    def claim(self, key: str) -> bool:
+        """
+        Record a message ID as being processed and report whether it was seen before
+
+        The ID is only held for the lease; call mark_done() once the message
+        has been handled, or it is accepted again when the lease expires.
+
+        Args:
+            key: Platform-qualified message ID
+
+        Returns:
+            True if the ID is being processed or was handled within the TTL
+        """
+        self.checked += 1
+        duplicate = self._claim(key)
+        if duplicate:
+            self.duplicates += 1
+        return duplicate
+
+    def mark_done(self, key: str):
+        """
+        Remember a claimed message ID for the full TTL
+
+        Args:
+            key: Platform-qualified message ID
+        """
+        raise NotImplementedError
+
+    def discard(self, key: str):
+        """
+        Forget a message ID, so a redelivery of the message is processed
+
+        Args:
+            key: Platform-qualified message ID
+        """
+        raise NotImplementedError
+
+    async def claim_async(self, key: str) -> bool:
+        """
+        Claim a message ID from a coroutine (see claim())
+
+        Args:
+            key: Platform-qualified message ID
+
+        Returns:
+            True if the ID is being processed or was handled within the TTL
+        """
+        return self.claim(key)
+
+    async def mark_done_async(self, key: str):
+        """
+        Mark a claimed message ID done from a coroutine (see mark_done())
+
+        Args:
+            key: Platform-qualified message ID
+        """
+        self.mark_done(key)
+
+    async def discard_async(self, key: str):
+        """
+        Forget a message ID from a coroutine (see discard())
+
+        Args:
+            key: Platform-qualified message ID
+        """
+        self.discard(key)
+
+    def _claim(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get deduplication statistics
+
+        Returns:
+            Checked and duplicate counts, dedup rate and index size
+        """
+        return {
+            'backend': type(self).__name__,
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'dedup_rate': self.duplicates / self.checked if self.checked else 0.0,
+            'size': len(self),
+            'ttl': self.ttl,
+            'lease': self.lease
+        }
+
+
+class MemoryDedupIndex(DedupIndex):
+    """
+    In-memory time-bucketed set of message IDs
+
+    IDs are added to the newest bucket; whole buckets are dropped once they
+    are older than the TTL, or early when the index exceeds max_entries, so
+    memory stays bounded without per-entry expiry bookkeeping. The current
+    bucket is never dropped early, so a burst over max_entries within one
+    bucket window does not wipe the IDs just seen. Claimed IDs are kept
+    apart with their lease expiry until they are marked done.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_DEDUP_TTL, num_buckets: int = DEFAULT_DEDUP_BUCKETS,
+                 max_entries: int = DEFAULT_DEDUP_MAX_ENTRIES, lease: float = DEFAULT_DEDUP_LEASE):
+        """
+        Initialize the index
+
+        Args:
+            ttl: Seconds a message ID is remembered (rounded up to a whole bucket)
+            num_buckets: Number of time buckets the TTL is split into
+            max_entries: Number of IDs above which buckets older than the current one are dropped
+            lease: Seconds a claimed message ID is held before it is marked done
+        """
+        super().__init__(ttl, lease)
+        self.bucket_seconds = max(ttl / num_buckets, 1e-6)
+        self.max_entries = max_entries
+        self._buckets: Deque[Tuple[int, Set[str]]] = deque()
+        self._size = 0
+        # Claimed IDs -> monotonic lease expiry (only messages in flight)
+        self._leases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        oldest_kept = int((now - self.ttl) // self.bucket_seconds)
+        current = int(now // self.bucket_seconds)
+        while self._buckets and (self._buckets[0][0] < oldest_kept or
+                                 (self._size > self.max_entries and self._buckets[0][0] < current)):
+            _, bucket = self._buckets.popleft()
+            self._size -= len(bucket)
+        expired = [key for key, expires_at in self._leases.items() if expires_at <= now]
+        for key in expired:
+            del self._leases[key]
+
+    def _seen(self, key: str) -> bool:
+        if key in self._leases:
+            return True
+        for _, bucket in self._buckets:
+            if key in bucket:
+                return True
+        return False
+
+    def _add(self, key: str, now: float):
+        bucket_id = int(now // self.bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != bucket_id:
+            self._buckets.append((bucket_id, set()))
+        self._buckets[-1][1].add(key)
+        self._size += 1
+
+    def _claim(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if self._seen(key):
+                return True
+            self._leases[key] = now + self.lease
+        return False
+
+    def mark_done(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            self._leases.pop(key, None)
+            if not self._seen(key):
+                self._add(key, now)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._leases.pop(key, None)
+            for _, bucket in self._buckets:
+                if key in bucket:
+                    bucket.discard(key)
+                    self._size -= 1
+
+    def __len__(self) -> int:
+        return self._size + len(self._leases)
+
+
+class SQLiteDedupIndex(DedupIndex):
+    """
+    Message ID index backed by SQLite, so deduplication survives restarts
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_DEDUP_TTL, purge_interval: float = 60,
+                 lease: float = DEFAULT_DEDUP_LEASE):
+        """
+        Initialize the index
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds a message ID is remembered
+            purge_interval: Minimum seconds between deletions of expired IDs
+            lease: Seconds a claimed message ID is held before it is marked done
+        """
+        super().__init__(ttl, lease)
+        self.path = path
+        self.purge_interval = purge_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_dedup (
+                key TEXT PRIMARY KEY,
+                seen_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS webhook_dedup_seen ON webhook_dedup (seen_at)"
+        )
+
+    def _insert(self, key: str, seen_at: float) -> bool:
+        now = time.time()
+        cutoff = now - self.ttl
+        with self._lock:
+            if now - self._last_purge >= self.purge_interval:
+                self._connection.execute("DELETE FROM webhook_dedup WHERE seen_at < ?", (cutoff,))
+                self._last_purge = now
+
+            # Insert the ID, or take over an expired row; no change means a live duplicate
+            cursor = self._connection.execute(
+                "INSERT INTO webhook_dedup (key, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at WHERE seen_at < ?",
+                (key, seen_at, cutoff)
+            )
+        return cursor.rowcount == 0
+
+    def _claim(self, key: str) -> bool:
+        # Backdate the row so it expires when the lease does, not after the TTL
+        return self._insert(key, time.time() + self.lease - self.ttl)
+
+    def mark_done(self, key: str):
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO webhook_dedup (key, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at",
+                (key, time.time())
+            )
+
+    def discard(self, key: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM webhook_dedup WHERE key = ?", (key,))
+
+    async def claim_async(self, key: str) -> bool:
+        return await asyncio.to_thread(self.claim, key)
+
+    async def mark_done_async(self, key: str):
+        await asyncio.to_thread(self.mark_done, key)
+
+    async def discard_async(self, key: str):
+        await asyncio.to_thread(self.discard, key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM webhook_dedup WHERE seen_at >= ?", (time.time() - self.ttl,)
+            ).fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        self._connection.close()
+
+
+def create_dedup_index() -> Optional[DedupIndex]:
+    """
+    Create the webhook dedup index from configuration
+
+    Options come from the 'automation' configuration section:
+    dedup_backend ('memory', 'sqlite' or 'none'), dedup_path, dedup_ttl,
+    dedup_lease and dedup_max_entries.
+
+    Returns:
+        The dedup index, or None if deduplication is disabled
+    """
+    backend = get_config('automation', 'dedup_backend', 'memory')
+    ttl = get_config('automation', 'dedup_ttl', DEFAULT_DEDUP_TTL)
+    lease = get_config('automation', 'dedup_lease', DEFAULT_DEDUP_LEASE)
+
+    if backend == 'none':
+        return None
+    if backend == 'sqlite':
+        path = get_config('automation', 'dedup_path', os.path.join('instance', 'webhook_dedup.db'))
+        index = SQLiteDedupIndex(path, ttl=ttl, lease=lease)
+    else:
+        max_entries = get_config('automation', 'dedup_max_entries', DEFAULT_DEDUP_MAX_ENTRIES)
+        index = MemoryDedupIndex(ttl=ttl, max_entries=max_entries, lease=lease)
+
+    logger.info(f"Initialized {backend} webhook dedup index")
+    return index
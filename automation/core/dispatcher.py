@@ -0,0 +1,240 @@
+"""
+Conversation Dispatcher for Dana AI
+
+This module provides a dispatcher that keeps messages of the same
+conversation in order while processing different conversations in parallel.
+Each conversation key with queued work gets its own queue and worker task,
+so a slow conversation only holds up later messages of that conversation.
+A global limit caps how many items are handled at once across all
+conversations, and a queue limit caps how many are waiting.
+"""
+
+import logging
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Any, Deque, Callable, Awaitable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default maximum number of items handled at once across all conversations
+DEFAULT_DISPATCH_CONCURRENCY = 64
+
+
+class _DispatchStats:
+    """Counters for the dispatcher"""
+
+    __slots__ = ('processed', 'failed', 'total_wait', 'max_wait', 'last_wait')
+
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def record_wait(self, wait: float):
+        self.total_wait += wait
+        self.last_wait = wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+
+class ConversationDispatcher:
+    """
+    Dispatches work in order per conversation key, with a global concurrency limit
+    """
+
+    def __init__(self,
+                 handler: Callable[..., Awaitable[Any]],
+                 max_concurrency: int = DEFAULT_DISPATCH_CONCURRENCY,
+                 max_queue_size: int = 1000,
+                 name: str = "dispatcher"):
+        """
+        Initialize the dispatcher
+
+        Args:
+            handler: Async function called with the dispatched arguments
+            max_concurrency: Maximum items handled at once (conversations processed in parallel)
+            max_queue_size: Maximum unfinished items before submitters wait
+            name: Name used in logs and metrics
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.name = name
+        # Conversation key -> queued (enqueued_at, future, args), and its worker
+        self._queues: Dict[str, Deque[Tuple[float, asyncio.Future, tuple]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._running: Optional[asyncio.Semaphore] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._active = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._stats = _DispatchStats()
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the dispatcher has been started"""
+        return self._idle is not None
+
+    async def start(self):
+        """Prepare the dispatcher on the running event loop"""
+        if self._idle is not None:
+            return
+
+        self._running = asyncio.Semaphore(self.max_concurrency)
+        self._slots = asyncio.Semaphore(self.max_queue_size)
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        logger.info(f"Started {self.name} with {self.max_concurrency} concurrent conversations")
+
+    async def stop(self, drain: bool = True):
+        """
+        Stop the conversation workers
+
+        Args:
+            drain: Whether to finish queued items before stopping
+        """
+        if self._idle is None:
+            return
+
+        if drain:
+            await self._idle.wait()
+
+        queues = list(self._queues.values())
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        # Fail anything that was still queued
+        for queue in queues:
+            for _, future, _ in queue:
+                if not future.done():
+                    future.cancel()
+
+        self._queues.clear()
+        self._workers.clear()
+        self._idle = None
+        logger.info(f"Stopped {self.name}")
+
+    async def submit(self, key: str, *args: Any) -> asyncio.Future:
+        """
+        Queue work behind earlier work for the same conversation key
+
+        Waits while the dispatcher already has max_queue_size unfinished items.
+
+        Args:
+            key: Conversation key that determines ordering
+            *args: Arguments passed to the handler
+
+        Returns:
+            Future resolved with the handler result
+        """
+        if self._idle is None:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._slots.acquire()
+        self._pending += 1
+        self._idle.clear()
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._workers[key] = asyncio.create_task(self._run_conversation(key, queue),
+                                                     name=f"{self.name}-{key}")
+        queue.append((time.perf_counter(), future, args))
+        return future
+
+    async def dispatch(self, key: str, *args: Any) -> Any:
+        """
+        Queue work for a conversation key and wait for its result
+
+        Args:
+            key: Conversation key that determines ordering
+            *args: Arguments passed to the handler
+
+        Returns:
+            The handler result
+        """
+        return await (await self.submit(key, *args))
+
+    def _finish(self):
+        """Free the slot of a finished item"""
+        self._pending -= 1
+        self._slots.release()
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _run_conversation(self, key: str, queue: Deque[Tuple[float, asyncio.Future, tuple]]):
+        """
+        Process one conversation's queue in order, then retire its worker
+
+        Args:
+            key: Conversation key
+            queue: Queued items of the conversation
+        """
+        stats = self._stats
+
+        try:
+            while queue:
+                enqueued_at, future, args = queue[0]
+                try:
+                    if future.cancelled():
+                        continue
+
+                    # Other conversations' items take turns with this one's
+                    async with self._running:
+                        stats.record_wait(time.perf_counter() - enqueued_at)
+                        self._active += 1
+                        try:
+                            result = await self.handler(*args)
+                        except Exception as e:
+                            stats.failed += 1
+                            logger.error(f"Error in {self.name} for {key}: {str(e)}", exc_info=True)
+                            if not future.done():
+                                future.set_exception(e)
+                        else:
+                            if not future.done():
+                                future.set_result(result)
+                        finally:
+                            self._active -= 1
+                            stats.processed += 1
+                finally:
+                    # Stopped mid-item: do not leave the caller waiting forever
+                    if not future.done():
+                        future.cancel()
+                    queue.popleft()
+                    self._finish()
+        finally:
+            if self._queues.get(key) is queue:
+                del self._queues[key]
+                del self._workers[key]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get queue depth, concurrency and wait time metrics
+
+        Returns:
+            Dispatcher metrics
+        """
+        stats = self._stats
+        return {
+            'name': self.name,
+            'running': self.is_running,
+            'max_concurrency': self.max_concurrency,
+            'active': self._active,
+            'conversations': len(self._queues),
+            'queue_depth': self._pending - self._active,
+            'processed': stats.processed,
+            'failed': stats.failed,
+            'avg_wait_seconds': stats.total_wait / stats.processed if stats.processed else 0.0,
+            'max_wait_seconds': stats.max_wait,
+            'last_wait_seconds': stats.last_wait
+        }
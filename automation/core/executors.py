@@ -0,0 +1,148 @@
+"""
+Step Executors for Dana AI
+
+This module manages the thread and process pools used to run CPU-bound
+workflow steps off the event loop, and reports their size and utilization.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ('thread', 'process')
+
+
+class _PoolStats:
+    """Counters for a single pool"""
+
+    __slots__ = ('submitted', 'completed', 'failed', 'active', 'peak_active')
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.active = 0
+        self.peak_active = 0
+
+
+class StepExecutors:
+    """
+    Lazily created thread and process pools for workflow steps
+    """
+
+    def __init__(self, max_threads: Optional[int] = None, max_processes: Optional[int] = None):
+        """
+        Initialize the executors
+
+        Args:
+            max_threads: Thread pool size (defaults to min(32, CPUs + 4))
+            max_processes: Process pool size (defaults to the number of CPUs)
+        """
+        cpu_count = os.cpu_count() or 1
+        self.max_workers = {
+            'thread': max_threads or min(32, cpu_count + 4),
+            'process': max_processes or cpu_count
+        }
+        self._pools: Dict[str, Executor] = {}
+        self._stats = {kind: _PoolStats() for kind in EXECUTOR_KINDS}
+        self._lock = threading.Lock()
+
+    def get_pool(self, kind: str) -> Executor:
+        """
+        Get the pool of a given kind, creating it on first use
+
+        Args:
+            kind: 'thread' or 'process'
+
+        Returns:
+            The executor
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        with self._lock:
+            pool = self._pools.get(kind)
+            if pool is None:
+                if kind == 'process':
+                    pool = ProcessPoolExecutor(max_workers=self.max_workers[kind])
+                else:
+                    pool = ThreadPoolExecutor(max_workers=self.max_workers[kind],
+                                              thread_name_prefix='workflow-step')
+                self._pools[kind] = pool
+                logger.info(f"Started {kind} pool with {self.max_workers[kind]} workers")
+            return pool
+
+    async def run(self, kind: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a function in one of the pools without blocking the event loop
+
+        Functions run in the process pool, and their arguments and results,
+        must be picklable.
+
+        Args:
+            kind: 'thread' or 'process'
+            func: Function to run
+            *args: Arguments for the function
+
+        Returns:
+            The function result
+        """
+        pool = self.get_pool(kind)
+        stats = self._stats[kind]
+
+        stats.submitted += 1
+        stats.active += 1
+        if stats.active > stats.peak_active:
+            stats.peak_active = stats.active
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        except BaseException:
+            stats.failed += 1
+            raise
+        else:
+            stats.completed += 1
+            return result
+        finally:
+            stats.active -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool size and utilization
+
+        Returns:
+            Statistics per pool kind
+        """
+        stats = {}
+        for kind in EXECUTOR_KINDS:
+            pool_stats = self._stats[kind]
+            max_workers = self.max_workers[kind]
+            stats[kind] = {
+                'started': kind in self._pools,
+                'max_workers': max_workers,
+                'active': pool_stats.active,
+                'peak_active': pool_stats.peak_active,
+                'utilization': min(1.0, pool_stats.active / max_workers),
+                'queued': max(0, pool_stats.active - max_workers),
+                'submitted': pool_stats.submitted,
+                'completed': pool_stats.completed,
+                'failed': pool_stats.failed
+            }
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shut down all started pools
+
+        Args:
+            wait: Whether to wait for running work to finish
+        """
+        with self._lock:
+            for kind, pool in self._pools.items():
+                pool.shutdown(wait=wait)
+                logger.info(f"Shut down {kind} pool")
+            self._pools = {}
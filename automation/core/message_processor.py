@@ -12,6 +12,7 @@ from datetime import datetime
 import json
 import hashlib
 
+from automation.core.dedup import DedupIndex, create_dedup_index
 from automation.core.workflow_engine import WorkflowStep
 
 logger = logging.getLogger(__name__)
@@ -19,8 +20,14 @@ logger = logging.getLogger(__name__)
 class Message:
     """
     Represents a normalized message from any platform
+    
+    Messages travel through workflow contexts as objects; to_dict() is only
+    called at I/O boundaries (checkpoints, cache keys, API responses).
     """
     
+    __slots__ = ('platform', 'sender_id', 'sender_name', 'content', 'message_id',
+                 'timestamp', 'conversation_id', 'metadata')
+    
     def __init__(self, 
                  platform: str, 
                  sender_id: str, 
@@ -89,6 +96,47 @@ class Message:
             conversation_id=data['conversation_id'],
             metadata=data.get('metadata', {})
         )
+        
+    def __repr__(self) -> str:
+        return f"Message(platform={self.platform!r}, message_id={self.message_id!r}, conversation_id={self.conversation_id!r})"
+
+
+def ensure_message(value: Union[Message, Dict[str, Any], None]) -> Optional[Message]:
+    """
+    Get a Message from a workflow context value
+    
+    Contexts restored from a checkpoint hold the serialized dictionary
+    instead of the Message object.
+    
+    Args:
+        value: Message, serialized message or None
+        
+    Returns:
+        The Message, or None
+    """
+    if value is None or isinstance(value, Message):
+        return value
+    return Message.from_dict(value)
+
+
+def message_content_key(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the cache key inputs of a step that only depends on a message's text
+    
+    The message ID and timestamp differ for every message, so keying on the
+    whole message would never let two identical questions share a result.
+    
+    Args:
+        context: Workflow context with the message and optional user_id
+        
+    Returns:
+        The message content and the user it is answered for
+    """
+    message = ensure_message(context.get('message'))
+    return {
+        'content': message.content if message else None,
+        'user_id': context.get('user_id')
+    }
 
 
 class MessageProcessor:
@@ -96,20 +144,39 @@ class MessageProcessor:
     Processes incoming messages from various platforms
     """
     
-    def __init__(self):
-        """Initialize the message processor"""
+    def __init__(self, dedup_index: Optional[DedupIndex] = None):
+        """
+        Initialize the message processor
+        
+        Args:
+            dedup_index: Index of seen platform message IDs used to drop
+                redelivered webhooks (no deduplication if None)
+        """
         self.platform_adapters: Dict[str, Callable[[Dict[str, Any]], Message]] = {}
+        self.message_id_getters: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {}
+        self.conversation_key_getters: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {}
         self.message_handlers: List[Callable[[Message], Awaitable[None]]] = []
+        self.dedup_index = dedup_index
         
-    def register_platform_adapter(self, platform: str, adapter: Callable[[Dict[str, Any]], Message]):
+    def register_platform_adapter(self, platform: str, adapter: Callable[[Dict[str, Any]], Message],
+                                  message_id_getter: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+                                  conversation_key_getter: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None):
         """
         Register an adapter for a platform
         
         Args:
             platform: Platform name
             adapter: Function that converts platform-specific message to Message object
+            message_id_getter: Function that reads the platform message ID from a
+                raw message, used for deduplication
+            conversation_key_getter: Function that reads a key shared by all messages
+                of a conversation from a raw message, used to keep them in order
         """
         self.platform_adapters[platform] = adapter
+        if message_id_getter:
+            self.message_id_getters[platform] = message_id_getter
+        if conversation_key_getter:
+            self.conversation_key_getters[platform] = conversation_key_getter
         logger.info(f"Registered message adapter for platform: {platform}")
         
     def register_message_handler(self, handler: Callable[[Message], Awaitable[None]]):
@@ -122,16 +189,143 @@ class MessageProcessor:
         self.message_handlers.append(handler)
         logger.info(f"Registered message handler: {handler.__name__}")
         
-    async def process_message(self, platform: str, raw_message: Dict[str, Any]) -> Optional[Message]:
+    def get_conversation_key(self, platform: str, raw_message: Dict[str, Any]) -> str:
+        """
+        Get the conversation a raw platform message belongs to
+        
+        Uses the platform's conversation key getter when one is registered, so
+        the message is not normalized twice; otherwise runs the adapter.
+        
+        Args:
+            platform: Platform name
+            raw_message: Raw message data from the platform
+            
+        Returns:
+            Conversation key, or the platform name if the message has none
+        """
+        getter = self.conversation_key_getters.get(platform)
+        if getter:
+            try:
+                key = getter(raw_message)
+            except Exception as e:
+                logger.warning(f"Could not read {platform} conversation key: {str(e)}")
+                key = None
+            return f"{platform}:{key}" if key else platform
+            
+        adapter = self.platform_adapters.get(platform)
+        if not adapter:
+            return platform
+            
+        try:
+            return adapter(raw_message).conversation_id
+        except Exception as e:
+            logger.warning(f"Could not determine conversation for {platform} message: {str(e)}")
+            return platform
+        
+    async def is_duplicate(self, platform: str, raw_message: Dict[str, Any]) -> bool:
+        """
+        Check whether a raw message was already received, and claim it
+        
+        Messages without a platform message ID are never duplicates. The
+        claim expires unless complete_message() is called, so a message whose
+        processing was interrupted is accepted again.
+        
+        Args:
+            platform: Platform name
+            raw_message: Raw message data from the platform
+            
+        Returns:
+            True if the message is a redelivery of one seen before
+        """
+        key = self._dedup_key(platform, raw_message)
+        if key is None:
+            return False
+        return await self.dedup_index.claim_async(key)
+        
+    async def complete_message(self, platform: str, raw_message: Dict[str, Any]):
+        """
+        Mark a raw message as handled in the dedup index, once its reply is queued
+        
+        Only call this for a message that was processed: the claim of a
+        dropped duplicate belongs to the original, which may still fail.
+        
+        Args:
+            platform: Platform name
+            raw_message: Raw message data from the platform
+        """
+        key = self._dedup_key(platform, raw_message)
+        if key is not None:
+            await self.dedup_index.mark_done_async(key)
+            
+    async def forget_message(self, platform: str, raw_message: Dict[str, Any]):
+        """
+        Forget a raw message in the dedup index after its processing failed,
+        so a redelivery or retry of the message is processed again
+        
+        Args:
+            platform: Platform name
+            raw_message: Raw message data from the platform
+        """
+        key = self._dedup_key(platform, raw_message)
+        if key is not None:
+            await self.dedup_index.discard_async(key)
+            
+    def get_message_key(self, platform: str, raw_message: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the platform-qualified ID of a raw message
+        
+        The key is the same for every delivery of the message, so it also
+        identifies the message's workflow execution across redeliveries.
+        
+        Args:
+            platform: Platform name
+            raw_message: Raw message data from the platform
+            
+        Returns:
+            Key such as 'facebook:<mid>', or None if the message has no ID
+        """
+        getter = self.message_id_getters.get(platform)
+        if getter is None:
+            return None
+            
+        try:
+            message_id = getter(raw_message)
+        except Exception as e:
+            logger.warning(f"Could not read {platform} message ID: {str(e)}")
+            return None
+            
+        return f"{platform}:{message_id}" if message_id else None
+        
+    def _dedup_key(self, platform: str, raw_message: Dict[str, Any]) -> Optional[str]:
+        """Get the dedup index key of a raw message, or None if it has none"""
+        if self.dedup_index is None:
+            return None
+        return self.get_message_key(platform, raw_message)
+        
+    def get_dedup_stats(self) -> Dict[str, Any]:
+        """
+        Get webhook deduplication statistics
+        
+        Returns:
+            Checked and duplicate counts and the dedup rate
+        """
+        if self.dedup_index is None:
+            return {'enabled': False}
+        return dict(self.dedup_index.get_stats(), enabled=True)
+        
+    async def process_message(self, platform: str, raw_message: Dict[str, Any],
+                              deduplicate: bool = True) -> Optional[Message]:
         """
         Process a message from a specific platform
         
         Args:
             platform: Platform name
             raw_message: Raw message data from the platform
+            deduplicate: Whether to claim the message first; False if the caller
+                already claimed it with is_duplicate()
             
         Returns:
-            Processed message or None if not applicable
+            Processed message or None if not applicable (including redeliveries)
         """
         logger.debug(f"Processing message from {platform}")
         
@@ -140,6 +334,11 @@ class MessageProcessor:
             logger.warning(f"No adapter registered for platform: {platform}")
             return None
             
+        # Drop webhook redeliveries before any further work
+        if deduplicate and await self.is_duplicate(platform, raw_message):
+            logger.info(f"Dropping duplicate {platform} message")
+            return None
+            
         try:
             # Use the adapter to convert to a normalized Message
             message = self.platform_adapters[platform](raw_message)
@@ -156,7 +355,7 @@ class MessageProcessor:
 
 
 # Create global processor instance
-processor = MessageProcessor()
+processor = MessageProcessor(dedup_index=create_dedup_index())
 
 
 # Workflow step for message processing
@@ -165,18 +364,20 @@ async def process_message_step(context: Dict[str, Any]) -> Dict[str, Any]:
     Workflow step for processing a message
     
     Args:
-        context: Workflow context with platform and raw_message
+        context: Workflow context with platform and raw_message, and
+            message_claimed if the caller already claimed the message
         
     Returns:
-        Context with processed message
+        Context with the processed Message (None if not applicable)
     """
     platform = context['platform']
     raw_message = context['raw_message']
     
-    message = await processor.process_message(platform, raw_message)
+    message = await processor.process_message(platform, raw_message,
+                                              deduplicate=not context.get('message_claimed'))
     
     return {
-        'message': message.to_dict() if message else None
+        'message': message
     }
 
 
@@ -185,6 +386,7 @@ process_message_workflow_step = WorkflowStep(
     name="process_message",
     handler=process_message_step,
     required_inputs=["platform", "raw_message"],
+    optional_inputs=["message_claimed"],
     output_keys=["message"]
 )
 
@@ -267,7 +469,13 @@ def whatsapp_message_adapter(raw_message: Dict[str, Any]) -> Message:
     )
 
 
-# Register the standard platform adapters
-processor.register_platform_adapter('facebook', facebook_message_adapter)
-processor.register_platform_adapter('instagram', instagram_message_adapter)
-processor.register_platform_adapter('whatsapp', whatsapp_message_adapter)
\ No newline at end of file
+# Register the standard platform adapters; conversations are one thread per sender
+processor.register_platform_adapter('facebook', facebook_message_adapter,
+                                    lambda raw: raw.get('message', {}).get('mid'),
+                                    lambda raw: raw.get('sender', {}).get('id'))
+processor.register_platform_adapter('instagram', instagram_message_adapter,
+                                    lambda raw: raw.get('message', {}).get('mid'),
+                                    lambda raw: raw.get('sender', {}).get('id'))
+processor.register_platform_adapter('whatsapp', whatsapp_message_adapter,
+                                    lambda raw: raw.get('id'),
+                                    lambda raw: raw.get('from'))
\ No newline at end of file
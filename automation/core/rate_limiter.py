@@ -0,0 +1,119 @@
+"""
+Rate Limiting Primitives for Dana AI
+
+This module provides an asyncio token bucket for pacing calls to external
+APIs and the jittered exponential backoff used when retrying them.
+"""
+
+import time
+import random
+import asyncio
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the rate of calls on the event loop
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second (sustained calls per second)
+            capacity: Maximum tokens held (burst size, defaults to rate)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available"""
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """
+        Take tokens if they are available, without waiting
+
+        Args:
+            tokens: Number of tokens
+
+        Returns:
+            Whether the tokens were taken
+        """
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """
+        Get the seconds until tokens are available, without taking them
+
+        Args:
+            tokens: Number of tokens
+
+        Returns:
+            Seconds to wait (0 if the tokens are available now)
+        """
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """
+        Take tokens, waiting until they are available
+
+        Waiters are served in order.
+
+        Args:
+            tokens: Number of tokens
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+        return waited
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens for a while, e.g. after the API reported a rate limit
+
+        Args:
+            seconds: Seconds before tokens are available again
+        """
+        self._refill()
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 30.0) -> float:
+    """
+    Get the delay before a retry, using exponential backoff with full jitter
+
+    Args:
+        attempt: Retry number, starting at 1
+        base_delay: Delay ceiling of the first retry in seconds
+        max_delay: Maximum delay in seconds
+
+    Returns:
+        Seconds to wait
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
@@ -0,0 +1,415 @@
+"""
+Webhook Ingestion Spool for Dana AI
+
+Webhook requests should be acknowledged before the platform times out, no
+matter how long the AI response takes. This module provides a durable spool
+(SQLite in WAL mode) that webhook handlers append raw events to, and a pool
+of async workers that drain it into the platform handlers.
+
+Delivery is at-least-once: an event is deleted only after its handler
+succeeds. Claimed events are leased, so events held by a worker that died
+are picked up again once the lease expires; failed events are retried with
+a delay and moved to a dead-letter state after too many attempts.
+
+SQLite calls run in a thread (asyncio.to_thread) so a slow disk never
+blocks the event loop serving webhooks.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+from automation.core.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Spool worker defaults
+DEFAULT_NUM_WORKERS = 4
+DEFAULT_POLL_INTERVAL = 0.2
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 5
+
+
+class SpoolEntry:
+    """
+    A spooled webhook event
+    """
+
+    __slots__ = ('id', 'platform', 'payload', 'enqueued_at', 'attempts')
+
+    def __init__(self, id: int, platform: str, payload: Dict[str, Any], enqueued_at: float, attempts: int):
+        self.id = id
+        self.platform = platform
+        self.payload = payload
+        self.enqueued_at = enqueued_at
+        self.attempts = attempts
+
+
+class WebhookSpool:
+    """
+    Durable queue of raw webhook events backed by SQLite
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the spool
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                platform TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                dead INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS webhook_spool_available ON webhook_spool (dead, available_at)"
+        )
+
+    def append(self, platform: str, payload: Dict[str, Any]) -> int:
+        """
+        Append a raw webhook event
+
+        Args:
+            platform: Platform the event came from
+            payload: Parsed webhook body
+
+        Returns:
+            Spool entry ID
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO webhook_spool (platform, payload, enqueued_at, available_at) VALUES (?, ?, ?, ?)",
+                (platform, json.dumps(payload), now, now)
+            )
+        return cursor.lastrowid
+
+    def claim(self, limit: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[SpoolEntry]:
+        """
+        Claim the oldest available events
+
+        Claimed events are hidden from other workers until the lease expires.
+
+        Args:
+            limit: Maximum number of events to claim
+            lease_seconds: Seconds before an unacknowledged event is handed out again
+
+        Returns:
+            Claimed entries, oldest first
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute(
+                    "SELECT id, platform, payload, enqueued_at, attempts FROM webhook_spool "
+                    "WHERE dead = 0 AND available_at <= ? ORDER BY id LIMIT ?",
+                    (now, limit)
+                ).fetchall()
+                self._connection.executemany(
+                    "UPDATE webhook_spool SET available_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows]
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        return [SpoolEntry(id, platform, json.loads(payload), enqueued_at, attempts + 1)
+                for id, platform, payload, enqueued_at, attempts in rows]
+
+    def ack(self, entry_id: int):
+        """
+        Remove an event whose handler succeeded
+
+        Args:
+            entry_id: Spool entry ID
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM webhook_spool WHERE id = ?", (entry_id,))
+
+    def retry(self, entry_id: int, error: str, delay: float = DEFAULT_RETRY_DELAY):
+        """
+        Make a failed event available again after a delay
+
+        Args:
+            entry_id: Spool entry ID
+            error: Error message of the failed attempt
+            delay: Seconds before the event can be claimed again
+        """
+        with self._lock:
+            self._connection.execute(
+                "UPDATE webhook_spool SET available_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, entry_id)
+            )
+
+    def mark_dead(self, entry_id: int, error: str):
+        """
+        Stop delivering an event that keeps failing
+
+        Args:
+            entry_id: Spool entry ID
+            error: Error message of the last attempt
+        """
+        with self._lock:
+            self._connection.execute(
+                "UPDATE webhook_spool SET dead = 1, last_error = ? WHERE id = ?", (error, entry_id)
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get spool depth and lag
+
+        Returns:
+            Event counts (ready to claim, claimed or waiting for a retry, dead)
+            and the age of the oldest undelivered event
+        """
+        now = time.time()
+        with self._lock:
+            ready, delayed, oldest = self._connection.execute(
+                "SELECT COALESCE(SUM(available_at <= ?), 0), COALESCE(SUM(available_at > ?), 0), "
+                "MIN(enqueued_at) FROM webhook_spool WHERE dead = 0",
+                (now, now)
+            ).fetchone()
+            dead = self._connection.execute(
+                "SELECT COUNT(*) FROM webhook_spool WHERE dead = 1"
+            ).fetchone()[0]
+
+        return {
+            'depth': ready + delayed,
+            'ready': ready,
+            'delayed': delayed,
+            'dead': dead,
+            'lag_seconds': now - oldest if oldest is not None else 0.0
+        }
+
+    def close(self):
+        """Close the database connection"""
+        self._connection.close()
+
+
+class SpoolWorkers:
+    """
+    Pool of async workers draining a webhook spool into per-platform handlers
+    """
+
+    def __init__(self,
+                 spool: WebhookSpool,
+                 num_workers: int = DEFAULT_NUM_WORKERS,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 retry_delay: float = DEFAULT_RETRY_DELAY):
+        """
+        Initialize the workers
+
+        Args:
+            spool: Spool to drain
+            num_workers: Number of concurrent workers
+            poll_interval: Seconds an idle worker waits before checking the spool again
+            lease_seconds: Seconds a claimed event is hidden from other workers
+            max_attempts: Attempts before an event is moved to the dead-letter state
+            retry_delay: Seconds before a failed event is retried
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+
+        self.spool = spool
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.processed = 0
+        self.failed = 0
+        self.dead = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the workers are running"""
+        return bool(self._workers)
+
+    def register_handler(self, platform: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        """
+        Register the handler for a platform's spooled events
+
+        Args:
+            platform: Platform name
+            handler: Async function called with the spooled payload; raising
+                makes the event be retried
+        """
+        self.handlers[platform] = handler
+        logger.info(f"Registered spool handler for platform: {platform}")
+
+    async def start(self):
+        """
+        Start the workers on the running event loop
+
+        Does nothing if they already run there; workers left on a loop that
+        has since closed are replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if self._workers and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._workers = [
+            asyncio.create_task(self._run_worker(), name=f"spool-worker-{index}")
+            for index in range(self.num_workers)
+        ]
+        logger.info(f"Started {self.num_workers} spool workers")
+
+    async def stop(self):
+        """
+        Stop the workers
+
+        Events being handled are abandoned and redelivered after their lease expires.
+        """
+        if not self._workers:
+            return
+
+        if self._loop is asyncio.get_running_loop():
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._loop = None
+        logger.info("Stopped spool workers")
+
+    async def enqueue(self, platform: str, payload: Dict[str, Any]) -> int:
+        """
+        Spool a webhook event, starting the workers if they are not running
+
+        Args:
+            platform: Platform the event came from
+            payload: Parsed webhook body
+
+        Returns:
+            Spool entry ID
+        """
+        await self.start()
+        return await asyncio.to_thread(self.spool.append, platform, payload)
+
+    async def drain_once(self) -> bool:
+        """
+        Claim and handle a single event
+
+        Returns:
+            Whether an event was available
+        """
+        entries = await asyncio.to_thread(self.spool.claim, 1, self.lease_seconds)
+        if not entries:
+            return False
+
+        entry = entries[0]
+        lag = time.time() - entry.enqueued_at
+        self.last_lag = lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+        try:
+            handler = self.handlers.get(entry.platform)
+            if handler is None:
+                raise ValueError(f"No spool handler for platform: {entry.platform}")
+            await handler(entry.payload)
+        except Exception as e:
+            self.failed += 1
+            if entry.attempts >= self.max_attempts:
+                self.dead += 1
+                await asyncio.to_thread(self.spool.mark_dead, entry.id, str(e))
+                logger.error(f"Giving up on spooled {entry.platform} event {entry.id} "
+                             f"after {entry.attempts} attempts: {str(e)}")
+            else:
+                await asyncio.to_thread(self.spool.retry, entry.id, str(e), self.retry_delay)
+                logger.warning(f"Spooled {entry.platform} event {entry.id} failed "
+                               f"(attempt {entry.attempts}), retrying: {str(e)}")
+        else:
+            self.processed += 1
+            await asyncio.to_thread(self.spool.ack, entry.id)
+        return True
+
+    async def _run_worker(self):
+        """Handle spooled events until cancelled"""
+        while True:
+            try:
+                if not await self.drain_once():
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in spool worker: {str(e)}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get spool depth, lag and worker counters
+
+        Returns:
+            Spool and worker metrics
+        """
+        return {
+            'spool': self.spool.get_stats(),
+            'workers': len(self._workers),
+            'processed': self.processed,
+            'failed': self.failed,
+            'dead': self.dead,
+            'last_lag_seconds': self.last_lag,
+            'max_lag_seconds': self.max_lag
+        }
+
+
+_spool_workers: Optional[SpoolWorkers] = None
+
+
+def get_spool_workers() -> Optional[SpoolWorkers]:
+    """
+    Get the shared webhook spool workers, if spooling is enabled
+
+    Spooling is configured in the 'automation' configuration section:
+    webhook_spool (enable), webhook_spool_path, spool_workers,
+    spool_max_attempts and spool_retry_delay.
+
+    Returns:
+        The shared spool workers, or None if webhooks are processed inline
+    """
+    global _spool_workers
+    if _spool_workers is None and get_config('automation', 'webhook_spool', False):
+        path = get_config('automation', 'webhook_spool_path', os.path.join('instance', 'webhook_spool.db'))
+        _spool_workers = SpoolWorkers(
+            WebhookSpool(path),
+            num_workers=get_config('automation', 'spool_workers', DEFAULT_NUM_WORKERS),
+            max_attempts=get_config('automation', 'spool_max_attempts', DEFAULT_MAX_ATTEMPTS),
+            retry_delay=get_config('automation', 'spool_retry_delay', DEFAULT_RETRY_DELAY)
+        )
+        logger.info(f"Initialized webhook spool at {path}")
+    return _spool_workers
@@ -0,0 +1,341 @@
+"""
+Workflow Step Result Cache for Dana AI
+
+This module provides content-addressed caching of workflow step results.
+A cacheable step's declared inputs, or the values its cache key function
+picks from them, are hashed into a key, so executions that run the same
+step on the same inputs can reuse the earlier result instead of running
+the step again.
+
+Steps use get_async() and set_async(): the SQLite backend runs its queries
+in a thread (asyncio.to_thread) so a slow disk never stalls the event loop,
+while the in-memory backend is called directly.
+"""
+
+import os
+import json
+import asyncio
+import copy
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from automation.core.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration defaults
+DEFAULT_CACHE_TTL = 300  # 5 minutes in seconds
+DEFAULT_MAX_SIZE = 1000  # Maximum number of cached step results
+
+
+def _key_default(value: Any) -> Any:
+    """Make values JSON-serializable for cache keys"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    return str(value)
+
+
+def make_cache_key(step_name: str, context: Dict[str, Any], input_keys: List[str],
+                   key_inputs: Optional[Callable[[Dict[str, Any]], Any]] = None) -> str:
+    """
+    Build a content-addressed cache key for a step execution
+
+    Args:
+        step_name: Name of the step
+        context: The workflow context data
+        input_keys: Context keys the step reads
+        key_inputs: Function returning the values the step's result depends on,
+            used instead of the whole input values (e.g. only a message's text)
+
+    Returns:
+        Hex digest identifying the step and its input values
+    """
+    if key_inputs is not None:
+        inputs = key_inputs(context)
+    else:
+        inputs = {key: context[key] for key in input_keys if key in context}
+    payload = json.dumps([step_name, inputs], sort_keys=True, default=_key_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class StepCache:
+    """
+    Base class for step result caches
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_CACHE_TTL):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached step result
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached result or None if missing or expired
+        """
+        result = self._get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """
+        Store a step result
+
+        Args:
+            key: Cache key
+            result: The step's output dictionary
+        """
+        self._set(key, result)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached step result from a coroutine
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached result or None if missing or expired
+        """
+        return self.get(key)
+
+    async def set_async(self, key: str, result: Dict[str, Any]):
+        """
+        Store a step result from a coroutine
+
+        Args:
+            key: Cache key
+            result: The step's output dictionary
+        """
+        self.set(key, result)
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _set(self, key: str, result: Dict[str, Any]):
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all entries"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Hit/miss counters and size information
+        """
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'size': len(self),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+
+class MemoryStepCache(StepCache):
+    """
+    In-memory LRU cache with a TTL
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_CACHE_TTL):
+        super().__init__(max_size, ttl)
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        # Later steps may mutate what they get from the context
+        return copy.deepcopy(result)
+
+    def _set(self, key: str, result: Dict[str, Any]):
+        self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStepCache(StepCache):
+    """
+    On-disk LRU cache with a TTL, backed by SQLite
+
+    Results must be JSON-serializable. Entries survive process restarts.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_CACHE_TTL):
+        """
+        Initialize the cache
+
+        Args:
+            path: SQLite database file
+            max_size: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid
+        """
+        super().__init__(max_size, ttl)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS step_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS step_cache_accessed ON step_cache (accessed_at)"
+        )
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, stored_at FROM step_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, stored_at = row
+            if now - stored_at > self.ttl:
+                self._connection.execute("DELETE FROM step_cache WHERE key = ?", (key,))
+                return None
+
+            self._connection.execute(
+                "UPDATE step_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(value)
+
+    def _set(self, key: str, result: Dict[str, Any]):
+        value = self._encode(result)
+        if value is not None:
+            self._write(key, value)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: str, result: Dict[str, Any]):
+        # Encode on the event loop, where later steps may still change the result's values
+        value = self._encode(result)
+        if value is not None:
+            await asyncio.to_thread(self._write, key, value)
+
+    @staticmethod
+    def _encode(result: Dict[str, Any]) -> Optional[str]:
+        try:
+            return json.dumps(result)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Step result is not JSON-serializable, not caching: {str(e)}")
+            return None
+
+    def _write(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO step_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            count = self._connection.execute("SELECT COUNT(*) FROM step_cache").fetchone()[0]
+            overflow = count - self.max_size
+            if overflow > 0:
+                self._connection.execute(
+                    "DELETE FROM step_cache WHERE key IN "
+                    "(SELECT key FROM step_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM step_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM step_cache").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        self._connection.close()
+
+
+_default_cache: Optional[StepCache] = None
+
+
+def get_default_cache() -> StepCache:
+    """
+    Get the shared step cache used by cacheable steps without their own cache
+
+    The backend is chosen from the 'automation' configuration section:
+    step_cache_backend ('memory' or 'sqlite'), step_cache_path,
+    step_cache_max_size and step_cache_ttl.
+
+    Returns:
+        The shared step cache
+    """
+    global _default_cache
+    if _default_cache is None:
+        backend = get_config('automation', 'step_cache_backend', 'memory')
+        max_size = get_config('automation', 'step_cache_max_size', DEFAULT_MAX_SIZE)
+        ttl = get_config('automation', 'step_cache_ttl', DEFAULT_CACHE_TTL)
+
+        if backend == 'sqlite':
+            path = get_config('automation', 'step_cache_path', os.path.join('instance', 'step_cache.db'))
+            _default_cache = SQLiteStepCache(path, max_size=max_size, ttl=ttl)
+        else:
+            _default_cache = MemoryStepCache(max_size=max_size, ttl=ttl)
+
+        logger.info(f"Initialized {backend} step cache")
+    return _default_cache
@@ -0,0 +1,333 @@
+"""
+Workflow Execution Tracing for Dana AI
+
+This module keeps the per-execution timing record of a workflow run and
+defines the hook interface used to export it. Timings are taken with
+time.perf_counter_ns() and stored in slotted records, so recording stays
+cheap enough to leave on in production. Hooks receive the records as steps
+start and finish and can feed span exporters, histograms or trace files.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class StepRecord:
+    """
+    Timing and outcome of a single step execution
+    """
+
+    __slots__ = ('name', 'start_ns', 'end_ns', 'status', 'error')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = 0
+        self.status = 'running'
+        self.error: Optional[str] = None
+
+    def finish(self, status: str, error: Optional[str] = None):
+        """
+        Mark the step as finished
+
+        Args:
+            status: Outcome ('success', 'cached', 'error', 'timeout' or 'cancelled')
+            error: Error message, if any
+        """
+        self.end_ns = time.perf_counter_ns()
+        self.status = status
+        self.error = error
+
+    @property
+    def duration_ns(self) -> int:
+        """Step duration in nanoseconds (up to now if still running)"""
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    @property
+    def duration_seconds(self) -> float:
+        """Step duration in seconds"""
+        return self.duration_ns / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        data = {
+            'duration_seconds': self.duration_seconds,
+            'status': self.status
+        }
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class ExecutionRecord:
+    """
+    Timing record of one workflow execution and its steps
+    """
+
+    __slots__ = ('workflow', 'execution_id', 'started_at', 'start_ns', 'end_ns',
+                 'status', 'error', 'steps', 'hooks')
+
+    def __init__(self, workflow: str, execution_id: Optional[str] = None,
+                 hooks: Sequence['WorkflowHook'] = ()):
+        """
+        Initialize the record
+
+        Args:
+            workflow: Name of the workflow
+            execution_id: Execution ID, if assigned by the engine
+            hooks: Hooks notified as the execution progresses
+        """
+        self.workflow = workflow
+        self.execution_id = execution_id
+        self.started_at = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = 0
+        self.status = 'running'
+        self.error: Optional[str] = None
+        self.steps: Dict[str, StepRecord] = {}
+        self.hooks = hooks
+
+    def start_step(self, name: str) -> StepRecord:
+        """
+        Record the start of a step
+
+        Args:
+            name: Step name
+
+        Returns:
+            The new step record
+        """
+        step = StepRecord(name)
+        self.steps[name] = step
+        for hook in self.hooks:
+            try:
+                hook.on_step_start(self, step)
+            except Exception as e:
+                logger.warning(f"Tracing hook {type(hook).__name__} failed on step start: {str(e)}")
+        return step
+
+    def end_step(self, step: StepRecord, status: str, error: Optional[str] = None):
+        """
+        Record the end of a step
+
+        Args:
+            step: Record returned by start_step
+            status: Outcome of the step
+            error: Error message, if any
+        """
+        step.finish(status, error)
+        for hook in self.hooks:
+            try:
+                hook.on_step_end(self, step)
+            except Exception as e:
+                logger.warning(f"Tracing hook {type(hook).__name__} failed on step end: {str(e)}")
+
+    def finish(self, status: str, error: Optional[str] = None):
+        """
+        Record the end of the workflow execution
+
+        Args:
+            status: Outcome ('success', 'error' or 'timeout')
+            error: Error message, if any
+        """
+        self.end_ns = time.perf_counter_ns()
+        self.status = status
+        self.error = error
+        for hook in self.hooks:
+            try:
+                hook.on_workflow_end(self)
+            except Exception as e:
+                logger.warning(f"Tracing hook {type(hook).__name__} failed on workflow end: {str(e)}")
+
+    @property
+    def duration_ns(self) -> int:
+        """Execution duration in nanoseconds (up to now if still running)"""
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    @property
+    def duration_seconds(self) -> float:
+        """Execution duration in seconds"""
+        return self.duration_ns / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert to dictionary
+
+        Only called at I/O boundaries (persisting, exporting, API responses).
+        """
+        workflow = {
+            'name': self.workflow,
+            'execution_id': self.execution_id,
+            'started_at': self.started_at,
+            'duration_seconds': self.duration_seconds,
+            'status': self.status
+        }
+        if self.error is not None:
+            workflow['error'] = self.error
+
+        return {
+            'workflow': workflow,
+            'step_execution': {name: step.to_dict() for name, step in self.steps.items()}
+        }
+
+
+def get_execution_record(context: Dict[str, Any]) -> Optional[ExecutionRecord]:
+    """
+    Get the execution record of a running workflow context
+
+    Args:
+        context: The workflow context data
+
+    Returns:
+        The execution record, or None if the context is not being executed
+        (a finished execution leaves the record's to_dict() in the metadata)
+    """
+    execution = context.get('_metadata', {}).get('execution')
+    return execution if isinstance(execution, ExecutionRecord) else None
+
+
+class WorkflowHook:
+    """
+    Base class for workflow tracing hooks
+
+    Hooks are called inline on the event loop and should return quickly;
+    exporters that do I/O should buffer.
+    """
+
+    def on_step_start(self, execution: ExecutionRecord, step: StepRecord):
+        """Called when a step starts"""
+        pass
+
+    def on_step_end(self, execution: ExecutionRecord, step: StepRecord):
+        """Called when a step finishes, whatever its outcome"""
+        pass
+
+    def on_workflow_end(self, execution: ExecutionRecord):
+        """Called when a workflow execution finishes, whatever its outcome"""
+        pass
+
+
+class JSONLTraceHook(WorkflowHook):
+    """
+    Appends one JSON line per finished workflow execution to a local file
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the hook
+
+        Args:
+            path: Trace file path
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', buffering=1, encoding='utf-8')
+
+    def on_workflow_end(self, execution: ExecutionRecord):
+        line = json.dumps(execution.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        """Close the trace file"""
+        with self._lock:
+            self._file.close()
+
+
+# Latency histogram bucket upper bounds in milliseconds
+DEFAULT_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    __slots__ = ('bounds_ns', 'counts', 'total_ns', 'count', 'max_ns')
+
+    def __init__(self, bounds_ns: List[int]):
+        self.bounds_ns = bounds_ns
+        self.counts = [0] * (len(bounds_ns) + 1)
+        self.total_ns = 0
+        self.count = 0
+        self.max_ns = 0
+
+    def observe(self, value_ns: int):
+        self.counts[bisect_left(self.bounds_ns, value_ns)] += 1
+        self.total_ns += value_ns
+        self.count += 1
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def percentile_ms(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                if index < len(self.bounds_ns):
+                    return self.bounds_ns[index] / 1e6
+                return self.max_ns / 1e6
+        return self.max_ns / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'avg_ms': self.total_ns / self.count / 1e6 if self.count else 0.0,
+            'max_ms': self.max_ns / 1e6,
+            'p50_ms': self.percentile_ms(0.5),
+            'p95_ms': self.percentile_ms(0.95),
+            'p99_ms': self.percentile_ms(0.99)
+        }
+
+
+class LatencyHistogramHook(WorkflowHook):
+    """
+    Aggregates step and workflow durations into latency histograms
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        """
+        Initialize the hook
+
+        Args:
+            buckets_ms: Bucket upper bounds in milliseconds
+        """
+        self._bounds_ns = [int(bound * 1e6) for bound in sorted(buckets_ms)]
+        self._steps: Dict[str, LatencyHistogram] = {}
+        self._workflows: Dict[str, LatencyHistogram] = {}
+
+    def _histogram(self, histograms: Dict[str, LatencyHistogram], name: str) -> LatencyHistogram:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = LatencyHistogram(self._bounds_ns)
+        return histogram
+
+    def on_step_end(self, execution: ExecutionRecord, step: StepRecord):
+        self._histogram(self._steps, f"{execution.workflow}.{step.name}").observe(step.duration_ns)
+
+    def on_workflow_end(self, execution: ExecutionRecord):
+        self._histogram(self._workflows, execution.workflow).observe(execution.duration_ns)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get latency statistics
+
+        Returns:
+            Count, average, max and approximate percentiles per workflow and step
+        """
+        return {
+            'workflows': {name: histogram.to_dict() for name, histogram in self._workflows.items()},
+            'steps': {name: histogram.to_dict() for name, histogram in self._steps.items()}
+        }
@@ -7,11 +7,43 @@ message processing, AI response generation, and task management processes.
 
 import logging
 import asyncio
-from typing import Dict, Any, List, Callable, Awaitable, Optional, Union, cast
-from datetime import datetime
+import time
+import uuid
+from typing import (Dict, Any, List, Callable, Awaitable, Optional, Set, Union, Tuple,
+                    Iterable, AsyncIterable, AsyncIterator, Sequence, cast)
+
+from automation.core.checkpoint import SQLiteCheckpointStore
+from automation.core.config import get_config
+from automation.core.executors import EXECUTOR_KINDS, StepExecutors
+from automation.core.step_cache import StepCache, get_default_cache, make_cache_key
+from automation.core.tracing import ExecutionRecord, WorkflowHook, get_execution_record
 
 logger = logging.getLogger(__name__)
 
+
+class WorkflowTimeoutError(TimeoutError):
+    """Raised when a step exceeds its timeout or the workflow deadline"""
+    pass
+
+
+def get_remaining_time(context: Dict[str, Any]) -> Optional[float]:
+    """
+    Get the time left before the workflow deadline carried in a context
+    
+    Step handlers can use this to budget their own I/O.
+    
+    Args:
+        context: The workflow context data
+        
+    Returns:
+        Seconds until the deadline (never negative), or None if there is no deadline
+    """
+    deadline = context.get('_metadata', {}).get('deadline')
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
 class WorkflowStep:
     """
     Represents a single step in a workflow process
@@ -19,7 +51,12 @@ class WorkflowStep:
     def __init__(self, name: str, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
                  required_inputs: Optional[List[str]] = None, 
                  optional_inputs: Optional[List[str]] = None,
-                 output_keys: Optional[List[str]] = None):
+                 output_keys: Optional[List[str]] = None,
+                 timeout: Optional[float] = None,
+                 cacheable: bool = False,
+                 cache: Optional[StepCache] = None,
+                 executor: Optional[str] = None,
+                 cache_key: Optional[Callable[[Dict[str, Any]], Any]] = None):
         """
         Initialize a workflow step
         
@@ -29,12 +66,76 @@ class WorkflowStep:
             required_inputs: List of input keys this step requires
             optional_inputs: List of optional input keys
             output_keys: List of keys this step produces in its output
+            timeout: Maximum seconds the handler may run (None for no limit)
+            cacheable: Whether results may be reused for identical inputs; the
+                handler must depend only on its declared inputs
+            cache: Cache for this step's results (defaults to the shared step cache)
+            executor: Run the handler in the engine's 'thread' or 'process' pool
+                instead of on the event loop. The handler must then be a plain
+                function taking a dict of only the declared inputs and returning
+                the output dict; for 'process' it must be a picklable module-level
+                function.
+            cache_key: Function returning the input values the result depends on,
+                when that is less than the declared inputs (defaults to all of them)
         """
+        if executor is not None and executor not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor for step '{name}': {executor}")
+            
         self.name = name
         self.handler = handler
         self.required_inputs = required_inputs or []
         self.optional_inputs = optional_inputs or []
         self.output_keys = output_keys or []
+        self.timeout = timeout
+        self.cacheable = cacheable
+        self._cache = cache
+        self.executor = executor
+        self.cache_key = cache_key
+        
+    @property
+    def cache(self) -> Optional[StepCache]:
+        """The cache for this step's results, if it is cacheable"""
+        if not self.cacheable:
+            return None
+        if self._cache is None:
+            self._cache = get_default_cache()
+        return self._cache
+
+    @property
+    def reads(self) -> Set[str]:
+        """Context keys this step reads (required and optional inputs)"""
+        return set(self.required_inputs) | set(self.optional_inputs)
+
+    @property
+    def writes(self) -> Set[str]:
+        """Context keys this step writes"""
+        return set(self.output_keys)
+
+    @property
+    def is_opaque(self) -> bool:
+        """Whether this step declares no inputs or outputs at all"""
+        return not (self.required_inputs or self.optional_inputs or self.output_keys)
+
+    def depends_on(self, earlier: 'WorkflowStep') -> bool:
+        """
+        Check whether this step must run after an earlier registered step
+        
+        A step depends on an earlier one when it reads a key the earlier step
+        writes, writes a key the earlier step reads or writes, or when either
+        step declares nothing (and so cannot be reordered safely).
+        
+        Args:
+            earlier: A step registered before this one
+            
+        Returns:
+            Whether this step has to wait for the earlier step
+        """
+        if self.is_opaque or earlier.is_opaque:
+            return True
+        earlier_writes = earlier.writes
+        return bool(self.reads & earlier_writes or
+                    self.writes & earlier_writes or
+                    self.writes & earlier.reads)
 
     async def execute(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -53,10 +154,40 @@ class WorkflowStep:
         if missing_inputs:
             raise ValueError(f"Missing required inputs for step '{self.name}': {missing_inputs}")
         
+        execution = get_execution_record(context)
+        if execution is None:
+            # Step executed on its own, outside a workflow
+            execution = ExecutionRecord(self.name)
+            context.setdefault('_metadata', {})['execution'] = execution
+        record = execution.start_step(self.name)
+        
+        # Reuse an earlier result for identical inputs
+        cache = self.cache
+        cache_key = None
+        if cache is not None:
+            cache_key = make_cache_key(self.name, context, self.required_inputs + self.optional_inputs,
+                                       self.cache_key)
+            cached_result = await cache.get_async(cache_key)
+            if cached_result is not None:
+                context.update(cached_result)
+                execution.end_step(record, 'cached')
+                logger.debug(f"Served step '{self.name}' from cache")
+                return context
+        
+        # The step may not outlive its own timeout or the workflow deadline
+        timeout = self.timeout
+        remaining = get_remaining_time(context)
+        if remaining is not None and (timeout is None or remaining < timeout):
+            timeout = remaining
+            
         # Execute the handler
-        start_time = datetime.now()
         try:
-            result = await self.handler(context)
+            if timeout is not None and timeout <= 0:
+                raise WorkflowTimeoutError(f"Workflow deadline exceeded before step '{self.name}'")
+            if timeout is None:
+                result = await self._run_handler(context)
+            else:
+                result = await self._run_handler_with_timeout(context, timeout)
             
             # Verify the handler returned all expected outputs
             missing_outputs = [key for key in self.output_keys if key not in result]
@@ -65,78 +196,191 @@ class WorkflowStep:
             
             # Update context with results
             context.update(result)
+            if cache_key is not None:
+                await cache.set_async(cache_key, result)
             
             # Add execution metadata
-            duration = (datetime.now() - start_time).total_seconds()
-            if '_metadata' not in context:
-                context['_metadata'] = {}
-            if 'step_execution' not in context['_metadata']:
-                context['_metadata']['step_execution'] = {}
-            
-            context['_metadata']['step_execution'][self.name] = {
-                'start_time': start_time.isoformat(),
-                'duration_seconds': duration,
-                'status': 'success'
-            }
-            
-            logger.debug(f"Completed step '{self.name}' in {duration:.2f}s")
+            execution.end_step(record, 'success')
+            
+            logger.debug(f"Completed step '{self.name}' in {record.duration_seconds:.2f}s")
             return context
             
-        except Exception as e:
-            duration = (datetime.now() - start_time).total_seconds()
-            logger.error(f"Error executing step '{self.name}': {str(e)}", exc_info=True)
+        except asyncio.CancelledError:
+            # Cancelled by the workflow (a sibling step failed or the caller gave up)
+            execution.end_step(record, 'cancelled')
+            logger.warning(f"Step '{self.name}' cancelled after {record.duration_seconds:.2f}s")
+            raise
             
+        except WorkflowTimeoutError as e:
+            execution.end_step(record, 'timeout', str(e))
+            logger.error(f"Timeout executing step '{self.name}': {str(e)}")
+            raise
+            
+        except Exception as e:
             # Record error in metadata
-            if '_metadata' not in context:
-                context['_metadata'] = {}
-            if 'step_execution' not in context['_metadata']:
-                context['_metadata']['step_execution'] = {}
-                
-            context['_metadata']['step_execution'][self.name] = {
-                'start_time': start_time.isoformat(),
-                'duration_seconds': duration,
-                'status': 'error',
-                'error': str(e)
-            }
+            execution.end_step(record, 'error', str(e))
+            logger.error(f"Error executing step '{self.name}': {str(e)}", exc_info=True)
+            raise
+
+
+    async def _run_handler_with_timeout(self, context: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """
+        Run the handler, cancelling it once the timeout has passed
+        
+        Only running out of time raises WorkflowTimeoutError; a TimeoutError
+        raised by the handler itself (a socket or HTTP timeout) passes through.
+        
+        Args:
+            context: The workflow context data
+            timeout: Seconds the handler may run
             
+        Returns:
+            The handler's output dict
+        """
+        task = asyncio.ensure_future(self._run_handler(context))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+        except asyncio.CancelledError:
+            task.cancel()
             raise
+            
+        if not done:
+            task.cancel()
+            await asyncio.wait({task})
+            raise WorkflowTimeoutError(f"Step '{self.name}' timed out after {timeout:.2f}s")
+        return task.result()
+        
+    def _run_handler(self, context: Dict[str, Any]) -> Awaitable[Dict[str, Any]]:
+        """
+        Start the handler on the event loop or in the configured pool
+        
+        Args:
+            context: The workflow context data
+            
+        Returns:
+            Awaitable resolving to the handler's output dict
+        """
+        if self.executor is None:
+            return self.handler(context)
+            
+        # Only the declared inputs cross the pool boundary
+        inputs = {key: context[key] for key in self.reads if key in context}
+        executors = context['_metadata'].get('executors') or engine.executors
+        return executors.run(self.executor, self.handler, inputs)
 
 
 class Workflow:
     """
     Represents a complete workflow of multiple steps
     """
-    def __init__(self, name: str, description: str = ""):
+    def __init__(self, name: str, description: str = "", timeout: Optional[float] = None,
+                 checkpoint: bool = False):
         """
         Initialize a workflow
         
         Args:
             name: The name of the workflow
             description: A description of what this workflow does
+            timeout: Default deadline in seconds for each execution (None for no limit)
+            checkpoint: Whether to persist the context after each step so an
+                interrupted execution can be resumed (needs an engine checkpoint store)
         """
         self.name = name
         self.description = description
+        self.timeout = timeout
+        self.checkpoint = checkpoint
         self.steps: List[WorkflowStep] = []
+        # Indices of the steps each step has to wait for, built at registration
+        self.dependencies: List[Set[int]] = []
+        self.is_sequential = True
         
     def add_step(self, step: WorkflowStep) -> 'Workflow':
         """
         Add a step to this workflow
         
+        The step's dependencies on previously added steps are resolved from
+        its declared inputs and outputs, so independent steps can later run
+        concurrently.
+        
         Args:
             step: The workflow step to add
             
         Returns:
             Self for method chaining
         """
+        dependencies = {index for index, earlier in enumerate(self.steps) if step.depends_on(earlier)}
+        if self.steps and len(self.steps) - 1 not in dependencies:
+            self.is_sequential = False
+            
         self.steps.append(step)
+        self.dependencies.append(dependencies)
         return self
         
-    async def execute(self, initial_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def _execute_graph(self, context: Dict[str, Any],
+                             run_step_once: Callable[[WorkflowStep, Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Execute the steps as a dependency graph
+        
+        Every step starts as soon as the steps it depends on have completed,
+        so independent steps run concurrently on the shared context.
+        
+        Args:
+            context: The workflow context data
+            run_step_once: Runs (or restores) a single step
+            
+        Returns:
+            The context after all steps have executed
+        """
+        tasks: List[asyncio.Task] = []
+        
+        async def run_step(index: int):
+            dependencies = self.dependencies[index]
+            if dependencies:
+                await asyncio.gather(*(tasks[dependency] for dependency in dependencies))
+            await run_step_once(self.steps[index], context)
+            
+        for index in range(len(self.steps)):
+            tasks.append(asyncio.create_task(run_step(index)))
+            
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Don't leave independent steps running after a failure
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+            
+        return context
+        
+    async def execute(self, initial_context: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None,
+                      hooks: Sequence[WorkflowHook] = (),
+                      executors: Optional[StepExecutors] = None,
+                      checkpoint_store: Optional[SQLiteCheckpointStore] = None,
+                      completed_steps: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         """
         Execute the entire workflow
         
+        The deadline is stored in the context metadata (monotonic clock) so
+        every step, including nested workflows, is bounded by it. Steps still
+        running when it passes are cancelled.
+        
+        Timings are kept in an ExecutionRecord under _metadata['execution']
+        while the workflow runs; once it finishes, that key holds the record's
+        to_dict(), so the returned metadata can be serialized.
+        
         Args:
             initial_context: Optional initial context data
+            timeout: Seconds this execution may take (defaults to the workflow timeout)
+            hooks: Tracing hooks notified as steps and the workflow finish
+            executors: Pools for steps with an executor (defaults to the global engine's)
+            checkpoint_store: Where to checkpoint the context after each step, if
+                this workflow is checkpointed; the checkpoint is removed on success
+                unless _metadata['keep_checkpoint'] is set, in which case the caller
+                discards it once the result has been used (e.g. the reply was sent)
+            completed_steps: Names of steps already completed by an earlier,
+                interrupted run whose outputs are in the context; they are skipped
             
         Returns:
             The final context after all steps have executed
@@ -146,48 +390,86 @@ class Workflow:
         # Add workflow metadata
         if '_metadata' not in context:
             context['_metadata'] = {}
+        metadata = context['_metadata']
+            
+        timeout = timeout if timeout is not None else self.timeout
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            existing_deadline = metadata.get('deadline')
+            if existing_deadline is None or deadline < existing_deadline:
+                metadata['deadline'] = deadline
+        
+        execution = ExecutionRecord(self.name, metadata.get('execution_id'), hooks)
+        metadata['execution'] = execution
+        if executors is not None:
+            metadata['executors'] = executors
+            
+        completed = set(completed_steps or ())
+        execution_id = metadata.get('execution_id')
+        store = checkpoint_store if self.checkpoint and execution_id else None
         
-        context['_metadata']['workflow'] = {
-            'name': self.name,
-            'start_time': datetime.now().isoformat(),
-            'num_steps': len(self.steps)
-        }
+        async def run_step_once(step: WorkflowStep, context: Dict[str, Any]) -> Dict[str, Any]:
+            if step.name in completed:
+                # Outputs were restored from a checkpoint
+                execution.end_step(execution.start_step(step.name), 'restored')
+                return context
+            context = await step.execute(context)
+            completed.add(step.name)
+            if store is not None:
+                await store.save_async(execution_id, self.name, completed, context)
+            return context
         
         logger.info(f"Starting workflow '{self.name}' with {len(self.steps)} steps")
         
-        # Execute each step in sequence
+        # Execute the steps in sequence, or as a graph when some are independent
         try:
-            for step in self.steps:
-                context = await step.execute(context)
+            if self.is_sequential:
+                for step in self.steps:
+                    context = await run_step_once(step, context)
+            else:
+                context = await self._execute_graph(context, run_step_once)
                 
             # Record completion
-            duration = (datetime.now() - datetime.fromisoformat(context['_metadata']['workflow']['start_time'])).total_seconds()
-            context['_metadata']['workflow']['end_time'] = datetime.now().isoformat()
-            context['_metadata']['workflow']['duration_seconds'] = duration
-            context['_metadata']['workflow']['status'] = 'success'
+            execution.finish('success')
+            if store is not None and not metadata.get('keep_checkpoint'):
+                await asyncio.to_thread(store.delete, execution_id)
             
-            logger.info(f"Completed workflow '{self.name}' in {duration:.2f}s")
+            logger.info(f"Completed workflow '{self.name}' in {execution.duration_seconds:.2f}s")
             return context
             
         except Exception as e:
             # Record error in metadata
-            duration = (datetime.now() - datetime.fromisoformat(context['_metadata']['workflow']['start_time'])).total_seconds()
-            context['_metadata']['workflow']['end_time'] = datetime.now().isoformat()
-            context['_metadata']['workflow']['duration_seconds'] = duration
-            context['_metadata']['workflow']['status'] = 'error'
-            context['_metadata']['workflow']['error'] = str(e)
+            execution.finish('timeout' if isinstance(e, WorkflowTimeoutError) else 'error', str(e))
             
             logger.error(f"Error in workflow '{self.name}': {str(e)}", exc_info=True)
             raise
+            
+        finally:
+            # Keep the live record and pools internal to the execution
+            metadata['execution'] = execution.to_dict()
+            if executors is not None:
+                metadata.pop('executors', None)
 
 
 class WorkflowEngine:
     """
     Engine that manages and executes workflows
     """
-    def __init__(self):
+    def __init__(self, max_threads: Optional[int] = None, max_processes: Optional[int] = None,
+                 checkpoint_store: Optional[SQLiteCheckpointStore] = None):
+        """
+        Initialize the engine
+        
+        Args:
+            max_threads: Size of the thread pool for steps with executor='thread'
+            max_processes: Size of the process pool for steps with executor='process'
+            checkpoint_store: Durable store for workflows created with checkpoint=True
+        """
         self.workflows: Dict[str, Workflow] = {}
         self.default_context: Dict[str, Any] = {}
+        self.hooks: List[WorkflowHook] = []
+        self.executors = StepExecutors(max_threads, max_processes)
+        self.checkpoint_store = checkpoint_store
     
     def register_workflow(self, workflow: Workflow):
         """
@@ -199,6 +481,34 @@ class WorkflowEngine:
         self.workflows[workflow.name] = workflow
         logger.info(f"Registered workflow: {workflow.name}")
         
+    def register_hook(self, hook: WorkflowHook):
+        """
+        Register a tracing hook for all workflow executions
+        
+        Args:
+            hook: The hook to notify on step start/end and workflow end
+        """
+        self.hooks.append(hook)
+        logger.info(f"Registered workflow hook: {type(hook).__name__}")
+        
+    def get_executor_stats(self) -> Dict[str, Any]:
+        """
+        Get size and utilization of the step thread and process pools
+        
+        Returns:
+            Statistics per pool kind
+        """
+        return self.executors.get_stats()
+        
+    def shutdown(self, wait: bool = True):
+        """
+        Shut down the engine's step pools
+        
+        Args:
+            wait: Whether to wait for running steps to finish
+        """
+        self.executors.shutdown(wait)
+        
     def set_default_context(self, context: Dict[str, Any]):
         """
         Set default context values for all workflow executions
@@ -208,17 +518,38 @@ class WorkflowEngine:
         """
         self.default_context = context
         
-    async def execute_workflow(self, workflow_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def execute_workflow(self, workflow_name: str, context: Optional[Dict[str, Any]] = None,
+                               timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Execute a registered workflow by name
         
         Args:
             workflow_name: Name of the workflow to execute
             context: Optional context to merge with default context
+            timeout: Optional deadline in seconds for this execution
             
         Returns:
             The final context after workflow execution
         """
+        full_context = self._prepare_context(workflow_name, context)
+        
+        # Execute the workflow
+        logger.info(f"Executing workflow: {workflow_name}")
+        return await self.workflows[workflow_name].execute(full_context, timeout=timeout, hooks=self.hooks,
+                                                           executors=self.executors,
+                                                           checkpoint_store=self.checkpoint_store)
+        
+    def _prepare_context(self, workflow_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Build the full execution context for a workflow run
+        
+        Args:
+            workflow_name: Name of the workflow to execute
+            context: Optional context to merge with default context
+            
+        Returns:
+            The default context merged with the given context, with an execution ID
+        """
         if workflow_name not in self.workflows:
             raise ValueError(f"Unknown workflow: {workflow_name}")
             
@@ -227,45 +558,282 @@ class WorkflowEngine:
         if context:
             full_context.update(context)
             
-        # Add execution ID
-        if '_metadata' not in full_context:
-            full_context['_metadata'] = {}
-        full_context['_metadata']['execution_id'] = f"{workflow_name}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{id(full_context)}"
+        # Add execution ID (metadata is copied so defaults are never shared between runs).
+        # A caller-supplied ID is kept so the execution can be resumed under it.
+        full_context['_metadata'] = dict(full_context.get('_metadata') or {})
+        execution_id = ((context or {}).get('_metadata') or {}).get('execution_id')
+        full_context['_metadata']['execution_id'] = execution_id or f"{workflow_name}_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}"
         
-        # Execute the workflow
-        logger.info(f"Executing workflow: {workflow_name}")
-        return await self.workflows[workflow_name].execute(full_context)
+        return full_context
+        
+    async def resume_workflow(self, execution_id: str, timeout: Optional[float] = None,
+                              keep_checkpoint: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Resume an interrupted execution from its last checkpoint
+        
+        Steps completed before the interruption are skipped; their outputs
+        come from the checkpointed context.
+        
+        Args:
+            execution_id: ID of the interrupted execution
+            timeout: Optional deadline in seconds for the resumed execution
+            keep_checkpoint: Keep the checkpoint after success, until discard_checkpoint()
+            
+        Returns:
+            The final context, or None if there is no checkpoint for the execution
+        """
+        if self.checkpoint_store is None:
+            raise ValueError("No checkpoint store configured")
+            
+        checkpoint = await asyncio.to_thread(self.checkpoint_store.load, execution_id)
+        if checkpoint is None:
+            return None
+            
+        context = checkpoint.context
+        context['_metadata'] = {'execution_id': execution_id, 'resumed': True, 'keep_checkpoint': keep_checkpoint}
+        full_context = self._prepare_context(checkpoint.workflow, context)
+        
+        logger.info(f"Resuming workflow {checkpoint.workflow} ({execution_id}) after steps: {checkpoint.completed_steps}")
+        return await self.workflows[checkpoint.workflow].execute(
+            full_context,
+            timeout=timeout,
+            hooks=self.hooks,
+            executors=self.executors,
+            checkpoint_store=self.checkpoint_store,
+            completed_steps=checkpoint.completed_steps
+        )
+        
+    async def has_checkpoint(self, execution_id: str) -> bool:
+        """
+        Check whether an execution left a checkpoint to resume from
+        
+        Args:
+            execution_id: Execution ID
+            
+        Returns:
+            True if a checkpoint store is configured and holds the execution
+        """
+        if self.checkpoint_store is None:
+            return False
+        return await asyncio.to_thread(self.checkpoint_store.load, execution_id) is not None
+        
+    async def discard_checkpoint(self, execution_id: str):
+        """
+        Delete the checkpoint of an execution whose result has been used
+        
+        Args:
+            execution_id: Execution ID
+        """
+        if self.checkpoint_store is not None:
+            await asyncio.to_thread(self.checkpoint_store.delete, execution_id)
+        
+    async def resume_pending(self, older_than: float = 0, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Resume all executions left unfinished, e.g. after a worker restart
+        
+        Executions that fail again keep their checkpoint and are logged.
+        
+        Args:
+            older_than: Only resume checkpoints not updated for this many seconds
+            timeout: Optional deadline in seconds for each resumed execution
+            
+        Returns:
+            Final contexts of the executions that completed
+        """
+        if self.checkpoint_store is None:
+            return []
+            
+        results = []
+        for checkpoint in await asyncio.to_thread(self.checkpoint_store.list_pending, older_than):
+            if checkpoint.workflow not in self.workflows:
+                logger.warning(f"Cannot resume {checkpoint.execution_id}: unknown workflow {checkpoint.workflow}")
+                continue
+            try:
+                results.append(await self.resume_workflow(checkpoint.execution_id, timeout))
+            except Exception as e:
+                logger.error(f"Error resuming execution {checkpoint.execution_id}: {str(e)}")
+        return results
+        
+    async def execute_many(self,
+                           workflow_name: str,
+                           contexts: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+                           max_concurrency: int = 10,
+                           timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Execute a registered workflow for many contexts with bounded concurrency
+        
+        Contexts are pulled from the producer only when an execution slot is
+        free, so a lazy iterable or async generator is held back (backpressure)
+        instead of being drained into an unbounded set of tasks. A slot is
+        released once its result has been yielded, which also bounds the
+        number of finished results waiting on a slow consumer.
+        
+        Failed executions are yielded rather than raised; their context holds
+        an 'error' key and the error status in '_metadata'.
+        
+        Args:
+            workflow_name: Name of the workflow to execute
+            contexts: Iterable or async iterable of execution contexts
+            max_concurrency: Maximum number of executions in flight at once
+            timeout: Optional deadline in seconds for each execution
+            
+        Yields:
+            Tuples of (index of the context in the input, final context) as
+            executions finish
+        """
+        if workflow_name not in self.workflows:
+            raise ValueError(f"Unknown workflow: {workflow_name}")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+            
+        workflow = self.workflows[workflow_name]
+        
+        async def run(index: int, context: Optional[Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
+            full_context = self._prepare_context(workflow_name, context)
+            try:
+                return index, await workflow.execute(full_context, timeout=timeout, hooks=self.hooks,
+                                                     executors=self.executors,
+                                                     checkpoint_store=self.checkpoint_store)
+            except Exception as e:
+                full_context['error'] = str(e)
+                return index, full_context
+                
+        if isinstance(contexts, AsyncIterable):
+            iterator = contexts.__aiter__()
+            async def next_context() -> Dict[str, Any]:
+                return await iterator.__anext__()
+        else:
+            sync_iterator = iter(contexts)
+            async def next_context() -> Dict[str, Any]:
+                try:
+                    return next(sync_iterator)
+                except StopIteration:
+                    raise StopAsyncIteration
+                    
+        logger.info(f"Executing workflow {workflow_name} in bulk (max_concurrency={max_concurrency})")
+        
+        pending: Set[asyncio.Task] = set()
+        submitted = 0
+        exhausted = False
+        try:
+            while True:
+                # Only pull from the producer while there is a free slot
+                while not exhausted and len(pending) < max_concurrency:
+                    try:
+                        context = await next_context()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.create_task(run(submitted, context)))
+                    submitted += 1
+                    
+                if not pending:
+                    break
+                    
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # The consumer stopped early or was cancelled
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
 
 
 # Create a global workflow engine instance
-engine = WorkflowEngine()
+_checkpoint_path = get_config('automation', 'checkpoint_path')
+engine = WorkflowEngine(
+    max_threads=get_config('automation', 'step_thread_pool_size'),
+    max_processes=get_config('automation', 'step_process_pool_size'),
+    checkpoint_store=SQLiteCheckpointStore(_checkpoint_path) if _checkpoint_path else None
+)
+
+
+def register_hook(hook: WorkflowHook):
+    """
+    Convenience function to register a tracing hook with the global engine
+    
+    Args:
+        hook: The hook to register
+    """
+    engine.register_hook(hook)
 
 
-def create_workflow(name: str, description: str = "") -> Workflow:
+def create_workflow(name: str, description: str = "", timeout: Optional[float] = None,
+                    checkpoint: bool = False) -> Workflow:
     """
     Convenience function to create and register a new workflow
     
     Args:
         name: The workflow name
         description: Optional workflow description
+        timeout: Optional default deadline in seconds for each execution
+        checkpoint: Whether to checkpoint the context after each step
         
     Returns:
         The created workflow for further configuration
     """
-    workflow = Workflow(name, description)
+    workflow = Workflow(name, description, timeout, checkpoint)
     engine.register_workflow(workflow)
     return workflow
 
 
-async def execute_workflow(workflow_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+async def resume_workflow(execution_id: str, timeout: Optional[float] = None,
+                          keep_checkpoint: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Convenience function to resume an interrupted execution from its checkpoint
+    
+    Args:
+        execution_id: ID of the interrupted execution
+        timeout: Optional deadline in seconds for the resumed execution
+        keep_checkpoint: Keep the checkpoint after success, until discard_checkpoint()
+        
+    Returns:
+        The final context, or None if there is no checkpoint for the execution
+    """
+    return await engine.resume_workflow(execution_id, timeout, keep_checkpoint)
+
+
+async def discard_checkpoint(execution_id: str):
+    """
+    Convenience function to delete the checkpoint of an execution whose result has been used
+    
+    Args:
+        execution_id: Execution ID
+    """
+    await engine.discard_checkpoint(execution_id)
+
+
+async def execute_workflow(workflow_name: str, context: Optional[Dict[str, Any]] = None,
+                           timeout: Optional[float] = None) -> Dict[str, Any]:
     """
     Convenience function to execute a workflow by name
     
     Args:
         workflow_name: Name of the workflow to execute
         context: Optional execution context
+        timeout: Optional deadline in seconds for this execution
         
     Returns:
         The workflow execution result
     """
-    return await engine.execute_workflow(workflow_name, context)
\ No newline at end of file
+    return await engine.execute_workflow(workflow_name, context, timeout)
+
+def execute_many(workflow_name: str,
+                 contexts: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+                 max_concurrency: int = 10,
+                 timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Convenience function to execute a workflow for many contexts
+    
+    Args:
+        workflow_name: Name of the workflow to execute
+        contexts: Iterable or async iterable of execution contexts
+        max_concurrency: Maximum number of executions in flight at once
+        timeout: Optional deadline in seconds for each execution
+        
+    Returns:
+        Async iterator of (index, final context) tuples in completion order
+    """
+    return engine.execute_many(workflow_name, contexts, max_concurrency, timeout)
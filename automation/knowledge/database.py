@@ -10,6 +10,8 @@ import json
 from typing import Dict, Any, List, Optional
 
 from utils.db_connection import get_db_connection, execute_sql
+from automation.core.workflow_engine import WorkflowStep
+from automation.core.message_processor import ensure_message, message_content_key
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -182,4 +184,39 @@ async def get_knowledge_item(user_id: str, item_id: str) -> Optional[Dict[str, A
     # TODO: Implement actual knowledge base retrieval using database
     # This is a stub implementation that will be replaced
     
-    return None
\ No newline at end of file
+    return None
+
+# Workflow step for knowledge retrieval
+async def retrieve_knowledge_step(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Workflow step for retrieving knowledge relevant to a message
+    
+    Args:
+        context: Workflow context with the processed message
+        
+    Returns:
+        Context with the matching knowledge items
+    """
+    message = ensure_message(context['message'])
+    user_id = context.get('user_id')
+    
+    if not message or not message.content or not user_id:
+        return {'knowledge': []}
+        
+    knowledge = await search_knowledge_base(user_id, message.content, max_results=3)
+    
+    return {
+        'knowledge': knowledge
+    }
+
+
+# Create workflow step
+retrieve_knowledge_workflow_step = WorkflowStep(
+    name="retrieve_knowledge",
+    handler=retrieve_knowledge_step,
+    required_inputs=["message"],
+    optional_inputs=["user_id"],
+    output_keys=["knowledge"],
+    cacheable=True,
+    cache_key=message_content_key
+)
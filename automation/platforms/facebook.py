@@ -12,12 +12,17 @@ import hmac
 import hashlib
 import time
 from typing import Dict, Any, List, Optional, Union, Callable, Awaitable
-import aiohttp
 from datetime import datetime
 
 from automation.core.config import get_config
-from automation.core.workflow_engine import WorkflowStep, create_workflow, execute_workflow
+from automation.core.workflow_engine import WorkflowStep, create_workflow
 from automation.core.message_processor import processor as message_processor
+from automation.core.spool import get_spool_workers
+from automation.workflows.message_processing import (
+    complete_platform_message, handle_platform_message, register_reply_handler
+)
+from automation.platforms.fanout import DEFAULT_FANOUT_LIMIT, WebhookItem, dispatch_webhook_items
+from automation.platforms.outbound import account_key, outbound_sender
 
 logger = logging.getLogger(__name__)
 
@@ -31,19 +36,21 @@ class FacebookConnector:
         self.webhook_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
         self.verify_token = get_config('platforms', 'facebook_verify_token', '')
         self.app_secret = get_config('platforms', 'facebook_app_secret', '')
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.fanout_limit = get_config('platforms', 'webhook_fanout_limit', DEFAULT_FANOUT_LIMIT)
+        self.spool_workers = get_spool_workers()
         
     async def initialize(self):
         """Initialize the connector"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        await outbound_sender.start()
         logger.info("Facebook connector initialized")
         
     async def close(self):
-        """Close the connector"""
-        if self.session:
-            await self.session.close()
-            self.session = None
+        """
+        Close the connector
+        
+        The shared outbound sender is closed by automation.shutdown(), once all
+        connectors are closed.
+        """
         logger.info("Facebook connector closed")
         
     def register_webhook_handler(self, event_type: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
@@ -144,6 +151,11 @@ class FacebookConnector:
             logger.info("Webhook verification successful")
             return {'challenge': challenge}
             
+        # Spool the event and acknowledge at once; the spool workers process it
+        if self.spool_workers is not None:
+            entry_id = await self.spool_workers.enqueue('facebook', data)
+            return {'status': 'queued', 'spool_id': entry_id}
+            
         # Process the webhook event
         try:
             return await self.process_webhook_event(data)
@@ -151,6 +163,26 @@ class FacebookConnector:
             logger.error(f"Error processing webhook event: {str(e)}", exc_info=True)
             return {'error': str(e)}
             
+    async def process_spooled_event(self, data: Dict[str, Any]):
+        """
+        Process a webhook event taken from the spool
+        
+        Raises if any item of the event failed, so the event is retried;
+        messages that already succeeded are dropped by the deduplication.
+        
+        Args:
+            data: Webhook event data
+        """
+        result = await self.process_webhook_event(data)
+        if 'error' in result:
+            # Malformed events will not succeed on a retry
+            logger.warning(f"Dropping spooled webhook event: {result['error']}")
+            return
+            
+        failed = [item for item in result['results'] if item['status'] == 'error']
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(result['results'])} webhook items failed: {failed[0]['error']}")
+            
     async def process_webhook_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process a Facebook webhook event
@@ -159,7 +191,7 @@ class FacebookConnector:
             data: Webhook event data
             
         Returns:
-            Processing result
+            Processing result with one outcome per messaging event
         """
         logger.debug(f"Processing Facebook webhook event: {json.dumps(data)}")
         
@@ -167,14 +199,12 @@ class FacebookConnector:
             logger.warning("Not a page webhook event")
             return {'error': 'Not a page webhook event'}
             
-        results = []
+        items = []
         
-        # Process each entry
+        # Collect the messaging events of each entry
         for entry in data.get('entry', []):
             page_id = entry.get('id')
-            time = entry.get('time')
             
-            # Process messaging events
             for messaging in entry.get('messaging', []):
                 event_type = self._get_event_type(messaging)
                 
@@ -182,30 +212,16 @@ class FacebookConnector:
                     logger.warning(f"Unknown messaging event type: {json.dumps(messaging)}")
                     continue
                     
-                # Call the appropriate event handler
-                if event_type in self.webhook_handlers:
-                    try:
-                        await self.webhook_handlers[event_type](messaging)
-                        results.append({
-                            'page_id': page_id,
-                            'event_type': event_type,
-                            'status': 'processed'
-                        })
-                    except Exception as e:
-                        logger.error(f"Error in webhook handler for {event_type}: {str(e)}", exc_info=True)
-                        results.append({
-                            'page_id': page_id,
-                            'event_type': event_type,
-                            'status': 'error',
-                            'error': str(e)
-                        })
-                else:
-                    logger.warning(f"No handler for event type: {event_type}")
-                    results.append({
-                        'page_id': page_id,
-                        'event_type': event_type,
-                        'status': 'ignored'
-                    })
+                items.append(WebhookItem(
+                    handler=self.webhook_handlers.get(event_type),
+                    payload=messaging,
+                    outcome={'page_id': page_id, 'event_type': event_type},
+                    label=f"event type: {event_type}",
+                    order_key=messaging.get('sender', {}).get('id')
+                ))
+        
+        # Call the event handlers concurrently
+        results = await dispatch_webhook_items(items, self.fanout_limit)
         
         return {'results': results}
         
@@ -238,7 +254,8 @@ class FacebookConnector:
         
         return None
         
-    async def send_message(self, recipient_id: str, message_data: Dict[str, Any], page_access_token: str) -> Dict[str, Any]:
+    async def send_message(self, recipient_id: str, message_data: Dict[str, Any], page_access_token: str,
+                           wait: bool = True) -> Dict[str, Any]:
         """
         Send a message to a recipient
         
@@ -246,13 +263,11 @@ class FacebookConnector:
             recipient_id: Recipient ID
             message_data: Message data
             page_access_token: Page access token
+            wait: Whether to wait for the API response instead of only queueing the send
             
         Returns:
-            API response
+            API response, or {'status': 'queued'} if not waiting
         """
-        if not self.session:
-            await self.initialize()
-            
         url = f"https://graph.facebook.com/v16.0/me/messages?access_token={page_access_token}"
         
         payload = {
@@ -260,20 +275,13 @@ class FacebookConnector:
             'message': message_data
         }
         
-        try:
-            async with self.session.post(url, json=payload) as response:
-                result = await response.json()
-                
-                if response.status != 200:
-                    logger.error(f"Error sending Facebook message: {json.dumps(result)}")
-                    
-                return result
-                
-        except Exception as e:
-            logger.error(f"Error sending Facebook message: {str(e)}", exc_info=True)
-            return {'error': str(e)}
+        future = await outbound_sender.submit('facebook', account_key(page_access_token), url, payload)
+        if not wait:
+            return {'status': 'queued'}
+        return await future
             
-    async def send_text_message(self, recipient_id: str, text: str, page_access_token: str) -> Dict[str, Any]:
+    async def send_text_message(self, recipient_id: str, text: str, page_access_token: str,
+                                wait: bool = True) -> Dict[str, Any]:
         """
         Send a text message to a recipient
         
@@ -281,17 +289,22 @@ class FacebookConnector:
             recipient_id: Recipient ID
             text: Message text
             page_access_token: Page access token
+            wait: Whether to wait for the API response instead of only queueing the send
             
         Returns:
-            API response
+            API response, or {'status': 'queued'} if not waiting
         """
         message_data = {'text': text}
-        return await self.send_message(recipient_id, message_data, page_access_token)
+        return await self.send_message(recipient_id, message_data, page_access_token, wait)
 
 
 # Create global connector instance
 connector = FacebookConnector()
 
+# Drain spooled webhook events through the connector
+if connector.spool_workers is not None:
+    connector.spool_workers.register_handler('facebook', connector.process_spooled_event)
+
 
 # Message handler for Facebook messages
 async def handle_facebook_message(messaging: Dict[str, Any]):
@@ -310,11 +323,14 @@ async def handle_facebook_message(messaging: Dict[str, Any]):
     logger.info(f"Received Facebook message from {sender_id}: {message_text}")
     
     # Process the message through the workflow
+    claimed = False
     try:
-        result = await execute_workflow('facebook_message', {
-            'platform': 'facebook',
-            'raw_message': messaging
-        })
+        result = await handle_platform_message('facebook', messaging)
+        if 'error' in result:
+            # The workflow failed and already released the message's claim
+            raise RuntimeError(result['error'])
+        # A dropped duplicate has no message; its claim belongs to the original delivery
+        claimed = result.get('message') is not None
         
         # Check if we got a response
         if result and result.get('response'):
@@ -323,18 +339,25 @@ async def handle_facebook_message(messaging: Dict[str, Any]):
             
             if not page_access_token:
                 logger.warning(f"No page access token for page {recipient_id}")
-                return
-                
-            # Send the response back to the user
-            response_text = result['response']['content']
-            await connector.send_text_message(sender_id, response_text, page_access_token)
+            else:
+                # Send the response back to the user
+                response_text = result['response']['content']
+                await connector.send_text_message(sender_id, response_text, page_access_token, wait=False)
+        
+        # The message is handled once its reply is queued; until then a redelivery is processed
+        if claimed:
+            await complete_platform_message('facebook', messaging)
             
     except Exception as e:
         logger.error(f"Error processing Facebook message: {str(e)}", exc_info=True)
+        if claimed:
+            await message_processor.forget_message('facebook', messaging)
+        raise
 
 
 # Register the message handler
 connector.register_webhook_handler('message', handle_facebook_message)
+register_reply_handler('facebook', handle_facebook_message)
 
 
 # Create the Facebook message workflow
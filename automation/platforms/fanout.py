@@ -0,0 +1,100 @@
+"""
+Webhook Fan-out for Dana AI Platform Integrations
+
+Platform webhooks batch several entries and messaging items into one POST.
+This module dispatches the items of a payload to their handlers concurrently,
+bounded by a fan-out limit, so a batch costs roughly one handler latency.
+Items sharing an ordering key (e.g. the sender) still run one after another
+to keep conversation order.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Default maximum number of webhook items handled at once per payload
+DEFAULT_FANOUT_LIMIT = 16
+
+
+class WebhookItem:
+    """
+    A single item of a webhook payload to dispatch to its handler
+    """
+
+    __slots__ = ('handler', 'payload', 'outcome', 'label', 'order_key')
+
+    def __init__(self,
+                 handler: Optional[Callable[[Dict[str, Any]], Awaitable[None]]],
+                 payload: Dict[str, Any],
+                 outcome: Dict[str, Any],
+                 label: str,
+                 order_key: Optional[Hashable] = None):
+        """
+        Initialize the item
+
+        Args:
+            handler: Handler for the item, or None if there is none (the item is ignored)
+            payload: Data passed to the handler
+            outcome: Identifying fields reported in the item result (e.g. page_id, event_type)
+            label: Description of the item type for log messages
+            order_key: Items with the same key are handled in payload order
+        """
+        self.handler = handler
+        self.payload = payload
+        self.outcome = outcome
+        self.label = label
+        self.order_key = order_key
+
+
+async def dispatch_webhook_items(items: List[WebhookItem],
+                                 max_concurrency: int = DEFAULT_FANOUT_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Run the handlers of webhook items concurrently
+
+    A failing handler does not affect the other items.
+
+    Args:
+        items: Items in payload order
+        max_concurrency: Maximum number of handlers running at once
+
+    Returns:
+        One result per item, in payload order, with the outcome fields and a
+        'status' of 'processed', 'error' (with 'error') or 'ignored'
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+    async def run_item(item: WebhookItem) -> Dict[str, Any]:
+        result = dict(item.outcome)
+        if item.handler is None:
+            logger.warning(f"No handler for {item.label}")
+            result['status'] = 'ignored'
+            return result
+
+        try:
+            async with semaphore:
+                await item.handler(item.payload)
+            result['status'] = 'processed'
+        except Exception as e:
+            logger.error(f"Error in webhook handler for {item.label}: {str(e)}", exc_info=True)
+            result['status'] = 'error'
+            result['error'] = str(e)
+        return result
+
+    async def run_lane(indexes: List[int]):
+        for index in indexes:
+            results[index] = await run_item(items[index])
+
+    # Group items by ordering key; items without a key get a lane of their own
+    lanes: Dict[Hashable, List[int]] = {}
+    for index, item in enumerate(items):
+        key = ('item', index) if item.order_key is None else ('key', item.order_key)
+        lanes.setdefault(key, []).append(index)
+
+    await asyncio.gather(*(run_lane(indexes) for indexes in lanes.values()))
+    return results
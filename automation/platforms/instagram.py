@@ -12,12 +12,17 @@ import hmac
 import hashlib
 import time
 from typing import Dict, Any, List, Optional, Union, Callable, Awaitable
-import aiohttp
 from datetime import datetime
 
 from automation.core.config import get_config
 from automation.core.workflow_engine import WorkflowStep, create_workflow, execute_workflow
 from automation.core.message_processor import processor as message_processor
+from automation.core.spool import get_spool_workers
+from automation.workflows.message_processing import (
+    complete_platform_message, handle_platform_message, register_reply_handler
+)
+from automation.platforms.fanout import DEFAULT_FANOUT_LIMIT, WebhookItem, dispatch_webhook_items
+from automation.platforms.outbound import account_key, outbound_sender
 
 logger = logging.getLogger(__name__)
 
@@ -31,19 +36,21 @@ class InstagramConnector:
         self.webhook_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
         self.verify_token = get_config('platforms', 'instagram_verify_token', '')
         self.app_secret = get_config('platforms', 'instagram_app_secret', '')
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.fanout_limit = get_config('platforms', 'webhook_fanout_limit', DEFAULT_FANOUT_LIMIT)
+        self.spool_workers = get_spool_workers()
         
     async def initialize(self):
         """Initialize the connector"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        await outbound_sender.start()
         logger.info("Instagram connector initialized")
         
     async def close(self):
-        """Close the connector"""
-        if self.session:
-            await self.session.close()
-            self.session = None
+        """
+        Close the connector
+        
+        The shared outbound sender is closed by automation.shutdown(), once all
+        connectors are closed.
+        """
         logger.info("Instagram connector closed")
         
     def register_webhook_handler(self, event_type: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
@@ -144,6 +151,11 @@ class InstagramConnector:
             logger.info("Webhook verification successful")
             return {'challenge': challenge}
             
+        # Spool the event and acknowledge at once; the spool workers process it
+        if self.spool_workers is not None:
+            entry_id = await self.spool_workers.enqueue('instagram', data)
+            return {'status': 'queued', 'spool_id': entry_id}
+            
         # Process the webhook event
         try:
             return await self.process_webhook_event(data)
@@ -151,6 +163,26 @@ class InstagramConnector:
             logger.error(f"Error processing webhook event: {str(e)}", exc_info=True)
             return {'error': str(e)}
             
+    async def process_spooled_event(self, data: Dict[str, Any]):
+        """
+        Process a webhook event taken from the spool
+        
+        Raises if any item of the event failed, so the event is retried;
+        messages that already succeeded are dropped by the deduplication.
+        
+        Args:
+            data: Webhook event data
+        """
+        result = await self.process_webhook_event(data)
+        if 'error' in result:
+            # Malformed events will not succeed on a retry
+            logger.warning(f"Dropping spooled webhook event: {result['error']}")
+            return
+            
+        failed = [item for item in result['results'] if item['status'] == 'error']
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(result['results'])} webhook items failed: {failed[0]['error']}")
+            
     async def process_webhook_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process an Instagram webhook event
@@ -159,7 +191,7 @@ class InstagramConnector:
             data: Webhook event data
             
         Returns:
-            Processing result
+            Processing result with one outcome per event
         """
         logger.debug(f"Processing Instagram webhook event: {json.dumps(data)}")
         
@@ -167,14 +199,12 @@ class InstagramConnector:
             logger.warning("Not an Instagram webhook event")
             return {'error': 'Not an Instagram webhook event'}
             
-        results = []
+        items = []
         
-        # Process each entry
+        # Collect the messaging, comment and mention events of each entry
         for entry in data.get('entry', []):
             profile_id = entry.get('id')
-            time = entry.get('time')
             
-            # Process messaging events
             for messaging in entry.get('messaging', []):
                 event_type = self._get_event_type(messaging)
                 
@@ -182,87 +212,31 @@ class InstagramConnector:
                     logger.warning(f"Unknown messaging event type: {json.dumps(messaging)}")
                     continue
                     
-                # Call the appropriate event handler
-                if event_type in self.webhook_handlers:
-                    try:
-                        await self.webhook_handlers[event_type](messaging)
-                        results.append({
-                            'profile_id': profile_id,
-                            'event_type': event_type,
-                            'status': 'processed'
-                        })
-                    except Exception as e:
-                        logger.error(f"Error in webhook handler for {event_type}: {str(e)}", exc_info=True)
-                        results.append({
-                            'profile_id': profile_id,
-                            'event_type': event_type,
-                            'status': 'error',
-                            'error': str(e)
-                        })
-                else:
-                    logger.warning(f"No handler for event type: {event_type}")
-                    results.append({
-                        'profile_id': profile_id,
-                        'event_type': event_type,
-                        'status': 'ignored'
-                    })
+                items.append(WebhookItem(
+                    handler=self.webhook_handlers.get(event_type),
+                    payload=messaging,
+                    outcome={'profile_id': profile_id, 'event_type': event_type},
+                    label=f"event type: {event_type}",
+                    order_key=messaging.get('sender', {}).get('id')
+                ))
             
-            # Process comment events
-            for comment in entry.get('changes', []):
-                if comment.get('field') == 'comments':
+            for change in entry.get('changes', []):
+                if change.get('field') == 'comments':
                     event_type = 'comment'
-                    comment_data = comment.get('value', {})
-                    
-                    if 'comment' in self.webhook_handlers:
-                        try:
-                            await self.webhook_handlers['comment'](comment_data)
-                            results.append({
-                                'profile_id': profile_id,
-                                'event_type': 'comment',
-                                'status': 'processed'
-                            })
-                        except Exception as e:
-                            logger.error(f"Error in webhook handler for comment: {str(e)}", exc_info=True)
-                            results.append({
-                                'profile_id': profile_id,
-                                'event_type': 'comment',
-                                'status': 'error',
-                                'error': str(e)
-                            })
-                    else:
-                        logger.warning("No handler for comment events")
-                        results.append({
-                            'profile_id': profile_id,
-                            'event_type': 'comment',
-                            'status': 'ignored'
-                        })
-                elif comment.get('field') == 'mentions':
+                elif change.get('field') == 'mentions':
                     event_type = 'mention'
-                    mention_data = comment.get('value', {})
+                else:
+                    continue
                     
-                    if 'mention' in self.webhook_handlers:
-                        try:
-                            await self.webhook_handlers['mention'](mention_data)
-                            results.append({
-                                'profile_id': profile_id,
-                                'event_type': 'mention',
-                                'status': 'processed'
-                            })
-                        except Exception as e:
-                            logger.error(f"Error in webhook handler for mention: {str(e)}", exc_info=True)
-                            results.append({
-                                'profile_id': profile_id,
-                                'event_type': 'mention',
-                                'status': 'error',
-                                'error': str(e)
-                            })
-                    else:
-                        logger.warning("No handler for mention events")
-                        results.append({
-                            'profile_id': profile_id,
-                            'event_type': 'mention',
-                            'status': 'ignored'
-                        })
+                items.append(WebhookItem(
+                    handler=self.webhook_handlers.get(event_type),
+                    payload=change.get('value', {}),
+                    outcome={'profile_id': profile_id, 'event_type': event_type},
+                    label=f"{event_type} events"
+                ))
+        
+        # Call the event handlers concurrently
+        results = await dispatch_webhook_items(items, self.fanout_limit)
         
         return {'results': results}
         
@@ -289,7 +263,8 @@ class InstagramConnector:
         
         return None
         
-    async def send_message(self, recipient_id: str, message_data: Dict[str, Any], access_token: str) -> Dict[str, Any]:
+    async def send_message(self, recipient_id: str, message_data: Dict[str, Any], access_token: str,
+                           wait: bool = True) -> Dict[str, Any]:
         """
         Send a message to a recipient
         
@@ -297,13 +272,11 @@ class InstagramConnector:
             recipient_id: Recipient ID
             message_data: Message data
             access_token: Access token
+            wait: Whether to wait for the API response instead of only queueing the send
             
         Returns:
-            API response
+            API response, or {'status': 'queued'} if not waiting
         """
-        if not self.session:
-            await self.initialize()
-            
         url = f"https://graph.facebook.com/v16.0/me/messages?access_token={access_token}"
         
         payload = {
@@ -311,20 +284,13 @@ class InstagramConnector:
             'message': message_data
         }
         
-        try:
-            async with self.session.post(url, json=payload) as response:
-                result = await response.json()
-                
-                if response.status != 200:
-                    logger.error(f"Error sending Instagram message: {json.dumps(result)}")
-                    
-                return result
-                
-        except Exception as e:
-            logger.error(f"Error sending Instagram message: {str(e)}", exc_info=True)
-            return {'error': str(e)}
+        future = await outbound_sender.submit('instagram', account_key(access_token), url, payload)
+        if not wait:
+            return {'status': 'queued'}
+        return await future
             
-    async def send_text_message(self, recipient_id: str, text: str, access_token: str) -> Dict[str, Any]:
+    async def send_text_message(self, recipient_id: str, text: str, access_token: str,
+                                wait: bool = True) -> Dict[str, Any]:
         """
         Send a text message to a recipient
         
@@ -332,17 +298,22 @@ class InstagramConnector:
             recipient_id: Recipient ID
             text: Message text
             access_token: Access token
+            wait: Whether to wait for the API response instead of only queueing the send
             
         Returns:
-            API response
+            API response, or {'status': 'queued'} if not waiting
         """
         message_data = {'text': text}
-        return await self.send_message(recipient_id, message_data, access_token)
+        return await self.send_message(recipient_id, message_data, access_token, wait)
 
 
 # Create global connector instance
 connector = InstagramConnector()
 
+# Drain spooled webhook events through the connector
+if connector.spool_workers is not None:
+    connector.spool_workers.register_handler('instagram', connector.process_spooled_event)
+
 
 # Message handler for Instagram messages
 async def handle_instagram_message(messaging: Dict[str, Any]):
@@ -361,11 +332,14 @@ async def handle_instagram_message(messaging: Dict[str, Any]):
     logger.info(f"Received Instagram message from {sender_id}: {message_text}")
     
     # Process the message through the workflow
+    claimed = False
     try:
-        result = await execute_workflow('instagram_message', {
-            'platform': 'instagram',
-            'raw_message': messaging
-        })
+        result = await handle_platform_message('instagram', messaging)
+        if 'error' in result:
+            # The workflow failed and already released the message's claim
+            raise RuntimeError(result['error'])
+        # A dropped duplicate has no message; its claim belongs to the original delivery
+        claimed = result.get('message') is not None
         
         # Check if we got a response
         if result and result.get('response'):
@@ -374,14 +348,20 @@ async def handle_instagram_message(messaging: Dict[str, Any]):
             
             if not access_token:
                 logger.warning(f"No access token for profile {recipient_id}")
-                return
-                
-            # Send the response back to the user
-            response_text = result['response']['content']
-            await connector.send_text_message(sender_id, response_text, access_token)
+            else:
+                # Send the response back to the user
+                response_text = result['response']['content']
+                await connector.send_text_message(sender_id, response_text, access_token, wait=False)
+        
+        # The message is handled once its reply is queued; until then a redelivery is processed
+        if claimed:
+            await complete_platform_message('instagram', messaging)
             
     except Exception as e:
         logger.error(f"Error processing Instagram message: {str(e)}", exc_info=True)
+        if claimed:
+            await message_processor.forget_message('instagram', messaging)
+        raise
 
 
 # Message handler for Instagram comments
@@ -422,6 +402,7 @@ async def handle_instagram_comment(comment_data: Dict[str, Any]):
 # Register the message and comment handlers
 connector.register_webhook_handler('message', handle_instagram_message)
 connector.register_webhook_handler('comment', handle_instagram_comment)
+register_reply_handler('instagram', handle_instagram_message)
 
 
 # Create the Instagram message workflow
@@ -0,0 +1,390 @@
+"""
+Outbound Message Sender for Dana AI Platform Integrations
+
+This module sends replies to Facebook, Instagram and WhatsApp through one
+shared, pooled HTTP session. Sends are queued so response generation never
+waits on the Graph API, paced per sending account (page, Instagram profile
+or WhatsApp phone number) with token buckets, and retried with jittered
+backoff on rate limits (429) and server errors (5xx).
+
+Workers never wait on an account: a request whose bucket is empty or paused,
+or that has to back off, is put back on the queue once it can be sent, so a
+rate-limited account does not hold up the others.
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+import aiohttp
+
+from automation.core.config import get_config
+from automation.core.rate_limiter import TokenBucket, backoff_delay
+from automation.core.tracing import DEFAULT_LATENCY_BUCKETS_MS, LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Default send rate per sending account as (calls per second, burst), following
+# the Graph API messaging limits; override with platforms.outbound_rate_limits
+DEFAULT_RATE_LIMITS = {
+    'facebook': (250, 250),
+    'instagram': (100, 100),
+    'whatsapp': (80, 80)
+}
+
+# Statuses worth retrying
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def account_key(token: str) -> str:
+    """
+    Get a stable account key from an access token without keeping the token
+
+    Args:
+        token: Page or profile access token
+
+    Returns:
+        Short digest of the token
+    """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+
+class OutboundRequest:
+    """
+    A queued outbound API call
+    """
+
+    __slots__ = ('platform', 'account', 'url', 'payload', 'headers', 'future', 'enqueued_at', 'attempt')
+
+    def __init__(self, platform: str, account: str, url: str, payload: Dict[str, Any],
+                 headers: Optional[Dict[str, str]], future: asyncio.Future):
+        self.platform = platform
+        self.account = account
+        self.url = url
+        self.payload = payload
+        self.headers = headers
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.attempt = 0
+
+
+class _PlatformStats:
+    """Send counters and latency for one platform"""
+
+    __slots__ = ('sent', 'failed', 'retries', 'rate_limited', 'latency', 'queue_wait')
+
+    def __init__(self, bounds_ns: List[int]):
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.latency = LatencyHistogram(bounds_ns)
+        self.queue_wait = LatencyHistogram(bounds_ns)
+
+
+class OutboundSender:
+    """
+    Shared queued sender for platform API calls
+    """
+
+    def __init__(self,
+                 num_workers: int = 16,
+                 max_queue_size: int = 10000,
+                 rate_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_retries: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0,
+                 pool_size: int = 100,
+                 keepalive_timeout: float = 60,
+                 dns_cache_ttl: int = 300,
+                 request_timeout: float = 30):
+        """
+        Initialize the sender
+
+        Args:
+            num_workers: Number of concurrent send workers
+            max_queue_size: Maximum unfinished sends before callers wait
+            rate_limits: (calls per second, burst) per sending account, by platform
+            max_retries: Retries on 429, 5xx and connection errors
+            base_delay: Backoff ceiling of the first retry in seconds
+            max_delay: Maximum backoff in seconds
+            pool_size: Maximum open connections
+            keepalive_timeout: Seconds idle connections are kept open
+            dns_cache_ttl: Seconds DNS lookups are cached
+            request_timeout: Total timeout of a single request in seconds
+        """
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS, **(rate_limits or {}))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.request_timeout = request_timeout
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Admission is bounded here, so requests put back on the queue never block
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+        # Requests waiting for their account's tokens or backoff -> timer
+        self._delayed: Dict[OutboundRequest, asyncio.TimerHandle] = {}
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._bounds_ns = [int(bound * 1e6) for bound in DEFAULT_LATENCY_BUCKETS_MS]
+        self._stats: Dict[str, _PlatformStats] = {}
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the send workers are running"""
+        return bool(self._workers)
+
+    async def start(self):
+        """Open the connection pool and start the send workers"""
+        if self._workers:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+        )
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_queue_size)
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers = [
+            asyncio.create_task(self._run_worker(), name=f"outbound-sender-{index}")
+            for index in range(self.num_workers)
+        ]
+        logger.info(f"Started outbound sender with {self.num_workers} workers")
+
+    async def close(self, drain: bool = True):
+        """
+        Stop the workers and close the connection pool
+
+        Args:
+            drain: Whether to finish queued sends first
+        """
+        if not self._workers:
+            return
+
+        if drain:
+            await self._idle.wait()
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        for request, handle in self._delayed.items():
+            handle.cancel()
+            if not request.future.done():
+                request.future.cancel()
+        self._delayed.clear()
+        while not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                request.future.cancel()
+
+        await self._session.close()
+        self._workers = []
+        self._queue = None
+        self._session = None
+        logger.info("Closed outbound sender")
+
+    async def submit(self, platform: str, account: str, url: str, payload: Dict[str, Any],
+                     headers: Optional[Dict[str, str]] = None) -> asyncio.Future:
+        """
+        Queue an API call without waiting for it
+
+        Args:
+            platform: Platform name (selects the rate limit)
+            account: Sending account the rate limit applies to
+            url: Endpoint URL
+            payload: JSON body
+            headers: Extra request headers
+
+        Returns:
+            Future resolved with the API response
+        """
+        if not self._workers:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._slots.acquire()
+        self._pending += 1
+        self._idle.clear()
+        self._queue.put_nowait(OutboundRequest(platform, account, url, payload, headers, future))
+        return future
+
+    async def send(self, platform: str, account: str, url: str, payload: Dict[str, Any],
+                   headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Queue an API call and wait for its response
+
+        Args:
+            platform: Platform name (selects the rate limit)
+            account: Sending account the rate limit applies to
+            url: Endpoint URL
+            payload: JSON body
+            headers: Extra request headers
+
+        Returns:
+            API response, or a dictionary with 'error' if the call failed
+        """
+        return await (await self.submit(platform, account, url, payload, headers))
+
+    def _bucket(self, platform: str, account: str) -> TokenBucket:
+        bucket = self._buckets.get((platform, account))
+        if bucket is None:
+            rate, burst = self.rate_limits.get(platform, (10, 10))
+            bucket = self._buckets[(platform, account)] = TokenBucket(rate, burst)
+        return bucket
+
+    def _platform_stats(self, platform: str) -> _PlatformStats:
+        stats = self._stats.get(platform)
+        if stats is None:
+            stats = self._stats[platform] = _PlatformStats(self._bounds_ns)
+        return stats
+
+    def _finish(self, request: OutboundRequest, result: Dict[str, Any]):
+        """Resolve a request and free its slot"""
+        if not request.future.done():
+            request.future.set_result(result)
+        self._pending -= 1
+        self._slots.release()
+        if self._pending == 0:
+            self._idle.set()
+
+    def _send_later(self, request: OutboundRequest, delay: float):
+        """Put a request back on the queue after a delay, without holding a worker"""
+        def requeue():
+            del self._delayed[request]
+            self._queue.put_nowait(request)
+
+        self._delayed[request] = asyncio.get_running_loop().call_later(delay, requeue)
+
+    async def _run_worker(self):
+        """Send queued requests until cancelled"""
+        while True:
+            request = await self._queue.get()
+            try:
+                if request.future.cancelled():
+                    self._finish(request, {'error': 'cancelled'})
+                    continue
+                result = await self._deliver(request)
+                if result is not None:
+                    self._finish(request, result)
+            except Exception as e:
+                logger.error(f"Error in outbound sender: {str(e)}", exc_info=True)
+                self._finish(request, {'error': str(e)})
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, request: OutboundRequest) -> Optional[Dict[str, Any]]:
+        """
+        Make one attempt at a request, pacing it per account
+
+        Args:
+            request: The queued request
+
+        Returns:
+            API response, a dictionary with 'error', or None if the request
+            was put back to wait for its account's tokens or a retry
+        """
+        stats = self._platform_stats(request.platform)
+        bucket = self._bucket(request.platform, request.account)
+
+        if not bucket.try_acquire():
+            # The account is out of tokens or paused after a 429
+            self._send_later(request, bucket.wait_time())
+            return None
+
+        if request.attempt == 0:
+            stats.queue_wait.observe(int((time.perf_counter() - request.enqueued_at) * 1e9))
+
+        start_ns = time.perf_counter_ns()
+        retry_after = None
+        try:
+            async with self._session.post(request.url, json=request.payload, headers=request.headers) as response:
+                try:
+                    result = await response.json(content_type=None)
+                except ValueError:
+                    result = {'error': await response.text()}
+                status = response.status
+                retry_after = response.headers.get('Retry-After')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status, result = None, {'error': str(e)}
+        stats.latency.observe(time.perf_counter_ns() - start_ns)
+
+        if status == 200:
+            stats.sent += 1
+            return result
+
+        if status == 429:
+            stats.rate_limited += 1
+        retryable = status is None or status in RETRYABLE_STATUSES
+        if not retryable or request.attempt >= self.max_retries:
+            stats.failed += 1
+            logger.error(f"Error sending {request.platform} message (status {status}): {result}")
+            return result if isinstance(result, dict) and result else {'error': f"HTTP {status}"}
+
+        request.attempt += 1
+        stats.retries += 1
+        delay = backoff_delay(request.attempt, self.base_delay, self.max_delay)
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if status == 429:
+            # Hold back the whole account, not just this request
+            bucket.pause(delay)
+        logger.warning(f"Retrying {request.platform} send in {delay:.2f}s (status {status}, attempt {request.attempt})")
+        self._send_later(request, delay)
+        return None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get queue depth, counters and send latency percentiles per platform
+
+        Returns:
+            Sender metrics
+        """
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'delayed': len(self._delayed),
+            'workers': len(self._workers),
+            'accounts': len(self._buckets),
+            'platforms': {
+                platform: {
+                    'sent': stats.sent,
+                    'failed': stats.failed,
+                    'retries': stats.retries,
+                    'rate_limited': stats.rate_limited,
+                    'latency': stats.latency.to_dict(),
+                    'queue_wait': stats.queue_wait.to_dict()
+                }
+                for platform, stats in self._stats.items()
+            }
+        }
+
+
+# Create global sender instance
+outbound_sender = OutboundSender(
+    num_workers=get_config('platforms', 'outbound_workers', 16),
+    max_queue_size=get_config('platforms', 'outbound_queue_size', 10000),
+    rate_limits=get_config('platforms', 'outbound_rate_limits'),
+    max_retries=get_config('platforms', 'outbound_max_retries', 3)
+)
@@ -11,13 +11,18 @@ import json
 import hmac
 import hashlib
 import time
-from typing import Dict, Any, List, Optional, Union, Callable, Awaitable
-import aiohttp
+from typing import Dict, Any, List, Union, Callable, Awaitable
 from datetime import datetime
 
 from automation.core.config import get_config
-from automation.core.workflow_engine import WorkflowStep, create_workflow, execute_workflow
+from automation.core.workflow_engine import WorkflowStep, create_workflow
 from automation.core.message_processor import processor as message_processor
+from automation.core.spool import get_spool_workers
+from automation.workflows.message_processing import (
+    complete_platform_message, handle_platform_message, register_reply_handler
+)
+from automation.platforms.fanout import DEFAULT_FANOUT_LIMIT, WebhookItem, dispatch_webhook_items
+from automation.platforms.outbound import outbound_sender
 
 logger = logging.getLogger(__name__)
 
@@ -30,19 +35,21 @@ class WhatsAppConnector:
         """Initialize the WhatsApp connector"""
         self.webhook_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
         self.app_secret = get_config('platforms', 'whatsapp_app_secret', '')
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.fanout_limit = get_config('platforms', 'webhook_fanout_limit', DEFAULT_FANOUT_LIMIT)
+        self.spool_workers = get_spool_workers()
         
     async def initialize(self):
         """Initialize the connector"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        await outbound_sender.start()
         logger.info("WhatsApp connector initialized")
         
     async def close(self):
-        """Close the connector"""
-        if self.session:
-            await self.session.close()
-            self.session = None
+        """
+        Close the connector
+        
+        The shared outbound sender is closed by automation.shutdown(), once all
+        connectors are closed.
+        """
         logger.info("WhatsApp connector closed")
         
     def register_webhook_handler(self, event_type: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
@@ -113,6 +120,11 @@ class WhatsAppConnector:
             logger.error("Invalid JSON in webhook request")
             return {'error': 'Invalid JSON'}
             
+        # Spool the event and acknowledge at once; the spool workers process it
+        if self.spool_workers is not None:
+            entry_id = await self.spool_workers.enqueue('whatsapp', data)
+            return {'status': 'queued', 'spool_id': entry_id}
+            
         # Process the webhook event
         try:
             return await self.process_webhook_event(data)
@@ -120,6 +132,26 @@ class WhatsAppConnector:
             logger.error(f"Error processing webhook event: {str(e)}", exc_info=True)
             return {'error': str(e)}
             
+    async def process_spooled_event(self, data: Dict[str, Any]):
+        """
+        Process a webhook event taken from the spool
+        
+        Raises if any item of the event failed, so the event is retried;
+        messages that already succeeded are dropped by the deduplication.
+        
+        Args:
+            data: Webhook event data
+        """
+        result = await self.process_webhook_event(data)
+        if 'error' in result:
+            # Malformed events will not succeed on a retry
+            logger.warning(f"Dropping spooled webhook event: {result['error']}")
+            return
+            
+        failed = [item for item in result['results'] if item['status'] == 'error']
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(result['results'])} webhook items failed: {failed[0]['error']}")
+            
     async def process_webhook_event(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process a WhatsApp webhook event
@@ -128,7 +160,7 @@ class WhatsAppConnector:
             data: Webhook event data
             
         Returns:
-            Processing result
+            Processing result with one outcome per message and status
         """
         logger.debug(f"Processing WhatsApp webhook event: {json.dumps(data)}")
         
@@ -136,9 +168,9 @@ class WhatsAppConnector:
             logger.warning("Invalid webhook event format")
             return {'error': 'Invalid webhook event format'}
             
-        results = []
+        items = []
         
-        # Process each entry
+        # Collect the messages and statuses of each entry
         for entry in data.get('entry', []):
             # Process changes (WhatsApp API structure)
             for change in entry.get('changes', []):
@@ -149,7 +181,6 @@ class WhatsAppConnector:
                 metadata = value.get('metadata', {})
                 phone_number_id = metadata.get('phone_number_id')
                 
-                # Process messages
                 for message in value.get('messages', []):
                     message_type = message.get('type')
                     
@@ -157,70 +188,37 @@ class WhatsAppConnector:
                         logger.warning(f"Unknown message type: {json.dumps(message)}")
                         continue
                         
-                    # Call the appropriate event handler
-                    if message_type in self.webhook_handlers:
-                        try:
-                            # Add metadata to the message
-                            message['metadata'] = metadata
-                            
-                            await self.webhook_handlers[message_type](message)
-                            results.append({
-                                'phone_number_id': phone_number_id,
-                                'message_type': message_type,
-                                'status': 'processed'
-                            })
-                        except Exception as e:
-                            logger.error(f"Error in webhook handler for {message_type}: {str(e)}", exc_info=True)
-                            results.append({
-                                'phone_number_id': phone_number_id,
-                                'message_type': message_type,
-                                'status': 'error',
-                                'error': str(e)
-                            })
-                    else:
-                        logger.warning(f"No handler for message type: {message_type}")
-                        results.append({
-                            'phone_number_id': phone_number_id,
-                            'message_type': message_type,
-                            'status': 'ignored'
-                        })
-                        
-                # Process statuses
+                    # Add metadata to the message
+                    message['metadata'] = metadata
+                    
+                    items.append(WebhookItem(
+                        handler=self.webhook_handlers.get(message_type),
+                        payload=message,
+                        outcome={'phone_number_id': phone_number_id, 'message_type': message_type},
+                        label=f"message type: {message_type}",
+                        order_key=message.get('from')
+                    ))
+                    
                 for status in value.get('statuses', []):
                     status_type = status.get('status')
                     
                     if not status_type:
                         continue
                         
-                    # Convert to event type format
-                    event_type = f"status_{status_type}"
+                    # Add metadata to the status
+                    status['metadata'] = metadata
                     
-                    if event_type in self.webhook_handlers:
-                        try:
-                            # Add metadata to the status
-                            status['metadata'] = metadata
-                            
-                            await self.webhook_handlers[event_type](status)
-                            results.append({
-                                'phone_number_id': phone_number_id,
-                                'status_type': status_type,
-                                'status': 'processed'
-                            })
-                        except Exception as e:
-                            logger.error(f"Error in webhook handler for {event_type}: {str(e)}", exc_info=True)
-                            results.append({
-                                'phone_number_id': phone_number_id,
-                                'status_type': status_type,
-                                'status': 'error',
-                                'error': str(e)
-                            })
-                    else:
-                        logger.warning(f"No handler for status type: {status_type}")
-                        results.append({
-                            'phone_number_id': phone_number_id,
-                            'status_type': status_type,
-                            'status': 'ignored'
-                        })
+                    # Statuses of one message (sent, delivered, read) stay in order
+                    items.append(WebhookItem(
+                        handler=self.webhook_handlers.get(f"status_{status_type}"),
+                        payload=status,
+                        outcome={'phone_number_id': phone_number_id, 'status_type': status_type},
+                        label=f"status type: {status_type}",
+                        order_key=status.get('id')
+                    ))
+        
+        # Call the event handlers concurrently
+        results = await dispatch_webhook_items(items, self.fanout_limit)
         
         return {'results': results}
         
@@ -228,7 +226,8 @@ class WhatsAppConnector:
                           phone_number_id: str, 
                           recipient_number: str, 
                           message_data: Dict[str, Any], 
-                          access_token: str) -> Dict[str, Any]:
+                          access_token: str,
+                          wait: bool = True) -> Dict[str, Any]:
         """
         Send a message to a recipient
         
@@ -237,13 +236,11 @@ class WhatsAppConnector:
             recipient_number: Recipient's phone number
             message_data: Message data
             access_token: Access token
+            wait: Whether to wait for the API response instead of only queueing the send
             
         Returns:
-            API response
+            API response, or {'status': 'queued'} if not waiting
         """
-        if not self.session:
-            await self.initialize()
-            
         url = f"https://graph.facebook.com/v16.0/{phone_number_id}/messages"
         
         # Add recipient to message data
@@ -259,24 +256,17 @@ class WhatsAppConnector:
             'Content-Type': 'application/json'
         }
         
-        try:
-            async with self.session.post(url, headers=headers, json=payload) as response:
-                result = await response.json()
-                
-                if response.status != 200:
-                    logger.error(f"Error sending WhatsApp message: {json.dumps(result)}")
-                    
-                return result
-                
-        except Exception as e:
-            logger.error(f"Error sending WhatsApp message: {str(e)}", exc_info=True)
-            return {'error': str(e)}
+        future = await outbound_sender.submit('whatsapp', phone_number_id, url, payload, headers)
+        if not wait:
+            return {'status': 'queued'}
+        return await future
             
     async def send_text_message(self, 
                               phone_number_id: str, 
                               recipient_number: str, 
                               text: str, 
-                              access_token: str) -> Dict[str, Any]:
+                              access_token: str,
+                              wait: bool = True) -> Dict[str, Any]:
         """
         Send a text message to a recipient
         
@@ -285,20 +275,25 @@ class WhatsAppConnector:
             recipient_number: Recipient's phone number
             text: Message text
             access_token: Access token
+            wait: Whether to wait for the API response instead of only queueing the send
             
         Returns:
-            API response
+            API response, or {'status': 'queued'} if not waiting
         """
         message_data = {
             'type': 'text',
             'text': {'body': text}
         }
-        return await self.send_message(phone_number_id, recipient_number, message_data, access_token)
+        return await self.send_message(phone_number_id, recipient_number, message_data, access_token, wait)
 
 
 # Create global connector instance
 connector = WhatsAppConnector()
 
+# Drain spooled webhook events through the connector
+if connector.spool_workers is not None:
+    connector.spool_workers.register_handler('whatsapp', connector.process_spooled_event)
+
 
 # Message handler for WhatsApp text messages
 async def handle_whatsapp_text(message: Dict[str, Any]):
@@ -316,11 +311,14 @@ async def handle_whatsapp_text(message: Dict[str, Any]):
     logger.info(f"Received WhatsApp message from {from_number}: {text}")
     
     # Process the message through the workflow
+    claimed = False
     try:
-        result = await execute_workflow('whatsapp_message', {
-            'platform': 'whatsapp',
-            'raw_message': message
-        })
+        result = await handle_platform_message('whatsapp', message)
+        if 'error' in result:
+            # The workflow failed and already released the message's claim
+            raise RuntimeError(result['error'])
+        # A dropped duplicate has no message; its claim belongs to the original delivery
+        claimed = result.get('message') is not None
         
         # Check if we got a response
         if result and result.get('response'):
@@ -329,18 +327,25 @@ async def handle_whatsapp_text(message: Dict[str, Any]):
             
             if not access_token:
                 logger.warning("No WhatsApp access token configured")
-                return
-                
-            # Send the response back to the user
-            response_text = result['response']['content']
-            await connector.send_text_message(phone_number_id, from_number, response_text, access_token)
+            else:
+                # Send the response back to the user
+                response_text = result['response']['content']
+                await connector.send_text_message(phone_number_id, from_number, response_text, access_token, wait=False)
+        
+        # The message is handled once its reply is queued; until then a redelivery is processed
+        if claimed:
+            await complete_platform_message('whatsapp', message)
             
     except Exception as e:
         logger.error(f"Error processing WhatsApp message: {str(e)}", exc_info=True)
+        if claimed:
+            await message_processor.forget_message('whatsapp', message)
+        raise
 
 
 # Register the message handler
 connector.register_webhook_handler('text', handle_whatsapp_text)
+register_reply_handler('whatsapp', handle_whatsapp_text)
 
 
 # Create the WhatsApp message workflow
@@ -3,19 +3,47 @@ Message Processing Workflows for Dana AI
 
 This module sets up the core workflows for processing messages across different platforms
 and orchestrating the AI response generation process.
+
+When a checkpoint store is configured, the platform message workflows are
+checkpointed under the message's platform ID. A redelivery of a message
+whose processing was interrupted resumes after the completed steps, so the
+response is not generated twice, and the checkpoint is kept until the reply
+has been queued.
 """
 
+import time
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Callable, Awaitable
 
-from automation.core.workflow_engine import create_workflow, execute_workflow
-from automation.core.message_processor import process_message_workflow_step
+from automation.core.config import get_config
+from automation.core.dispatcher import DEFAULT_DISPATCH_CONCURRENCY, ConversationDispatcher
+from automation.core.spool import get_spool_workers
+from automation.core.tracing import JSONLTraceHook, LatencyHistogramHook
+from automation.core.workflow_engine import (
+    create_workflow, discard_checkpoint, engine, execute_workflow, register_hook, resume_workflow
+)
+from automation.core.message_processor import process_message_workflow_step, processor
 from automation.ai.response_generator import generate_response_workflow_step
 from automation.knowledge.database import retrieve_knowledge_workflow_step
 
 logger = logging.getLogger(__name__)
 
+# Deadline for a single message workflow execution, in seconds
+MESSAGE_WORKFLOW_TIMEOUT = get_config('automation', 'message_workflow_timeout', 120)
+
+# Age after which an interrupted message is no longer resumed (platforms stop redelivering)
+MESSAGE_CHECKPOINT_MAX_AGE = get_config('automation', 'message_checkpoint_max_age', 24 * 60 * 60)
+
+# Step and workflow latency histograms for all workflows
+latency_histogram = LatencyHistogramHook()
+register_hook(latency_histogram)
+
+# Optional local trace file with one JSON line per workflow execution
+_trace_file = get_config('automation', 'trace_file')
+if _trace_file:
+    register_hook(JSONLTraceHook(_trace_file))
+
 # Create the base message processing workflow
 base_message_workflow = create_workflow(
     name='process_message',
@@ -36,6 +64,7 @@ def setup_platform_workflows():
     # Facebook workflow
     facebook_workflow = create_workflow(
         name='facebook_message',
+        checkpoint=True,
         description='Process a Facebook message and generate a response'
     )
     facebook_workflow.add_step(process_message_workflow_step)
@@ -45,6 +74,7 @@ def setup_platform_workflows():
     # Instagram workflow
     instagram_workflow = create_workflow(
         name='instagram_message',
+        checkpoint=True,
         description='Process an Instagram message and generate a response'
     )
     instagram_workflow.add_step(process_message_workflow_step)
@@ -63,6 +93,7 @@ def setup_platform_workflows():
     # WhatsApp workflow
     whatsapp_workflow = create_workflow(
         name='whatsapp_message',
+        checkpoint=True,
         description='Process a WhatsApp message and generate a response'
     )
     whatsapp_workflow.add_step(process_message_workflow_step)
@@ -82,10 +113,13 @@ def initialize_workflows():
     logger.info("Workflows initialized successfully")
 
 
-# Convenience function to handle a message from any platform
-async def handle_platform_message(platform: str, raw_message: Dict[str, Any]) -> Dict[str, Any]:
+async def _process_platform_message(platform: str, raw_message: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Handle a message from any platform
+    Run the platform workflow for a single message
+    
+    The message is claimed in the dedup index before the workflow runs, so
+    a failure only releases a claim this run made: a redelivery that fails
+    leaves the claim of the original delivery in place.
     
     Args:
         platform: Platform identifier (facebook, instagram, whatsapp)
@@ -95,14 +129,200 @@ async def handle_platform_message(platform: str, raw_message: Dict[str, Any]) ->
         Workflow execution result
     """
     workflow_name = f"{platform}_message"
+    execution_id = processor.get_message_key(platform, raw_message)
+    
+    # Drop webhook redeliveries before any further work
+    if await processor.is_duplicate(platform, raw_message):
+        logger.info(f"Dropping duplicate {platform} message")
+        return {'platform': platform, 'raw_message': raw_message, 'message': None}
     
     context = {
         'platform': platform,
-        'raw_message': raw_message
+        'raw_message': raw_message,
+        'message_claimed': True,
+        '_metadata': {'execution_id': execution_id, 'keep_checkpoint': True}
     }
     
     try:
-        return await execute_workflow(workflow_name, context)
+        result = None
+        if execution_id is not None and await engine.has_checkpoint(execution_id):
+            # An earlier delivery was interrupted: skip the steps it completed
+            result = await resume_workflow(execution_id, MESSAGE_WORKFLOW_TIMEOUT, keep_checkpoint=True)
+        if result is None:
+            result = await execute_workflow(workflow_name, context, timeout=MESSAGE_WORKFLOW_TIMEOUT)
+        if result.get('message') is None and execution_id is not None:
+            # The message could not be processed: there is nothing to reply to
+            await discard_checkpoint(execution_id)
+        return result
     except Exception as e:
         logger.error(f"Error handling {platform} message: {str(e)}", exc_info=True)
-        return {'error': str(e)}
\ No newline at end of file
+        # Release this run's claim so a redelivery or spool retry processes the message again
+        await processor.forget_message(platform, raw_message)
+        return {'error': str(e)}
+
+
+async def complete_platform_message(platform: str, raw_message: Dict[str, Any]):
+    """
+    Mark a message as handled once its reply has been queued
+    
+    Remembers the message for deduplication and deletes the checkpoint of
+    its workflow execution.
+    
+    Args:
+        platform: Platform identifier (facebook, instagram, whatsapp)
+        raw_message: Raw message data from the platform
+    """
+    await processor.complete_message(platform, raw_message)
+    execution_id = processor.get_message_key(platform, raw_message)
+    if execution_id is not None:
+        await discard_checkpoint(execution_id)
+
+
+# Platform handlers that process a message and send its reply, by platform
+reply_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
+
+
+def register_reply_handler(platform: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+    """
+    Register the handler that processes a platform message and sends its reply
+    
+    Used to finish messages whose processing was interrupted by a restart.
+    
+    Args:
+        platform: Platform identifier (facebook, instagram, whatsapp)
+        handler: Async function taking the raw message
+    """
+    reply_handlers[platform] = handler
+
+
+async def resume_interrupted_messages() -> int:
+    """
+    Finish the messages whose workflows were interrupted, e.g. by a restart
+    
+    Each checkpointed message goes through its platform's reply handler
+    again: the completed steps are skipped and the reply is sent. Only
+    checkpoints older than the message workflow timeout are taken, so
+    executions still running in another worker are left alone; checkpoints
+    older than MESSAGE_CHECKPOINT_MAX_AGE are deleted instead.
+    
+    Returns:
+        Number of messages resumed
+    """
+    store = engine.checkpoint_store
+    if store is None:
+        return 0
+        
+    handlers = []
+    now = time.time()
+    for checkpoint in await asyncio.to_thread(store.list_pending, MESSAGE_WORKFLOW_TIMEOUT):
+        if now - checkpoint.updated_at > MESSAGE_CHECKPOINT_MAX_AGE:
+            await discard_checkpoint(checkpoint.execution_id)
+            continue
+        platform = checkpoint.context.get('platform')
+        handler = reply_handlers.get(platform)
+        raw_message = checkpoint.context.get('raw_message')
+        if handler is None or raw_message is None:
+            logger.warning(f"Cannot resume execution {checkpoint.execution_id} of {checkpoint.workflow}")
+            continue
+        handlers.append(handler(raw_message))
+        
+    if handlers:
+        logger.info(f"Resuming {len(handlers)} interrupted messages")
+        results = await asyncio.gather(*handlers, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error resuming message: {str(result)}")
+    return len(handlers)
+
+
+# Messages of one conversation are processed in order, conversations in parallel
+# up to dispatcher_concurrency at a time (each webhook payload additionally fans
+# out at most platforms.webhook_fanout_limit items at once)
+message_dispatcher = ConversationDispatcher(
+    _process_platform_message,
+    max_concurrency=get_config('automation', 'dispatcher_concurrency', DEFAULT_DISPATCH_CONCURRENCY),
+    max_queue_size=get_config('automation', 'dispatcher_queue_size', 1000),
+    name='message_dispatcher'
+)
+
+
+# Convenience function to handle a message from any platform
+async def handle_platform_message(platform: str, raw_message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handle a message from any platform
+    
+    The message is queued behind earlier messages of the same conversation
+    and processed in parallel with other conversations.
+    
+    Args:
+        platform: Platform identifier (facebook, instagram, whatsapp)
+        raw_message: Raw message data from the platform
+        
+    Returns:
+        Workflow execution result
+    """
+    conversation_key = processor.get_conversation_key(platform, raw_message)
+    return await message_dispatcher.dispatch(conversation_key, platform, raw_message)
+
+
+def get_dispatcher_metrics() -> Dict[str, Any]:
+    """
+    Get queue depth, concurrency and wait time metrics for the message dispatcher
+    
+    Returns:
+        Dispatcher metrics
+    """
+    return message_dispatcher.get_metrics()
+
+
+def get_workflow_latency_stats() -> Dict[str, Any]:
+    """
+    Get latency statistics for workflows and their steps
+    
+    Returns:
+        Count, average, max and approximate percentiles per workflow and step
+    """
+    return latency_histogram.get_stats()
+
+
+def get_dedup_stats() -> Dict[str, Any]:
+    """
+    Get webhook deduplication statistics
+    
+    Returns:
+        Checked and duplicate message counts and the dedup rate
+    """
+    return processor.get_dedup_stats()
+
+
+async def start_spool_workers():
+    """
+    Start draining spooled webhook events, if spooling is enabled
+    """
+    spool_workers = get_spool_workers()
+    if spool_workers is not None:
+        await spool_workers.start()
+
+
+async def stop_spool_workers():
+    """
+    Stop draining spooled webhook events
+    
+    Events being processed are redelivered once their lease expires.
+    """
+    spool_workers = get_spool_workers()
+    if spool_workers is not None:
+        await spool_workers.stop()
+
+
+def get_spool_metrics() -> Dict[str, Any]:
+    """
+    Get webhook spool depth, lag and worker metrics
+    
+    Returns:
+        Spool metrics, or {'enabled': False} if webhooks are processed inline
+    """
+    spool_workers = get_spool_workers()
+    if spool_workers is None:
+        return {'enabled': False}
+    return dict(spool_workers.get_metrics(), enabled=True)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Intent Matcher Benchmark
+
+This script compares the compiled single-scan IntentMatcher of the rules-based
+generator against looping over Intent.match(), for the built-in intents and
+for tenants with thousands of custom intents, and checks both pick the same
+winning intent.
+
+Usage:
+    python benchmark_intent_matcher.py [--intents=100,1000,5000] [--messages=500]
+                                       [--output=PATH] [--quick]
+
+Options:
+    --intents   Comma-separated custom intent counts to benchmark (default: 100,1000,5000)
+    --messages  Number of synthetic messages per run (default: 500)
+    --output    Where to write the results (default: benchmarks/results/intent_matcher.json)
+    --quick     Fewer intents and messages, for a fast smoke run
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from automation.ai.rules_based_generator import INTENTS, Intent, IntentMatcher
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results', 'intent_matcher.json')
+
+WORDS = ['order', 'refund', 'delivery', 'invoice', 'booking', 'table', 'menu', 'price', 'size',
+         'color', 'store', 'hours', 'shipping', 'return', 'warranty', 'coupon', 'account', 'login']
+
+BASE_MESSAGES = [
+    "hello!",
+    "what can you do",
+    "any updates on my order from last week? I still have not received anything",
+    "thanks, bye",
+    "I would like to know more about the pricing of the premium plan for my team",
+    "Can you tell me when the store opens on Sunday and whether parking is available nearby?"
+]
+
+
+def build_custom_intents(count: int, seed: int = 42) -> List[Intent]:
+    """
+    Build synthetic tenant intents
+
+    Args:
+        count: Number of intents
+        seed: Random seed
+
+    Returns:
+        The intents
+    """
+    rng = random.Random(seed)
+    intents = []
+    for index in range(count):
+        first, second = rng.sample(WORDS, 2)
+        intents.append(Intent(
+            f"custom_{index}",
+            [rf"\b{first}\s+{second}\s+code\s+{index}\b", rf"^(where|when) is my {first} #{index}[\s\.,!?]*$"],
+            ["Custom response {platform}"]
+        ))
+    return intents
+
+
+def build_messages(count: int, num_intents: int, seed: int = 7) -> List[str]:
+    """
+    Build a mix of messages that hit built-in, custom or no intents
+
+    Args:
+        count: Number of messages
+        num_intents: Number of custom intents to target
+        seed: Random seed
+
+    Returns:
+        The messages
+    """
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.5 or not num_intents:
+            messages.append(rng.choice(BASE_MESSAGES))
+        elif kind < 0.75:
+            index = rng.randrange(num_intents)
+            messages.append(f"where is my {rng.choice(WORDS)} #{index}?")
+        else:
+            messages.append(" ".join(rng.choice(WORDS) for _ in range(30)))
+    return messages
+
+
+def loop_match(intents: List[Intent], text: str) -> Optional[str]:
+    """Winner of the previous approach: the first intent whose patterns match"""
+    for intent in intents:
+        if intent.match(text):
+            return intent.name
+    return None
+
+
+def time_per_message_us(func, messages: List[str], repeat: int) -> float:
+    """Best-of-repeat average microseconds per message"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for message in messages:
+            func(message)
+        best = min(best, (time.perf_counter_ns() - start) / len(messages) / 1000)
+    return best
+
+
+def run_case(num_custom: int, num_messages: int, repeat: int) -> Dict[str, Any]:
+    """
+    Benchmark one intent set
+
+    Args:
+        num_custom: Number of custom intents ahead of the built-in ones
+        num_messages: Number of messages
+        repeat: Timing repetitions
+
+    Returns:
+        Results of the case
+    """
+    intents = build_custom_intents(num_custom) + INTENTS
+    messages = build_messages(num_messages, num_custom)
+
+    start = time.perf_counter()
+    matcher = IntentMatcher(intents)
+    compile_seconds = time.perf_counter() - start
+
+    def compiled_match(text):
+        found = matcher.match(text)
+        return found.intent.name if found else None
+
+    mismatches = sum(1 for message in messages if loop_match(intents, message) != compiled_match(message))
+    loop_us = time_per_message_us(lambda text: loop_match(intents, text), messages, repeat)
+    compiled_us = time_per_message_us(compiled_match, messages, repeat)
+
+    logger.info(f"{len(intents)} intents: loop {loop_us:.1f}us, compiled {compiled_us:.1f}us "
+                f"({loop_us / compiled_us:.1f}x), compile {compile_seconds * 1000:.0f}ms, mismatches {mismatches}")
+    return {
+        'intents': len(intents),
+        'messages': len(messages),
+        'loop_us_per_message': loop_us,
+        'compiled_us_per_message': compiled_us,
+        'speedup': loop_us / compiled_us,
+        'compile_seconds': compile_seconds,
+        'mismatches': mismatches
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Intent Matcher Benchmark')
+    parser.add_argument('--intents', default='100,1000,5000', help='Custom intent counts')
+    parser.add_argument('--messages', type=int, default=500, help='Messages per run')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Results file')
+    parser.add_argument('--quick', action='store_true', help='Fewer intents and messages')
+    args = parser.parse_args()
+
+    counts = [0] + [int(count) for count in args.intents.split(',') if count]
+    num_messages = args.messages
+    repeat = 5
+    if args.quick:
+        counts = [count for count in counts if count <= 1000]
+        num_messages = min(num_messages, 100)
+        repeat = 1
+
+    cases = [run_case(count, num_messages, repeat) for count in counts]
+    results = {
+        'benchmark': 'intent_matcher',
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': cases
+    }
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    # The compiled matcher must pick the same intent as the loop
+    return 1 if any(case['mismatches'] for case in cases) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Token Counter Benchmark
+
+This script compares the cached, batched TokenCounter against the previous
+token estimate, which ran two regexes over every message and recounted the
+whole conversation on every request. Each case replays a conversation turn by
+turn and counts the full message list at every turn, as the request path
+does, and also times one cold count of the finished conversation.
+
+Usage:
+    python benchmark_token_counter.py [--messages=50,200,1000] [--words=60]
+                                      [--output=PATH] [--quick]
+
+Options:
+    --messages  Comma-separated conversation lengths to benchmark (default: 50,200,1000)
+    --words     Average words per message (default: 60)
+    --output    Where to write the results (default: benchmarks/results/token_counter.json)
+    --quick     Shorter conversations, for a fast smoke run
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+from utils.token_counter import TokenCounter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results', 'token_counter.json')
+
+WORDS = ['order', 'refund', 'delivery', 'invoice', 'booking', 'table', 'menu', 'price', 'size',
+         'color', 'store', 'hours', 'shipping', 'return', 'warranty', 'coupon', 'account', 'login',
+         'the', 'a', 'is', 'my', 'when', 'can', 'you', 'please', 'thanks', 'week', 'yesterday']
+PUNCTUATION = ['', '', '', ',', '.', '?', '!', ':', '#42', "'s"]
+
+
+def build_conversation(count: int, words: int, seed: int = 42) -> List[Dict[str, str]]:
+    """
+    Build a synthetic customer conversation
+
+    Args:
+        count: Number of messages
+        words: Average words per message
+        seed: Random seed
+
+    Returns:
+        Messages, oldest first
+    """
+    rng = random.Random(seed)
+    messages = [{'role': 'system', 'content': "You are a helpful assistant for an online store."}]
+    for index in range(count):
+        length = max(1, int(rng.gauss(words, words / 3)))
+        content = " ".join(rng.choice(WORDS) + rng.choice(PUNCTUATION) for _ in range(length))
+        messages.append({'role': 'user' if index % 2 == 0 else 'assistant', 'content': content})
+    return messages
+
+
+def previous_estimate(text: str) -> int:
+    """The previous estimate_tokens: one regex for words, one for special characters"""
+    if not text:
+        return 0
+    words = len(re.findall(r'\b\w+\b', text))
+    tokens = int(words * 1.3)
+    tokens += len(re.findall(r'[^\w\s]', text)) // 2
+    return max(1, tokens)
+
+
+def previous_count_messages(messages: List[Dict[str, str]]) -> int:
+    """The previous calculate_openai_tokens for text messages"""
+    token_count = 3
+    for message in messages:
+        token_count += 4 + previous_estimate(message['content']) + len(message['role'])
+    return token_count
+
+
+def time_turns_ms(count_messages, conversation: List[Dict[str, str]]) -> float:
+    """Milliseconds to count the conversation at every turn"""
+    start = time.perf_counter_ns()
+    for turn in range(2, len(conversation) + 1):
+        count_messages(conversation[:turn])
+    return (time.perf_counter_ns() - start) / 1e6
+
+
+def time_cold_us(count_messages, conversation: List[Dict[str, str]], repeat: int) -> float:
+    """Best-of-repeat microseconds to count the whole conversation once"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        count_messages(conversation)
+        best = min(best, (time.perf_counter_ns() - start) / 1000)
+    return best
+
+
+def run_case(num_messages: int, words: int, repeat: int) -> Dict[str, Any]:
+    """
+    Benchmark one conversation length
+
+    Args:
+        num_messages: Messages in the conversation
+        words: Average words per message
+        repeat: Timing repetitions of the cold count
+
+    Returns:
+        Results of the case
+    """
+    conversation = build_conversation(num_messages, words)
+
+    def cold_engine(messages):
+        return TokenCounter(use_bpe=False).count_messages(messages, 'gpt-4o')
+
+    # The engine must count exactly what the previous estimate counted
+    mismatches = int(cold_engine(conversation) != previous_count_messages(conversation))
+
+    previous_ms = time_turns_ms(previous_count_messages, conversation)
+    counter = TokenCounter(use_bpe=False)
+    engine_ms = time_turns_ms(lambda messages: counter.count_messages(messages, 'gpt-4o'), conversation)
+
+    previous_cold_us = time_cold_us(previous_count_messages, conversation, repeat)
+    engine_cold_us = time_cold_us(cold_engine, conversation, repeat)
+
+    logger.info(f"{num_messages} messages: all turns previous {previous_ms:.1f}ms, engine {engine_ms:.1f}ms "
+                f"({previous_ms / engine_ms:.1f}x); cold count previous {previous_cold_us:.0f}us, "
+                f"engine {engine_cold_us:.0f}us ({previous_cold_us / engine_cold_us:.1f}x); "
+                f"cache hit rate {counter.get_stats()['hit_rate']:.1%}, mismatches {mismatches}")
+    return {
+        'messages': num_messages,
+        'average_words': words,
+        'previous_all_turns_ms': previous_ms,
+        'engine_all_turns_ms': engine_ms,
+        'all_turns_speedup': previous_ms / engine_ms,
+        'previous_cold_us': previous_cold_us,
+        'engine_cold_us': engine_cold_us,
+        'cold_speedup': previous_cold_us / engine_cold_us,
+        'cache_hit_rate': counter.get_stats()['hit_rate'],
+        'mismatches': mismatches
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Token Counter Benchmark')
+    parser.add_argument('--messages', default='50,200,1000', help='Conversation lengths')
+    parser.add_argument('--words', type=int, default=60, help='Average words per message')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Results file')
+    parser.add_argument('--quick', action='store_true', help='Shorter conversations')
+    args = parser.parse_args()
+
+    lengths = [int(length) for length in args.messages.split(',') if length]
+    repeat = 5
+    if args.quick:
+        lengths = [length for length in lengths if length <= 200]
+        repeat = 1
+
+    cases = [run_case(length, args.words, repeat) for length in lengths]
+    results = {
+        'benchmark': 'token_counter',
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'tokenizer': TokenCounter().get_stats()['tokenizer'],
+        'cases': cases
+    }
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    # The estimator must count the same tokens as the previous estimate
+    return 1 if any(case['mismatches'] for case in cases) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+"""
+Workflow Engine Benchmark
+
+This script measures the overhead the workflow engine (WorkflowEngine, Workflow
+and WorkflowStep) adds per execution, using synthetic workflows of no-op and
+sleep steps, and compares the results against a stored baseline so engine
+changes can be checked for regressions.
+
+Measured:
+    - per-step overhead of sequential (chained) and graph (independent) workflows
+      with 1-50 no-op steps
+    - scheduling overhead of workflows of short sleep steps
+    - throughput of bulk execution at several concurrency levels
+    - memory per in-flight execution context
+
+Usage:
+    python benchmark_workflow_engine.py [--output=PATH] [--baseline=PATH]
+                                        [--save-baseline] [--tolerance=0.25] [--quick]
+
+Options:
+    --output         Where to write the results (default: benchmarks/results/workflow_engine.json)
+    --baseline       Baseline to compare against (default: benchmarks/workflow_engine_baseline.json,
+                     or benchmarks/workflow_engine_baseline_quick.json with --quick)
+    --save-baseline  Store these results as the new baseline instead of comparing
+    --tolerance      Allowed relative regression before failing (default: 0.25)
+    --quick          Fewer iterations, for a fast smoke run
+
+Quick runs are only compared against a baseline also saved with --quick.
+Exits with status 1 when a metric regressed beyond the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any, List
+
+from automation.core.workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# The engine logs every execution at INFO; keep it out of the measurements
+logging.getLogger('automation').setLevel(logging.WARNING)
+
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results', 'workflow_engine.json')
+DEFAULT_BASELINE = os.path.join('benchmarks', 'workflow_engine_baseline.json')
+DEFAULT_QUICK_BASELINE = os.path.join('benchmarks', 'workflow_engine_baseline_quick.json')
+
+STEP_COUNTS = [1, 5, 10, 25, 50]
+CONCURRENCY_LEVELS = [1, 10, 100]
+SLEEP_SECONDS = 0.001
+
+# Whether a larger value of a metric is better, keyed by metric name prefix
+HIGHER_IS_BETTER = ('throughput_',)
+
+
+def build_workflow(name: str, num_steps: int, layout: str = 'chain', sleep: float = 0.0) -> Workflow:
+    """
+    Build a synthetic workflow
+
+    Args:
+        name: Workflow name
+        num_steps: Number of steps
+        layout: 'chain' (each step reads the previous output, runs sequentially)
+            or 'parallel' (all steps independent, runs as a graph)
+        sleep: Seconds each step sleeps (0 for no-op steps)
+
+    Returns:
+        The workflow
+    """
+    workflow = Workflow(name)
+    for index in range(num_steps):
+        output_key = f"out_{index}"
+        input_key = 'input' if layout == 'parallel' or index == 0 else f"out_{index - 1}"
+
+        if sleep:
+            async def handler(context, output_key=output_key):
+                await asyncio.sleep(sleep)
+                return {output_key: True}
+        else:
+            async def handler(context, output_key=output_key):
+                return {output_key: True}
+
+        workflow.add_step(WorkflowStep(f"step_{index}", handler,
+                                       required_inputs=[input_key], output_keys=[output_key]))
+    return workflow
+
+
+def build_engine(*workflows: Workflow) -> WorkflowEngine:
+    """Create an isolated engine with the given workflows"""
+    engine = WorkflowEngine()
+    for workflow in workflows:
+        engine.register_workflow(workflow)
+    return engine
+
+
+async def measure_step_overhead(iterations: int) -> Dict[str, float]:
+    """
+    Measure engine time per step for no-op workflows
+
+    Args:
+        iterations: Executions per workflow size
+
+    Returns:
+        Metrics in microseconds per step
+    """
+    metrics = {}
+    for layout in ('chain', 'parallel'):
+        for num_steps in STEP_COUNTS:
+            name = f"{layout}_{num_steps}"
+            engine = build_engine(build_workflow(name, num_steps, layout))
+
+            # Warm up
+            for _ in range(10):
+                await engine.execute_workflow(name, {'input': True})
+
+            start = time.perf_counter_ns()
+            for _ in range(iterations):
+                await engine.execute_workflow(name, {'input': True})
+            elapsed_ns = time.perf_counter_ns() - start
+
+            metrics[f"step_overhead_us_{name}"] = elapsed_ns / iterations / num_steps / 1000
+    return metrics
+
+
+async def measure_sleep_overhead(iterations: int) -> Dict[str, float]:
+    """
+    Measure scheduling overhead of workflows of sleep steps
+
+    The overhead is the wall time beyond the ideal (sum of sleeps for a chain,
+    one sleep for independent steps).
+
+    Args:
+        iterations: Executions per workflow
+
+    Returns:
+        Metrics in microseconds per execution
+    """
+    metrics = {}
+    for layout in ('chain', 'parallel'):
+        num_steps = 10
+        name = f"sleep_{layout}_{num_steps}"
+        engine = build_engine(build_workflow(name, num_steps, layout, sleep=SLEEP_SECONDS))
+        ideal = SLEEP_SECONDS * (num_steps if layout == 'chain' else 1)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await engine.execute_workflow(name, {'input': True})
+        elapsed = (time.perf_counter() - start) / iterations
+
+        metrics[f"sleep_overhead_us_{name}"] = max(0.0, elapsed - ideal) * 1e6
+    return metrics
+
+
+async def measure_throughput(executions: int) -> Dict[str, float]:
+    """
+    Measure bulk execution throughput at several concurrency levels
+
+    Args:
+        executions: Executions per concurrency level
+
+    Returns:
+        Metrics in executions per second
+    """
+    metrics = {}
+    noop = build_workflow('throughput_noop', 5)
+    sleepy = build_workflow('throughput_sleep', 5, sleep=SLEEP_SECONDS)
+    engine = build_engine(noop, sleepy)
+
+    for workflow in ('throughput_noop', 'throughput_sleep'):
+        for concurrency in CONCURRENCY_LEVELS:
+            contexts = ({'input': True} for _ in range(executions))
+            start = time.perf_counter()
+            async for _ in engine.execute_many(workflow, contexts, max_concurrency=concurrency):
+                pass
+            elapsed = time.perf_counter() - start
+
+            metrics[f"throughput_per_s_{workflow.split('_', 1)[1]}_c{concurrency}"] = executions / elapsed
+    return metrics
+
+
+async def measure_memory(in_flight: int) -> Dict[str, float]:
+    """
+    Measure memory held per in-flight execution
+
+    Executions are parked on an event so all of them are in flight at once.
+
+    Args:
+        in_flight: Number of concurrent executions
+
+    Returns:
+        Metrics in bytes per execution
+    """
+    release = asyncio.Event()
+    arrived = 0
+
+    async def wait(context):
+        nonlocal arrived
+        arrived += 1
+        await release.wait()
+        return {'out_wait': True}
+
+    workflow = build_workflow('memory', 4)
+    workflow.add_step(WorkflowStep('wait', wait, required_inputs=['out_3'], output_keys=['out_wait']))
+    engine = build_engine(workflow)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tasks = [asyncio.create_task(engine.execute_workflow('memory', {'input': True}))
+             for _ in range(in_flight)]
+    while arrived < in_flight:
+        await asyncio.sleep(0.001)
+    during, _ = tracemalloc.get_traced_memory()
+    release.set()
+    await asyncio.gather(*tasks)
+    tracemalloc.stop()
+
+    return {'memory_bytes_per_inflight_context': (during - before) / in_flight}
+
+
+async def run_benchmarks(quick: bool = False) -> Dict[str, float]:
+    """
+    Run all benchmarks
+
+    Args:
+        quick: Use fewer iterations
+
+    Returns:
+        All metrics
+    """
+    scale = 0.1 if quick else 1.0
+    metrics: Dict[str, float] = {}
+
+    logger.info("Measuring per-step overhead")
+    metrics.update(await measure_step_overhead(max(20, int(2000 * scale))))
+    logger.info("Measuring sleep-step scheduling overhead")
+    metrics.update(await measure_sleep_overhead(max(5, int(100 * scale))))
+    logger.info("Measuring bulk throughput")
+    metrics.update(await measure_throughput(max(50, int(2000 * scale))))
+    logger.info("Measuring memory per in-flight context")
+    metrics.update(await measure_memory(max(100, int(1000 * scale))))
+
+    return metrics
+
+
+def compare_to_baseline(metrics: Dict[str, float], baseline: Dict[str, float],
+                        tolerance: float) -> List[str]:
+    """
+    Compare metrics against a baseline
+
+    Args:
+        metrics: Current metrics
+        baseline: Baseline metrics
+        tolerance: Allowed relative regression
+
+    Returns:
+        Descriptions of the metrics that regressed
+    """
+    regressions = []
+    for name, value in sorted(metrics.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+
+        higher_is_better = name.startswith(HIGHER_IS_BETTER)
+        change = (value - base) / base
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        marker = "REGRESSION" if regressed else "ok"
+        logger.info(f"{name}: {value:.2f} (baseline {base:.2f}, {change:+.1%}) {marker}")
+        if regressed:
+            regressions.append(f"{name}: {value:.2f} vs baseline {base:.2f} ({change:+.1%})")
+    return regressions
+
+
+def write_json(path: str, data: Dict[str, Any]):
+    """Write a JSON file, creating its directory"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Workflow Engine Benchmark')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Results file')
+    parser.add_argument('--baseline', help='Baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative regression')
+    parser.add_argument('--quick', action='store_true', help='Fewer iterations')
+    args = parser.parse_args()
+    baseline_path = args.baseline or (DEFAULT_QUICK_BASELINE if args.quick else DEFAULT_BASELINE)
+
+    metrics = asyncio.run(run_benchmarks(args.quick))
+    results = {
+        'benchmark': 'workflow_engine',
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'metrics': metrics
+    }
+
+    write_json(args.output, results)
+    logger.info(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        write_json(baseline_path, results)
+        logger.info(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        logger.warning(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    # Quick runs use fewer iterations, so their numbers are not comparable to a full run
+    if bool(baseline.get('quick')) != args.quick:
+        kind = 'quick' if baseline.get('quick') else 'full'
+        logger.warning(f"Baseline {baseline_path} is from a {kind} run; skipping the comparison")
+        return 0
+
+    regressions = compare_to_baseline(metrics, baseline.get('metrics', {}), args.tolerance)
+    if regressions:
+        logger.error("Performance regressions detected:\n  " + "\n  ".join(regressions))
+        return 1
+
+    logger.info("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
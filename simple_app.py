@@ -34,6 +34,7 @@ def api_index():
 
 @app.route('/api/status')
 def status():
+    from utils.ai_resilience import get_circuit_breaker_stats
     return jsonify({
         "status": "online",
         "database": "configured",
@@ -41,7 +42,8 @@ def status():
             "ai": "available",
             "slack": "configured",
             "email": "available"
-        }
+        },
+        "ai_providers": get_circuit_breaker_stats()
     })
 
 @app.route('/integrations')
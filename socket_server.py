@@ -100,6 +100,17 @@ def notify_new_message(message, conversation_id, user_id):
         'message': message
     }, room=f"conversation_{conversation_id}")
 
+def notify_message_stream(event, payload, conversation_id):
+    """
+    Notify clients in a conversation room about a streamed AI reply.
+    
+    Args:
+        event: 'message_stream_start', 'message_delta' or 'message_stream_end'.
+        payload: The event data, including the stream ID.
+        conversation_id: The conversation ID.
+    """
+    socketio.emit(event, payload, room=f"conversation_{conversation_id}")
+
 def notify_conversation_update(conversation, user_id):
     """
     Notify clients about a conversation update.
@@ -0,0 +1,324 @@
+"""
+Tests for the async AI client path
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import ai_client as ai_client_module
+from utils.ai_client import AIClient, RequestCoalescer
+from utils.ai_resilience import CircuitBreakerRegistry, ConcurrencyLimiterRegistry, HedgingPolicy
+from utils.completion_cache import CompletionCache
+
+
+class FakeCompletions:
+    def __init__(self, failures=0, hang=False):
+        self.failures = failures
+        self.hang = hang
+        self.calls = 0
+
+    async def create(self, **params):
+        self.calls += 1
+        if self.hang:
+            await asyncio.Event().wait()
+        if self.calls <= self.failures:
+            raise RuntimeError("Rate limit reached for requests")
+        return SimpleNamespace(
+            model=params['model'],
+            choices=[SimpleNamespace(message=SimpleNamespace(content="hi there"))],
+            usage=SimpleNamespace(prompt_tokens=3, completion_tokens=2, total_tokens=5)
+        )
+
+
+def _client(completions, cache=None):
+    client = AIClient()
+    client.completion_cache = cache
+    client.coalescer = RequestCoalescer()
+    client.circuit_breakers = CircuitBreakerRegistry(enabled=True)
+    client.concurrency_limiters = ConcurrencyLimiterRegistry()
+    client.providers = {'openai': True, 'anthropic': False}
+    client.primary_provider = 'openai'
+    client.async_openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client
+
+
+def test_async_request_backs_off_without_blocking(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    def blocking_sleep(delay):
+        raise AssertionError("time.sleep must not be used on the async path")
+
+    monkeypatch.setattr(ai_client_module.asyncio, 'sleep', fake_sleep)
+    monkeypatch.setattr(time, 'sleep', blocking_sleep)
+    completions = FakeCompletions(failures=2)
+
+    response = asyncio.run(_client(completions).send_chat_request_async("system", "hello"))
+
+    assert response['content'] == "hi there"
+    assert response['usage']['total_tokens'] == 5
+    assert completions.calls == 3
+    assert len(delays) == 2
+
+
+def test_async_request_can_be_cancelled():
+    completions = FakeCompletions(hang=True)
+    client = _client(completions)
+
+    async def run():
+        task = asyncio.create_task(client.send_chat_request_async("system", "hello"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert completions.calls == 1
+
+
+def test_generate_response_uses_async_path():
+    completions = FakeCompletions()
+
+    response = asyncio.run(_client(completions).generate_response("hello", enhance_with_knowledge=False))
+
+    assert response['content'] == "hi there"
+    assert completions.calls == 1
+
+
+def test_completions_are_cached_per_tenant():
+    completions = FakeCompletions()
+    client = _client(completions, CompletionCache())
+
+    async def run():
+        first = await client.send_chat_request_async("system", "What are your hours?", user_id='tenant-1')
+        again = await client.send_chat_request_async("system", "  what are your HOURS ", user_id='tenant-1')
+        other = await client.send_chat_request_async("system", "What are your hours?", user_id='tenant-2')
+        hot = await client.send_chat_request_async("system", "What are your hours?", temperature=1.0, user_id='tenant-1')
+        return first, again, other, hot
+
+    first, again, other, hot = asyncio.run(run())
+
+    assert 'cache' not in first.get('metadata', {})
+    assert again['metadata']['cache']['normalized'] is True
+    assert 'cache' not in other.get('metadata', {})
+    assert 'cache' not in hot.get('metadata', {})
+    assert completions.calls == 3
+    assert client.completion_cache.get_stats()['skipped'] == 1
+
+
+def test_identical_concurrent_requests_share_one_call():
+    class SlowCompletions(FakeCompletions):
+        async def create(self, **params):
+            await asyncio.sleep(0.05)
+            return await super().create(**params)
+
+    completions = SlowCompletions()
+    client = _client(completions)
+
+    async def run():
+        return await asyncio.gather(
+            *[client.send_chat_request_async("system", "Is the sale on?", user_id='tenant-1') for _ in range(5)],
+            client.send_chat_request_async("system", "Is the sale on?", user_id='tenant-2')
+        )
+
+    responses = asyncio.run(run())
+
+    assert completions.calls == 2
+    assert all(response['content'] == "hi there" for response in responses)
+    assert sum(1 for response in responses if response.get('metadata', {}).get('coalesced')) == 4
+
+    stats = client.get_coalescing_stats()
+    assert stats['provider_calls'] == 2
+    assert stats['coalesced_requests'] == 4
+    assert stats['in_flight'] == 0
+
+
+def test_clients_share_in_flight_calls():
+    class SlowCompletions(FakeCompletions):
+        async def create(self, **params):
+            await asyncio.sleep(0.05)
+            return await super().create(**params)
+
+    completions = SlowCompletions()
+    client = _client(completions)
+    other = _client(completions)
+    other.coalescer = client.coalescer
+
+    async def run():
+        return await asyncio.gather(
+            client.send_chat_request_async("system", "Is the sale on?", user_id='tenant-1'),
+            other.send_chat_request_async("system", "Is the sale on?", user_id='tenant-1')
+        )
+
+    asyncio.run(run())
+    # The same key on another event loop starts its own call
+    asyncio.run(run())
+
+    assert completions.calls == 2
+    assert client.get_coalescing_stats()['coalesced_requests'] == 2
+    assert client.get_coalescing_stats()['in_flight'] == 0
+
+
+def test_cancelled_follower_does_not_cancel_shared_call():
+    class SlowCompletions(FakeCompletions):
+        async def create(self, **params):
+            await asyncio.sleep(0.05)
+            return await super().create(**params)
+
+    completions = SlowCompletions()
+    client = _client(completions)
+
+    async def run():
+        leader = asyncio.create_task(client.send_chat_request_async("system", "hello", user_id='tenant-1'))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(client.send_chat_request_async("system", "hello", user_id='tenant-1'))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(run())['content'] == "hi there"
+    assert completions.calls == 1
+
+
+def test_requests_without_tenant_are_not_shared():
+    class SlowCompletions(FakeCompletions):
+        async def create(self, **params):
+            await asyncio.sleep(0.05)
+            return await super().create(**params)
+
+    completions = SlowCompletions()
+    client = _client(completions, cache=CompletionCache())
+
+    async def run():
+        await asyncio.gather(*[client.send_chat_request_async("system", "Is the sale on?") for _ in range(2)])
+        await client.send_chat_request_async("system", "Is the sale on?")
+
+    asyncio.run(run())
+
+    assert completions.calls == 3
+    assert client.completion_cache.get_stats()['skipped'] == 3
+
+
+class FakeAnthropicMessages:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **params):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(
+            model=params['model'],
+            content=[SimpleNamespace(text="from anthropic")],
+            usage=SimpleNamespace(input_tokens=3, output_tokens=2)
+        )
+
+
+def _hedging_client(openai_delay, anthropic_delay):
+    class SlowCompletions(FakeCompletions):
+        async def create(self, **params):
+            await asyncio.sleep(openai_delay)
+            return await super().create(**params)
+
+    client = _client(SlowCompletions())
+    client.providers['anthropic'] = True
+    client.fallback_provider = 'anthropic'
+    client.async_anthropic_client = SimpleNamespace(messages=FakeAnthropicMessages(anthropic_delay))
+    client.hedging = HedgingPolicy(enabled=True, min_delay=0.02, max_delay=0.02, initial_delay=0.02)
+    return client
+
+
+def test_slow_primary_is_hedged_to_fallback():
+    client = _hedging_client(openai_delay=0.5, anthropic_delay=0.0)
+
+    start = time.perf_counter()
+    response = asyncio.run(client.send_chat_request_async("system", "hello"))
+
+    assert time.perf_counter() - start < 0.4
+    assert response['content'] == "from anthropic"
+    assert response['metadata']['hedged'] is True
+    assert response['metadata']['fallback_from'] == 'openai'
+
+    stats = client.get_hedging_stats()
+    assert stats['hedged'] == 1
+    assert stats['hedge_wins'] == 1
+    assert stats['hedge_rate'] == 1.0
+    # The cancelled primary still counts, as a lower bound of its latency
+    assert stats['providers']['openai']['samples'] == 1
+    assert stats['providers']['openai']['p50_seconds'] >= 0.02
+
+
+def test_explicit_provider_is_not_hedged():
+    client = _hedging_client(openai_delay=0.1, anthropic_delay=0.0)
+
+    response = asyncio.run(client.send_chat_request_async("system", "hello", provider='openai'))
+
+    assert response['content'] == "hi there"
+    assert client.async_anthropic_client.messages.calls == 0
+    assert client.get_hedging_stats()['hedged'] == 0
+
+
+def test_fast_primary_is_not_hedged():
+    client = _hedging_client(openai_delay=0.0, anthropic_delay=0.0)
+
+    response = asyncio.run(client.send_chat_request_async("system", "hello"))
+
+    assert response['content'] == "hi there"
+    assert client.async_anthropic_client.messages.calls == 0
+    assert client.get_hedging_stats()['hedge_rate'] == 0.0
+    assert client.get_hedging_stats()['providers']['openai']['samples'] == 1
+
+
+def test_rate_limits_cut_provider_concurrency(monkeypatch):
+    async def fake_sleep(delay):
+        pass
+
+    monkeypatch.setattr(ai_client_module.asyncio, 'sleep', fake_sleep)
+    client = _client(FakeCompletions(failures=1))
+    client.hedging = HedgingPolicy(enabled=False)
+
+    response = asyncio.run(client.send_chat_request_async("system", "hello"))
+
+    assert response['content'] == "hi there"
+    stats = client.get_concurrency_stats()['openai']
+    assert stats['rate_limited'] == 1
+    assert stats['decreases'] == 1
+    assert stats['successes'] == 1
+    assert stats['in_flight'] == 0
+    assert stats['limit'] < 8
+
+
+def test_open_circuit_routes_to_healthy_provider():
+    client = _hedging_client(openai_delay=0.0, anthropic_delay=0.0)
+    client.hedging = HedgingPolicy(enabled=False)
+    breaker = client.circuit_breaker('openai')
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+
+    response = asyncio.run(client.send_chat_request_async("system", "hello"))
+
+    assert response['content'] == "from anthropic"
+    assert client.async_openai_client.chat.completions.calls == 0
+    stats = client.get_circuit_breaker_stats()
+    assert stats['openai:gpt-4o']['state'] == 'open'
+    assert stats['anthropic:claude-3-5-sonnet-20241022']['state'] == 'closed'
+
+
+def test_circuit_opening_mid_retry_skips_remaining_attempts(monkeypatch):
+    async def fake_sleep(delay):
+        pass
+
+    monkeypatch.setattr(ai_client_module.asyncio, 'sleep', fake_sleep)
+    completions = FakeCompletions(failures=10)
+    client = _client(completions)
+    client.circuit_breakers = CircuitBreakerRegistry(enabled=True, min_calls=2)
+
+    response = asyncio.run(client.send_chat_request_async("system", "hello"))
+
+    assert completions.calls == 2
+    assert 'Circuit open' in response['error']
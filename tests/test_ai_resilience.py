@@ -0,0 +1,205 @@
+"""
+Tests for AI provider resilience
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from utils.ai_resilience import (
+    AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError,
+    ConcurrencyLimiterRegistry, HedgingPolicy, LatencyWindow
+)
+
+
+def test_latency_window_percentiles():
+    window = LatencyWindow(size=100)
+    for value in range(1, 101):
+        window.record(value / 100)
+
+    assert window.percentile(0.5) == 0.5
+    assert window.percentile(0.95) == 0.95
+    assert LatencyWindow().percentile(0.5) is None
+
+
+def test_hedge_delay_follows_recent_latency():
+    policy = HedgingPolicy(percentile=0.9, min_delay=0.1, max_delay=5, initial_delay=2, min_samples=10)
+    assert policy.hedge_delay('openai') == 2
+
+    for value in range(1, 21):
+        policy.record_latency('openai', value / 10)
+    assert policy.hedge_delay('openai') == 1.8
+
+    for _ in range(200):
+        policy.record_latency('openai', 30)
+    assert policy.hedge_delay('openai') == 5
+
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=1.5)
+
+
+def test_limiter_queues_requests_over_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=10)
+    active = []
+    peak = []
+
+    async def request():
+        async with limiter.slot():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def run():
+        await asyncio.gather(*[request() for _ in range(6)])
+
+    asyncio.run(run())
+
+    stats = limiter.get_stats()
+    assert max(peak) == 2
+    assert stats['queued_requests'] == 4
+    assert stats['queued'] == 0
+    assert stats['in_flight'] == 0
+    assert stats['max_queue_wait_seconds'] > 0
+
+
+def test_limiter_grows_additively_and_cuts_multiplicatively():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=10)
+
+    async def run():
+        # A limit's worth of successes raises the limit by about one
+        for _ in range(4):
+            started = await limiter.acquire()
+            limiter.release(started, 'success')
+        grown = limiter._limit
+
+        # Rate limits from requests of the same round cut only once
+        first = await limiter.acquire()
+        second = await limiter.acquire()
+        limiter.release(first, 'rate_limited')
+        limiter.release(second, 'rate_limited')
+        return grown
+
+    assert 4.8 < asyncio.run(run()) < 5
+    assert limiter.limit == 2
+    assert limiter.get_stats()['decreases'] == 1
+    assert limiter.get_stats()['rate_limited'] == 2
+
+
+def test_limiter_is_shared_by_event_loops_in_threads():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1)
+    active = []
+    peak = []
+
+    async def request():
+        async with limiter.slot():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def requests():
+        await asyncio.wait_for(asyncio.gather(*[request() for _ in range(3)]), timeout=5)
+
+    def run():
+        asyncio.run(requests())
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = limiter.get_stats()
+    assert max(peak) == 1
+    assert stats['successes'] == 9
+    assert stats['in_flight'] == 0
+
+
+def test_cancelled_waiter_returns_its_slot():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1)
+
+    async def run():
+        started = await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        # The slot is handed over, but the waiter gives up before it resumes
+        limiter.release(started)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+
+    assert limiter.in_flight == 0
+
+
+def test_limiter_registry_keys_limiters_by_provider():
+    registry = ConcurrencyLimiterRegistry(initial_limit=2)
+
+    assert registry.get('openai') is registry.get('openai')
+    assert registry.get('anthropic') is not registry.get('openai')
+    assert registry.get('openai').limit == 2
+    assert set(registry.get_stats()) == {'openai', 'anthropic'}
+
+
+def test_limiter_rejects_invalid_limits():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(initial_limit=5, max_limit=4)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(decrease_factor=1.5)
+
+
+def test_circuit_opens_on_error_rate_and_recovers_after_probes():
+    breaker = CircuitBreaker('openai:gpt-4o', enabled=True, error_rate=0.5, min_calls=4,
+                             open_seconds=0.0, probes=2)
+    for failed in (False, True, False, True):
+        if failed:
+            breaker.record_failure(0.1)
+        else:
+            breaker.record_success(0.1)
+
+    # With no cool-down the open circuit is immediately half-open
+    assert breaker.opened == 1
+    assert breaker.state == 'half_open'
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    assert breaker.state == 'closed'
+    assert breaker.health_score() == 1.0
+
+
+def test_open_circuit_refuses_calls_until_cool_down():
+    breaker = CircuitBreaker('anthropic', enabled=True, min_calls=2, open_seconds=60)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.is_available()
+    with pytest.raises(CircuitOpenError):
+        with breaker.call():
+            pass
+
+    stats = breaker.get_stats()
+    assert stats['rejected'] == 1
+    assert stats['health'] == 0.0
+    assert 0 < stats['retry_in_seconds'] <= 60
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = CircuitBreaker('openai', enabled=True, slow_call=1.0, slow_rate=0.5, min_calls=2)
+    breaker.record_success(2.0)
+    breaker.record_success(3.0)
+
+    assert breaker.state == 'open'
+
+
+def test_registry_keys_breakers_by_provider_and_model():
+    registry = CircuitBreakerRegistry(enabled=True)
+
+    assert registry.get('openai', 'gpt-4o') is registry.get('openai', 'gpt-4o')
+    assert registry.get('openai', 'gpt-4o-mini') is not registry.get('openai', 'gpt-4o')
+    assert set(registry.get_stats()) == {'openai:gpt-4o', 'openai:gpt-4o-mini'}
@@ -0,0 +1,90 @@
+"""
+Tests for workflow checkpointing and resume
+"""
+
+import asyncio
+
+import pytest
+
+from automation.core.checkpoint import SQLiteCheckpointStore
+from automation.core.workflow_engine import Workflow, WorkflowEngine, WorkflowStep
+
+
+def build_engine(store, calls, fail_on=None):
+    async def parse(context):
+        calls.append('parse')
+        return {'parsed': context['raw'].strip()}
+
+    async def generate(context):
+        calls.append('generate')
+        if fail_on == 'generate':
+            raise RuntimeError('worker died')
+        return {'response': context['parsed'].upper()}
+
+    workflow = Workflow('checkpointed', checkpoint=True)
+    workflow.add_step(WorkflowStep('parse', parse, required_inputs=['raw'], output_keys=['parsed']))
+    workflow.add_step(WorkflowStep('generate', generate, required_inputs=['parsed'], output_keys=['response']))
+
+    engine = WorkflowEngine(checkpoint_store=store)
+    engine.register_workflow(workflow)
+    return engine
+
+
+def test_resume_skips_completed_steps(tmp_path):
+    store = SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    calls = []
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(build_engine(store, calls, fail_on='generate').execute_workflow(
+            'checkpointed', {'raw': ' hi ', '_metadata': {'execution_id': 'exec-1'}}))
+
+    checkpoint = store.load('exec-1')
+    assert checkpoint.completed_steps == ['parse']
+    assert checkpoint.context['parsed'] == 'hi'
+
+    # A fresh engine, as after a worker restart
+    calls.clear()
+    restarted = build_engine(SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db')), calls)
+    results = asyncio.run(restarted.resume_pending())
+
+    assert calls == ['generate']
+    assert results[0]['response'] == 'HI'
+    assert results[0]['_metadata']['execution']['step_execution']['parse']['status'] == 'restored'
+    assert store.load('exec-1') is None
+
+
+def test_successful_execution_leaves_no_checkpoint(tmp_path):
+    store = SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    engine = build_engine(store, [])
+
+    asyncio.run(engine.execute_workflow('checkpointed', {'raw': 'x'}))
+
+    assert store.list_pending() == []
+
+
+def test_resume_unknown_execution_returns_none(tmp_path):
+    engine = build_engine(SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db')), [])
+
+    assert asyncio.run(engine.resume_workflow('missing')) is None
+
+
+def test_kept_checkpoint_is_reused_until_discarded(tmp_path):
+    store = SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    calls = []
+    engine = build_engine(store, calls)
+
+    # The reply could not be sent: the checkpoint outlives the successful run
+    asyncio.run(engine.execute_workflow(
+        'checkpointed', {'raw': 'hi', '_metadata': {'execution_id': 'facebook:m1', 'keep_checkpoint': True}}))
+    assert asyncio.run(engine.has_checkpoint('facebook:m1'))
+    assert store.load('facebook:m1').completed_steps == ['generate', 'parse']
+
+    # The redelivery gets the response without running any step again
+    calls.clear()
+    result = asyncio.run(engine.resume_workflow('facebook:m1', keep_checkpoint=True))
+    assert calls == []
+    assert result['response'] == 'HI'
+    assert asyncio.run(engine.has_checkpoint('facebook:m1'))
+
+    asyncio.run(engine.discard_checkpoint('facebook:m1'))
+    assert not asyncio.run(engine.has_checkpoint('facebook:m1'))
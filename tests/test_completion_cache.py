@@ -0,0 +1,75 @@
+"""
+Tests for the AI completion cache
+"""
+
+import time
+
+from utils.completion_cache import CompletionCache, make_cache_keys, normalize_text
+
+
+def _keys(message, tenant_id='tenant-1', temperature=0.2):
+    return make_cache_keys(tenant_id, 'openai', 'gpt-4o', "Be helpful", message, temperature=temperature)
+
+
+def test_normalized_prompts_share_an_entry():
+    cache = CompletionCache()
+    cache.set(_keys("What are your opening hours?"), {'content': 'Nine to five'}, latency=1.5)
+
+    assert normalize_text("  What are your   opening HOURS?! ") == "what are your opening hours"
+    hit = cache.get(_keys("what are your opening hours"))
+    assert hit['content'] == 'Nine to five'
+    assert hit['metadata']['cache']['normalized'] is True
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['normalized_hits'] == 1
+    assert stats['latency_saved_seconds'] == 1.5
+    assert stats['memory_bytes'] > 0
+
+
+def test_entries_are_isolated_per_tenant_and_expire():
+    cache = CompletionCache(ttl=0.05)
+    cache.set(_keys("hi", 'tenant-1'), {'content': 'Hello'}, latency=1.0, tenant_id='tenant-1')
+
+    assert cache.get(_keys("hi", 'tenant-2')) is None
+    assert cache.get(_keys("hi", 'tenant-1')) is not None
+
+    time.sleep(0.1)
+    assert cache.get(_keys("hi", 'tenant-1')) is None
+
+
+def test_errors_and_hot_temperatures_are_not_cached():
+    cache = CompletionCache(max_temperature=0.5)
+    cache.set(_keys("hi"), {'content': 'Error', 'error': 'Rate limit'}, latency=1.0)
+
+    assert cache.get(_keys("hi")) is None
+    assert cache.is_cacheable(0.5)
+    assert not cache.is_cacheable(0.9)
+
+
+def test_disk_tier_survives_restart_and_clears_per_tenant(tmp_path):
+    path = str(tmp_path / 'completions.db')
+    cache = CompletionCache(path=path)
+    cache.set(_keys("hi", 'tenant-1'), {'content': 'Hello'}, latency=2.0, tenant_id='tenant-1')
+    cache.set(_keys("hi", 'tenant-2'), {'content': 'Hey'}, latency=2.0, tenant_id='tenant-2')
+    cache.close()
+
+    reopened = CompletionCache(path=path)
+    hit = reopened.get(_keys("hi", 'tenant-1'), 'tenant-1')
+    assert hit['metadata']['cache']['tier'] == 'disk'
+    assert reopened.get(_keys("hi", 'tenant-1'), 'tenant-1')['metadata']['cache']['tier'] == 'memory'
+
+    reopened.clear('tenant-2')
+    assert reopened.get(_keys("hi", 'tenant-2'), 'tenant-2') is None
+    assert reopened.get_stats()['disk_entries'] == 2
+    reopened.close()
+
+
+def test_disk_tier_is_pruned_periodically(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / 'completions.db'), max_disk_entries=3, prune_interval=4)
+    for n in range(10):
+        cache.set(_keys(f"question {n}"), {'content': str(n)}, latency=1.0)
+
+    # Pruned on the 1st, 5th and 9th store; the 10th store is not checked yet
+    assert 3 < cache.get_stats()['disk_entries'] <= 3 + 2
+    cache.close()
@@ -0,0 +1,179 @@
+"""
+Tests for webhook deduplication
+"""
+
+import asyncio
+import time
+
+from automation.core.dedup import MemoryDedupIndex, SQLiteDedupIndex
+from automation.core.message_processor import (
+    MessageProcessor, facebook_message_adapter, processor
+)
+
+
+def _facebook_event(mid):
+    return {
+        'sender': {'id': 'user-1'},
+        'recipient': {'id': 'page-1'},
+        'message': {'mid': mid, 'text': 'hello'},
+        'timestamp': 1700000000000
+    }
+
+
+def test_memory_index_detects_duplicates():
+    index = MemoryDedupIndex()
+
+    assert index.claim('facebook:m1') is False
+    assert index.claim('facebook:m1') is True
+    index.mark_done('facebook:m1')
+    assert index.claim('facebook:m1') is True
+    assert index.claim('facebook:m2') is False
+
+    stats = index.get_stats()
+    assert stats['checked'] == 4
+    assert stats['duplicates'] == 2
+    assert stats['dedup_rate'] == 2 / 4
+
+
+def test_memory_index_forgets_after_ttl():
+    index = MemoryDedupIndex(ttl=0.05, num_buckets=5)
+    index.claim('a')
+    index.mark_done('a')
+    time.sleep(0.12)
+
+    assert index.claim('a') is False
+
+
+def test_memory_index_is_bounded():
+    index = MemoryDedupIndex(ttl=0.6, num_buckets=60, max_entries=100)
+    for n in range(250):
+        index.claim(str(n))
+        index.mark_done(str(n))
+        if n % 50 == 49:
+            time.sleep(0.02)
+    index.claim('last')
+
+    assert len(index) <= 101
+
+
+def test_memory_index_keeps_the_current_bucket_in_a_burst():
+    index = MemoryDedupIndex(ttl=60, num_buckets=1, max_entries=100)
+    for n in range(250):
+        index.claim(str(n))
+        index.mark_done(str(n))
+
+    # Every ID of the burst is still detected as a redelivery
+    assert all(index.claim(str(n)) for n in range(250))
+
+
+def test_sqlite_index_survives_restart(tmp_path):
+    path = str(tmp_path / 'dedup.db')
+    index = SQLiteDedupIndex(path)
+    index.claim('whatsapp:wamid.1')
+    index.mark_done('whatsapp:wamid.1')
+    index.close()
+
+    reopened = SQLiteDedupIndex(path)
+    assert reopened.claim('whatsapp:wamid.1') is True
+    assert reopened.claim('whatsapp:wamid.2') is False
+    reopened.close()
+
+
+def test_sqlite_index_reaccepts_expired_ids(tmp_path):
+    index = SQLiteDedupIndex(str(tmp_path / 'dedup.db'), ttl=0.05)
+    index.claim('a')
+    index.mark_done('a')
+    time.sleep(0.1)
+
+    assert index.claim('a') is False
+    assert index.claim('a') is True
+    index.close()
+
+
+def test_processor_drops_redelivered_messages():
+    handled = []
+
+    async def handler(message):
+        handled.append(message.message_id)
+
+    message_processor = MessageProcessor(dedup_index=MemoryDedupIndex())
+    message_processor.register_platform_adapter('facebook', facebook_message_adapter,
+                                                lambda raw: raw['message']['mid'])
+    message_processor.register_message_handler(handler)
+
+    async def run():
+        first = await message_processor.process_message('facebook', _facebook_event('m1'))
+        again = await message_processor.process_message('facebook', _facebook_event('m1'))
+        return first, again
+
+    first, again = asyncio.run(run())
+
+    assert first is not None
+    assert again is None
+    assert handled == ['m1']
+    assert message_processor.get_dedup_stats()['duplicates'] == 1
+
+
+def test_standard_adapters_read_platform_message_ids():
+    assert processor.message_id_getters['facebook'](_facebook_event('m1')) == 'm1'
+    assert processor.message_id_getters['whatsapp']({'id': 'wamid.1'}) == 'wamid.1'
+
+
+def test_discarded_ids_are_accepted_again(tmp_path):
+    for index in (MemoryDedupIndex(), SQLiteDedupIndex(str(tmp_path / 'dedup.db'))):
+        index.claim('facebook:m1')
+        index.discard('facebook:m1')
+
+        assert index.claim('facebook:m1') is False
+
+
+def test_claims_expire_unless_marked_done(tmp_path):
+    for index in (MemoryDedupIndex(lease=0.05), SQLiteDedupIndex(str(tmp_path / 'dedup.db'), lease=0.05)):
+        assert index.claim('facebook:m1') is False
+        assert index.claim('facebook:m1') is True
+
+        # The worker died before the reply was queued: the redelivery is processed
+        time.sleep(0.1)
+        assert index.claim('facebook:m1') is False
+
+        index.mark_done('facebook:m1')
+        time.sleep(0.1)
+        assert index.claim('facebook:m1') is True
+
+
+def test_sqlite_index_is_used_off_the_event_loop(tmp_path):
+    index = SQLiteDedupIndex(str(tmp_path / 'dedup.db'))
+
+    async def run():
+        first = await index.claim_async('facebook:m1')
+        await index.mark_done_async('facebook:m1')
+        again = await index.claim_async('facebook:m1')
+        await index.discard_async('facebook:m1')
+        return first, again, await index.claim_async('facebook:m1')
+
+    assert asyncio.run(run()) == (False, True, False)
+    index.close()
+
+
+def test_interrupted_message_is_processed_on_redelivery():
+    message_processor = MessageProcessor(dedup_index=MemoryDedupIndex(lease=0.05))
+    message_processor.register_platform_adapter('facebook', facebook_message_adapter,
+                                                lambda raw: raw['message']['mid'])
+
+    async def run():
+        first = await message_processor.process_message('facebook', _facebook_event('m1'))
+        duplicate = await message_processor.process_message('facebook', _facebook_event('m1'))
+        # The first worker dies before its reply is queued
+        await asyncio.sleep(0.1)
+        redelivered = await message_processor.process_message('facebook', _facebook_event('m1'))
+        await message_processor.complete_message('facebook', _facebook_event('m1'))
+        await asyncio.sleep(0.1)
+        again = await message_processor.process_message('facebook', _facebook_event('m1'))
+        return first, duplicate, redelivered, again
+
+    first, duplicate, redelivered, again = asyncio.run(run())
+
+    assert first is not None
+    assert duplicate is None
+    assert redelivered is not None
+    assert again is None
@@ -0,0 +1,128 @@
+"""
+Tests for the conversation dispatcher
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from automation.core.dispatcher import ConversationDispatcher
+
+
+def test_same_conversation_is_processed_in_order():
+    processed = []
+
+    async def handler(conversation, sequence):
+        await asyncio.sleep(0.01 if sequence == 0 else 0)
+        processed.append((conversation, sequence))
+        return sequence
+
+    async def run():
+        dispatcher = ConversationDispatcher(handler, max_concurrency=4)
+        results = await asyncio.gather(*(dispatcher.dispatch('conv-1', 'conv-1', i) for i in range(5)))
+        await dispatcher.stop()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == [0, 1, 2, 3, 4]
+    assert [sequence for _, sequence in processed] == [0, 1, 2, 3, 4]
+
+
+def test_different_conversations_run_in_parallel():
+    async def handler(conversation):
+        await asyncio.sleep(0.1)
+        return conversation
+
+    async def run():
+        dispatcher = ConversationDispatcher(handler, max_concurrency=8)
+        keys = ['a', 'b', 'c', 'd']
+        start = time.perf_counter()
+        await asyncio.gather(*(dispatcher.dispatch(key, key) for key in keys))
+        elapsed = time.perf_counter() - start
+        await dispatcher.stop()
+        return elapsed
+
+    assert asyncio.run(run()) < 0.2
+
+
+def test_handler_errors_reach_the_caller_and_metrics():
+    async def handler(value):
+        if value == 'bad':
+            raise RuntimeError('failed')
+        return value
+
+    async def run():
+        dispatcher = ConversationDispatcher(handler, max_concurrency=2)
+        with pytest.raises(RuntimeError):
+            await dispatcher.dispatch('conv', 'bad')
+        assert await dispatcher.dispatch('conv', 'good') == 'good'
+        metrics = dispatcher.get_metrics()
+        await dispatcher.stop()
+        return metrics
+
+    metrics = asyncio.run(run())
+
+    assert metrics['processed'] == 2
+    assert metrics['failed'] == 1
+    assert metrics['queue_depth'] == 0
+    assert metrics['conversations'] == 0
+
+
+def test_stopping_without_drain_resolves_the_running_item():
+    started = asyncio.Event()
+
+    async def handler(value):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def run():
+        dispatcher = ConversationDispatcher(handler, max_concurrency=1)
+        running = asyncio.ensure_future(dispatcher.dispatch('conv', 'slow'))
+        await started.wait()
+        await dispatcher.stop(drain=False)
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(running, timeout=1)
+
+    asyncio.run(run())
+
+
+def test_many_conversations_are_not_capped_by_a_lane_count():
+    async def handler(conversation):
+        await asyncio.sleep(0.1)
+        return conversation
+
+    async def run():
+        dispatcher = ConversationDispatcher(handler, max_concurrency=32)
+        keys = [f"conv-{n}" for n in range(32)]
+        start = time.perf_counter()
+        results = await asyncio.gather(*(dispatcher.dispatch(key, key) for key in keys))
+        elapsed = time.perf_counter() - start
+        await dispatcher.stop()
+        return results, keys, elapsed
+
+    results, keys, elapsed = asyncio.run(run())
+
+    assert results == keys
+    assert elapsed < 0.3
+
+
+def test_concurrency_limit_applies_across_conversations():
+    running = []
+    peak = []
+
+    async def handler(conversation):
+        running.append(conversation)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(conversation)
+
+    async def run():
+        dispatcher = ConversationDispatcher(handler, max_concurrency=3)
+        await asyncio.gather(*(dispatcher.dispatch(f"conv-{n}", f"conv-{n}") for n in range(10)))
+        await dispatcher.stop()
+
+    asyncio.run(run())
+
+    assert max(peak) == 3
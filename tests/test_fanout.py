@@ -0,0 +1,81 @@
+"""
+Tests for concurrent webhook item dispatch
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from automation.platforms.fanout import WebhookItem, dispatch_webhook_items
+
+
+def test_batch_costs_about_one_handler_latency():
+    async def handler(payload):
+        await asyncio.sleep(0.05)
+
+    items = [WebhookItem(handler, {'n': n}, {'n': n}, 'message', order_key=f"user-{n}") for n in range(50)]
+
+    start = time.perf_counter()
+    results = asyncio.run(dispatch_webhook_items(items, max_concurrency=50))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert [result['n'] for result in results] == list(range(50))
+    assert all(result['status'] == 'processed' for result in results)
+
+
+def test_fanout_limit_bounds_running_handlers():
+    running = 0
+    peak = 0
+
+    async def handler(payload):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    items = [WebhookItem(handler, {}, {}, 'message') for _ in range(20)]
+    asyncio.run(dispatch_webhook_items(items, max_concurrency=3))
+
+    assert peak == 3
+
+
+def test_items_with_same_order_key_run_in_payload_order():
+    seen = []
+
+    async def handler(payload):
+        await asyncio.sleep(0.02 if payload['n'] == 0 else 0)
+        seen.append(payload['n'])
+
+    items = [WebhookItem(handler, {'n': n}, {}, 'message', order_key='user-1') for n in range(3)]
+    asyncio.run(dispatch_webhook_items(items))
+
+    assert seen == [0, 1, 2]
+
+
+def test_per_item_outcomes():
+    async def ok(payload):
+        pass
+
+    async def fails(payload):
+        raise RuntimeError('boom')
+
+    items = [
+        WebhookItem(ok, {}, {'event_type': 'message'}, 'message'),
+        WebhookItem(fails, {}, {'event_type': 'postback'}, 'postback'),
+        WebhookItem(None, {}, {'event_type': 'read'}, 'read')
+    ]
+    results = asyncio.run(dispatch_webhook_items(items))
+
+    assert results == [
+        {'event_type': 'message', 'status': 'processed'},
+        {'event_type': 'postback', 'status': 'error', 'error': 'boom'},
+        {'event_type': 'read', 'status': 'ignored'}
+    ]
+
+
+def test_invalid_fanout_limit():
+    with pytest.raises(ValueError):
+        asyncio.run(dispatch_webhook_items([], max_concurrency=0))
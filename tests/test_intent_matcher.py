@@ -0,0 +1,69 @@
+"""
+Tests for the compiled intent matcher
+"""
+
+import automation.ai.rules_based_generator as rules_based_generator
+from automation.ai.rules_based_generator import (
+    INTENTS, Intent, IntentMatcher, clear_tenant_intents, default_matcher,
+    get_intent_matcher, load_tenant_intents
+)
+
+
+def _loop_match(intents, text):
+    for intent in intents:
+        if intent.match(text):
+            return intent.name
+    return None
+
+
+def test_matcher_agrees_with_loop_on_builtin_intents():
+    texts = [
+        "hello!", "Good Morning", "thanks, bye", "what can you do", "How does this work?",
+        "status report please", "whats up", "any news?", "help me", "nothing to see here", ""
+    ]
+    for text in texts:
+        found = default_matcher.match(text)
+        assert (found.intent.name if found else None) == _loop_match(INTENTS, text), text
+
+
+def test_earlier_intent_wins():
+    intents = [
+        Intent("refund", [r"refund"], ["Refund"]),
+        Intent("order", [r"order \d+"], ["Order"])
+    ]
+    matcher = IntentMatcher(intents)
+
+    assert matcher.match("order 12 needs a refund").intent.name == "refund"
+    assert matcher.match("where is order 12").intent.name == "order"
+    assert [found.intent.name for found in matcher.match_all("order 12 needs a refund")] == ["refund", "order"]
+
+
+def test_patterns_without_literals_are_still_matched():
+    matcher = IntentMatcher([Intent("number", [r"^\d+$"], ["Number"])])
+
+    found = matcher.match("12345")
+    assert found.intent.name == "number"
+    assert found.confidence == 1.0
+    assert matcher.match("abc") is None
+
+
+def test_tenant_intents_take_priority():
+    load_tenant_intents("tenant-1", [
+        {"name": "custom_hello", "patterns": [r"^hello"], "templates": ["Hi from us"]}
+    ])
+    try:
+        assert get_intent_matcher("tenant-1").match("hello").intent.name == "custom_hello"
+        assert get_intent_matcher("tenant-2").match("hello").intent.name == "greeting"
+    finally:
+        clear_tenant_intents("tenant-1")
+
+    assert get_intent_matcher("tenant-1") is default_matcher
+
+
+def test_matcher_falls_back_to_plain_regexes_without_the_re_parser(monkeypatch):
+    monkeypatch.setattr(rules_based_generator, 'sre_parse', None)
+    matcher = IntentMatcher(INTENTS)
+
+    for text in ["hello!", "thanks, bye", "help me", "nothing to see here"]:
+        found = matcher.match(text)
+        assert (found.intent.name if found else None) == _loop_match(INTENTS, text), text
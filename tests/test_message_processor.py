@@ -0,0 +1,66 @@
+"""
+Tests for message normalization and the process_message workflow step
+"""
+
+import asyncio
+import json
+
+from automation.core.checkpoint import SQLiteCheckpointStore
+from automation.core.message_processor import Message, ensure_message, process_message_step, processor
+from automation.core.step_cache import make_cache_key
+
+
+def _facebook_event(text='hello'):
+    return {
+        'sender': {'id': 'user-1', 'name': 'Ada'},
+        'recipient': {'id': 'page-1'},
+        'message': {'mid': 'mid-1', 'text': text},
+        'timestamp': 1700000000000
+    }
+
+
+def test_message_is_slotted():
+    message = Message('facebook', 'user-1', 'Ada', 'hello')
+
+    assert not hasattr(message, '__dict__')
+
+
+def test_process_message_step_keeps_message_object():
+    result = asyncio.run(process_message_step({'platform': 'facebook', 'raw_message': _facebook_event()}))
+
+    message = result['message']
+    assert isinstance(message, Message)
+    assert message.content == 'hello'
+    assert message.message_id == 'mid-1'
+
+
+def test_message_serializes_at_io_boundaries(tmp_path):
+    message = Message('facebook', 'user-1', 'Ada', 'hello', message_id='mid-1')
+    store = SQLiteCheckpointStore(str(tmp_path / 'checkpoints.db'))
+    store.save('run-1', 'facebook_message', ['process_message'], {'message': message})
+
+    restored = store.load('run-1').context['message']
+    store.close()
+
+    assert restored == json.loads(json.dumps(message.to_dict()))
+    assert ensure_message(restored).to_dict() == message.to_dict()
+    assert make_cache_key('step', {'message': message}, ['message']) == \
+        make_cache_key('step', {'message': restored}, ['message'])
+
+
+def test_ensure_message_passes_through_objects_and_none():
+    message = Message('whatsapp', 'user-2', 'Bob', 'hi')
+
+    assert ensure_message(message) is message
+    assert ensure_message(None) is None
+
+
+def test_conversation_key_does_not_normalize_the_message(monkeypatch):
+    def fail(raw):
+        raise AssertionError("the adapter must not run to get the key")
+
+    monkeypatch.setitem(processor.platform_adapters, 'facebook', fail)
+
+    assert processor.get_conversation_key('facebook', _facebook_event()) == 'facebook:user-1'
+    assert processor.get_conversation_key('whatsapp', {'from': '2547'}) == 'whatsapp:2547'
+    assert processor.get_conversation_key('whatsapp', {}) == 'whatsapp'
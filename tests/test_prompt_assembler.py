@@ -0,0 +1,99 @@
+"""
+Tests for the token-budgeted prompt assembler
+"""
+
+import pytest
+
+from utils.prompt_assembler import PromptAssembler
+from utils.token_counter import TokenCounter
+
+
+def _word_counter():
+    def count(texts, model):
+        return [len(text.split()) for text in texts]
+    return count
+
+
+def _history(turns):
+    return [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"message number {i} " + "word " * 16}
+        for i in range(turns)
+    ]
+
+
+def test_recent_history_is_kept_within_budget():
+    assembler = PromptAssembler(default_budget=200, token_counter=_word_counter())
+    history = _history(20)
+
+    prompt = assembler.assemble("be brief", "what now?", history, model='test-model')
+
+    assert prompt.tokens <= 200
+    assert 0 < len(prompt.conversation_history) < 20
+    assert prompt.conversation_history == history[-len(prompt.conversation_history):]
+    assert prompt.dropped_messages == 20 - len(prompt.conversation_history)
+    assert prompt.system_message == "be brief"
+
+
+def test_older_history_is_summarized():
+    summaries = []
+
+    def summarize(messages):
+        summaries.append(len(messages))
+        return "the customer asked about an order"
+
+    assembler = PromptAssembler(default_budget=200, token_counter=_word_counter(), summarizer=summarize)
+    history = _history(20)
+
+    prompt = assembler.assemble("be brief", "what now?", history)
+    again = assembler.assemble("be brief", "what now?", history)
+
+    assert prompt.summarized
+    assert "the customer asked about an order" in prompt.system_message
+    assert prompt.tokens <= 200
+    assert again.system_message == prompt.system_message
+    assert len(summaries) == 1
+
+
+def test_duplicate_snippets_are_dropped():
+    assembler = PromptAssembler(default_budget=1000, token_counter=_word_counter())
+    knowledge = [
+        {'id': 1, 'file_name': 'faq.md', 'snippet': "We open at 9am."},
+        {'id': 2, 'file_name': 'faq-copy.md', 'snippet': "  we open at 9AM "},
+        {'id': 3, 'file_name': 'pricing.md', 'snippet': "Plans start at $10."}
+    ]
+
+    prompt = assembler.assemble("system", "when do you open?", knowledge_items=knowledge)
+
+    assert [item['id'] for item in prompt.knowledge_items] == [1, 3]
+    assert prompt.dropped_snippets == 1
+    assert "[Source 2: pricing.md]" in prompt.user_message
+    assert prompt.user_message.startswith("when do you open?")
+
+
+def test_knowledge_gets_at_most_its_share():
+    assembler = PromptAssembler(default_budget=100, knowledge_share=0.5, token_counter=_word_counter())
+    knowledge = [{'id': i, 'file_name': 'doc', 'snippet': f"fact {i} " + "detail " * 20} for i in range(5)]
+
+    prompt = assembler.assemble("system", "question", knowledge_items=knowledge)
+
+    assert 0 < len(prompt.knowledge_items) < 5
+    assert prompt.tokens <= 100
+
+
+def test_each_turn_only_counts_new_messages():
+    counter = TokenCounter(use_bpe=False)
+    assembler = PromptAssembler(default_budget=10000, token_counter=counter.count_batch)
+    history = _history(10)
+
+    assembler.assemble("system", "first", history)
+    counted = counter.misses
+    assembler.assemble("system", "second", history + [{'role': 'assistant', 'content': "new reply"}])
+
+    # Only the new message and the new user message are counted
+    assert counter.misses - counted == 2
+    assert counter.hits == 11
+
+
+def test_invalid_knowledge_share_is_rejected():
+    with pytest.raises(ValueError):
+        PromptAssembler(knowledge_share=1.5)
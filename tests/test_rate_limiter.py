@@ -0,0 +1,64 @@
+"""
+Tests for the token bucket and retry backoff
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from automation.core.rate_limiter import TokenBucket, backoff_delay
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(15):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+
+    # 5 from the burst, 10 more at 100/s
+    assert 0.08 <= elapsed < 0.5
+
+
+def test_try_acquire_does_not_wait():
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is False
+
+
+def test_pause_holds_back_tokens():
+    bucket = TokenBucket(rate=100, capacity=10)
+    bucket.pause(0.05)
+
+    assert bucket.try_acquire() is False
+    time.sleep(0.07)
+    assert bucket.try_acquire() is True
+
+
+
+def test_wait_time_covers_a_pause():
+    bucket = TokenBucket(rate=100, capacity=10)
+    assert bucket.wait_time() == 0
+
+    bucket.pause(0.05)
+
+    assert 0.05 <= bucket.wait_time() <= 0.07
+    assert bucket.try_acquire() is False
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    delays = [backoff_delay(attempt, base_delay=1, max_delay=4) for attempt in range(1, 8) for _ in range(50)]
+
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+    assert max(backoff_delay(1, base_delay=1) for _ in range(50)) <= 1
@@ -0,0 +1,79 @@
+"""
+Tests for local response routing
+"""
+
+import asyncio
+
+import pytest
+
+from automation.ai.routing import ResponseRouter
+
+
+class FakeAIClient:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_response(self, message, **kwargs):
+        self.calls.append(message)
+        return {'content': 'from the model'}
+
+
+def test_confident_intents_are_answered_locally():
+    client = FakeAIClient()
+    router = ResponseRouter(ai_client=client, enabled=True)
+
+    response = asyncio.run(router.generate_response("Hello!", platform='whatsapp'))
+
+    assert response['model'] == 'rules_based'
+    assert response['metadata']['intent'] == 'greeting'
+    assert client.calls == []
+
+    stats = router.get_stats()
+    assert stats['local'] == 1
+    assert stats['local_intents'] == {'greeting': 1}
+    assert stats['latency']['local']['count'] == 1
+
+
+def test_other_messages_go_to_the_model():
+    client = FakeAIClient()
+    router = ResponseRouter(ai_client=client, enabled=True)
+
+    response = asyncio.run(router.generate_response(
+        "what can you do about my order from last week? I still have not received anything"
+    ))
+
+    assert response['content'] == 'from the model'
+    assert response['metadata']['route'] == 'llm'
+    assert len(client.calls) == 1
+
+    stats = router.get_stats()
+    assert stats['llm'] == 1
+    assert stats['below_threshold'] == {'help': 1}
+    assert stats['latency']['llm']['count'] == 1
+    assert stats['recent_decisions'][-1]['intent'] == 'help'
+
+
+def test_status_is_never_answered_locally():
+    router = ResponseRouter(ai_client=FakeAIClient(), enabled=True)
+
+    assert router.try_local("any updates") is None
+    assert router.get_stats()['recent_decisions'][-1]['intent'] == 'status'
+
+
+def test_local_answers_are_off_by_default():
+    router = ResponseRouter(ai_client=FakeAIClient())
+
+    assert router.try_local("hello") is None
+
+
+def test_tenant_threshold_overrides_default():
+    router = ResponseRouter(ai_client=FakeAIClient(), tenant_thresholds={'tenant-1': 1.5}, enabled=True)
+
+    assert router.try_local("hello", tenant_id='tenant-1') is None
+    assert router.try_local("hello", tenant_id='tenant-2') is not None
+
+    router.set_tenant_threshold('tenant-1', None)
+    assert router.get_threshold('tenant-1') == router.default_threshold
+
+    with pytest.raises(ValueError):
+        router.set_tenant_threshold('tenant-1', -0.1)
@@ -0,0 +1,129 @@
+"""
+Tests for the webhook ingestion spool
+"""
+
+import asyncio
+import time
+
+from automation.core.spool import SpoolWorkers, WebhookSpool
+
+
+def _spool(tmp_path):
+    return WebhookSpool(str(tmp_path / 'spool.db'))
+
+
+def test_claimed_events_are_leased_until_acked(tmp_path):
+    spool = _spool(tmp_path)
+    spool.append('facebook', {'n': 1})
+    spool.append('facebook', {'n': 2})
+
+    first = spool.claim(1)
+    second = spool.claim(1)
+
+    assert [entry.payload for entry in first + second] == [{'n': 1}, {'n': 2}]
+    assert spool.claim(1) == []
+    assert spool.get_stats()['depth'] == 2
+
+    spool.ack(first[0].id)
+    spool.ack(second[0].id)
+    assert spool.get_stats()['depth'] == 0
+    spool.close()
+
+
+def test_expired_lease_redelivers_event(tmp_path):
+    spool = _spool(tmp_path)
+    spool.append('whatsapp', {'n': 1})
+    spool.claim(1, lease_seconds=0.05)
+    time.sleep(0.1)
+
+    entries = spool.claim(1)
+
+    assert entries[0].payload == {'n': 1}
+    assert entries[0].attempts == 2
+    spool.close()
+
+
+def test_events_survive_restart(tmp_path):
+    spool = _spool(tmp_path)
+    spool.append('instagram', {'n': 1})
+    spool.close()
+
+    reopened = _spool(tmp_path)
+    assert reopened.claim(1)[0].platform == 'instagram'
+    reopened.close()
+
+
+def test_workers_drain_into_platform_handlers(tmp_path):
+    spool = _spool(tmp_path)
+    handled = []
+
+    async def handler(payload):
+        handled.append(payload['n'])
+
+    workers = SpoolWorkers(spool, num_workers=2, poll_interval=0.01)
+    workers.register_handler('facebook', handler)
+
+    async def run():
+        await workers.start()
+        for n in range(5):
+            spool.append('facebook', {'n': n})
+        while workers.processed < 5:
+            await asyncio.sleep(0.01)
+        await workers.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+    assert sorted(handled) == [0, 1, 2, 3, 4]
+    metrics = workers.get_metrics()
+    assert metrics['spool']['depth'] == 0
+    assert metrics['max_lag_seconds'] >= 0
+    spool.close()
+
+
+def test_failing_events_are_retried_then_dead_lettered(tmp_path):
+    spool = _spool(tmp_path)
+    attempts = []
+
+    async def handler(payload):
+        attempts.append(payload)
+        raise RuntimeError('model unavailable')
+
+    workers = SpoolWorkers(spool, max_attempts=2, retry_delay=0)
+    workers.register_handler('facebook', handler)
+    spool.append('facebook', {'n': 1})
+
+    async def run():
+        while await workers.drain_once():
+            pass
+
+    asyncio.run(run())
+
+    assert len(attempts) == 2
+    assert workers.dead == 1
+    assert spool.get_stats()['dead'] == 1
+    assert spool.claim(1) == []
+    spool.close()
+
+
+
+def test_enqueue_starts_workers_on_the_running_loop(tmp_path):
+    spool = _spool(tmp_path)
+    handled = []
+
+    async def handler(payload):
+        handled.append(payload['n'])
+
+    workers = SpoolWorkers(spool, num_workers=1, poll_interval=0.01)
+    workers.register_handler('whatsapp', handler)
+
+    async def run(n):
+        await workers.enqueue('whatsapp', {'n': n})
+        while workers.processed < n:
+            await asyncio.sleep(0.01)
+
+    # Each run is a new event loop, whose end also cancels the workers
+    asyncio.run(asyncio.wait_for(run(1), 5))
+    asyncio.run(asyncio.wait_for(run(2), 5))
+
+    assert handled == [1, 2]
+    spool.close()
@@ -0,0 +1,112 @@
+"""
+Tests for workflow step result caching
+"""
+
+import asyncio
+
+from automation.core.message_processor import Message, message_content_key
+from automation.core.step_cache import MemoryStepCache, SQLiteStepCache, make_cache_key
+from automation.core.workflow_engine import Workflow, WorkflowStep
+
+
+def test_cache_key_depends_only_on_declared_inputs():
+    key = make_cache_key('step', {'a': 1, 'b': 2, 'noise': 3}, ['a', 'b'])
+
+    assert key == make_cache_key('step', {'b': 2, 'a': 1, 'noise': 4}, ['a', 'b'])
+    assert key != make_cache_key('step', {'a': 1, 'b': 3}, ['a', 'b'])
+    assert key != make_cache_key('other', {'a': 1, 'b': 2}, ['a', 'b'])
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryStepCache(max_size=2)
+    cache.set('a', {'value': 1})
+    cache.set('b', {'value': 2})
+    cache.get('a')
+    cache.set('c', {'value': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'value': 1}
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryStepCache(ttl=0)
+    cache.set('a', {'value': 1})
+
+    assert cache.get('a') is None
+
+
+def test_sqlite_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SQLiteStepCache(path, max_size=2)
+    cache.set('a', {'value': 1})
+    cache.set('b', {'value': 2})
+    cache.set('c', {'value': 3})
+    cache.close()
+
+    reopened = SQLiteStepCache(path, max_size=2)
+
+    assert len(reopened) == 2
+    assert reopened.get('c') == {'value': 3}
+    reopened.close()
+
+
+def test_sqlite_cache_is_used_off_the_event_loop(tmp_path):
+    cache = SQLiteStepCache(str(tmp_path / 'cache.db'))
+
+    async def run():
+        await cache.set_async('a', {'value': 1})
+        return await cache.get_async('a'), await cache.get_async('missing')
+
+    assert asyncio.run(run()) == ({'value': 1}, None)
+    assert cache.get_stats()['hits'] == 1
+    cache.close()
+
+
+def test_cacheable_step_skips_handler_for_identical_inputs():
+    calls = []
+
+    async def handler(context):
+        calls.append(context['query'])
+        return {'answer': context['query'].upper()}
+
+    cache = MemoryStepCache()
+    workflow = Workflow('cached')
+    workflow.add_step(WorkflowStep('lookup', handler, required_inputs=['query'],
+                                   output_keys=['answer'], cacheable=True, cache=cache))
+
+    first = asyncio.run(workflow.execute({'query': 'hello'}))
+    second = asyncio.run(workflow.execute({'query': 'hello'}))
+    asyncio.run(workflow.execute({'query': 'other'}))
+
+    assert calls == ['hello', 'other']
+    assert first['answer'] == second['answer'] == 'HELLO'
+    assert second['_metadata']['execution']['step_execution']['lookup']['status'] == 'cached'
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['misses'] == 2
+
+
+def test_messages_with_the_same_text_share_a_cached_result():
+    calls = []
+
+    async def handler(context):
+        calls.append(context['message'].message_id)
+        return {'knowledge': [context['message'].content]}
+
+    cache = MemoryStepCache()
+    workflow = Workflow('knowledge')
+    workflow.add_step(WorkflowStep('retrieve', handler, required_inputs=['message'], optional_inputs=['user_id'],
+                                   output_keys=['knowledge'], cacheable=True, cache=cache,
+                                   cache_key=message_content_key))
+
+    def run(message_id, content, user_id='user-1'):
+        message = Message('facebook', 'sender-1', 'Sam', content, message_id=message_id)
+        return asyncio.run(workflow.execute({'message': message, 'user_id': user_id}))
+
+    run('m1', "What are your hours?")
+    second = run('m2', "What are your hours?")
+    run('m3', "What are your hours?", user_id='user-2')
+
+    assert calls == ['m1', 'm3']
+    assert second['knowledge'] == ["What are your hours?"]
+    assert cache.get_stats()['hits'] == 1
@@ -0,0 +1,163 @@
+"""
+Tests for streamed AI replies
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from automation.ai.streaming import stream_to_conversation
+from utils.ai_client import AIClient
+from utils.ai_resilience import CircuitBreakerRegistry, ConcurrencyLimiterRegistry
+from utils.completion_cache import CompletionCache
+
+
+class FakeStreamingCompletions:
+    def __init__(self, tokens, failures=0):
+        self.tokens = tokens
+        self.failures = failures
+        self.calls = 0
+
+    async def create(self, stream=False, **params):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("Server error")
+
+        async def chunks():
+            for token in self.tokens:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+        return chunks()
+
+
+def _client(completions, cache=None):
+    client = AIClient()
+    client.completion_cache = cache
+    client.concurrency_limiters = ConcurrencyLimiterRegistry()
+    client.providers = {'openai': True, 'anthropic': False}
+    client.primary_provider = 'openai'
+    client.async_openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client
+
+
+async def _collect(stream):
+    return [delta async for delta in stream]
+
+
+def test_stream_yields_deltas_and_caches_result():
+    completions = FakeStreamingCompletions(["Hel", "lo", " there"])
+    client = _client(completions, CompletionCache())
+
+    stream = client.stream_chat_request("system", "hi", temperature=0.2, user_id='tenant-1')
+    assert asyncio.run(_collect(stream)) == ["Hel", "lo", " there"]
+    assert stream.content == "Hello there"
+    assert stream.time_to_first_token is not None
+
+    again = client.stream_chat_request("system", "hi", temperature=0.2, user_id='tenant-1')
+    assert asyncio.run(_collect(again)) == ["Hello there"]
+    assert again.cached is True
+    assert completions.calls == 1
+
+
+def test_stream_retries_before_first_token(monkeypatch):
+    async def no_sleep(delay):
+        pass
+
+    completions = FakeStreamingCompletions(["ok"], failures=1)
+    client = _client(completions)
+    monkeypatch.setattr('utils.ai_client.asyncio.sleep', no_sleep)
+
+    assert asyncio.run(_collect(client.stream_chat_request("system", "hi"))) == ["ok"]
+    assert completions.calls == 2
+
+
+def test_relay_emits_deltas_and_persists_reply():
+    events = []
+    saved = []
+
+    async def tokens():
+        for token in ["Hi", ",", " how", " can", " I", " help?"]:
+            yield token
+
+    async def persist(conversation_id, user_id, content):
+        saved.append((conversation_id, user_id, content))
+        return {'id': 'msg-1', 'content': content}
+
+    result = asyncio.run(stream_to_conversation(
+        tokens(), 'conv-1', 'user-1',
+        emit=lambda event, payload, conversation_id: events.append((event, payload)),
+        persist=persist,
+        flush_interval=60
+    ))
+
+    names = [event for event, _ in events]
+    assert names == ['message_stream_start', 'message_delta', 'message_delta', 'message_stream_end']
+    # The first token goes out on its own, the rest is batched
+    assert [payload['delta'] for event, payload in events if event == 'message_delta'] == ["Hi", ", how can I help?"]
+    assert saved == [('conv-1', 'user-1', "Hi, how can I help?")]
+    assert events[-1][1]['message']['id'] == 'msg-1'
+    assert result['content'] == "Hi, how can I help?"
+
+
+def test_slow_consumer_does_not_count_as_slow_provider():
+    client = _client(FakeStreamingCompletions(["a", "b", "c"]))
+    client.circuit_breakers = CircuitBreakerRegistry(enabled=True, slow_call=0.05)
+
+    async def consume():
+        in_flight = []
+        async for _ in client.stream_chat_request("system", "hi"):
+            await asyncio.sleep(0.05)
+            in_flight.append(client.concurrency_limiter('openai').in_flight)
+        return in_flight
+
+    # The provider finished and freed its slot while the consumer was still reading
+    assert asyncio.run(consume()) == [0, 0, 0]
+    stats = client.circuit_breaker('openai').get_stats()
+    assert stats['calls'] == 1
+    assert stats['slow_rate'] == 0.0
+
+
+def test_relay_flushes_batched_deltas_on_a_timer():
+    events = []
+
+    async def tokens():
+        yield "Hi"
+        yield ","
+        yield " there"
+        await asyncio.sleep(0.1)
+        # The batch went out while the stream was stalled
+        assert [payload['delta'] for event, payload in events if event == 'message_delta'] == ["Hi", ", there"]
+        yield "!"
+
+    async def persist(conversation_id, user_id, content):
+        return None
+
+    result = asyncio.run(stream_to_conversation(
+        tokens(), 'conv-1', 'user-1',
+        emit=lambda event, payload, conversation_id: events.append((event, payload)),
+        persist=persist,
+        flush_interval=0.02
+    ))
+
+    assert 'error' not in result
+    assert [payload['delta'] for event, payload in events if event == 'message_delta'] == ["Hi", ", there", "!"]
+
+
+def test_relay_reports_stream_errors_without_persisting():
+    events = []
+
+    async def tokens():
+        yield "Partial"
+        raise RuntimeError("connection reset")
+
+    async def persist(conversation_id, user_id, content):
+        raise AssertionError("a failed stream must not be persisted")
+
+    result = asyncio.run(stream_to_conversation(
+        tokens(), 'conv-1', 'user-1',
+        emit=lambda event, payload, conversation_id: events.append((event, payload)),
+        persist=persist
+    ))
+
+    assert result['error'] == "connection reset"
+    assert events[-1][0] == 'message_stream_end'
+    assert events[-1][1]['error'] == "connection reset"
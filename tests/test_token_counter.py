@@ -0,0 +1,81 @@
+"""
+Tests for the token counting engine
+"""
+
+import re
+
+import pytest
+
+from utils import token_estimation
+from utils.token_counter import TokenCounter, estimate_token_count
+from utils.token_estimation import calculate_anthropic_tokens, calculate_openai_tokens, estimate_tokens
+
+
+def _two_pass_estimate(text, multiplier=1.3, claude=False):
+    """The previous estimate, with one regex for words and one for special characters"""
+    words = len(re.findall(r'\b\w+\b', text))
+    tokens = int(words * multiplier * 1.1) if claude else int(words * multiplier)
+    tokens += len(re.findall(r'[^\w\s]', text)) // 2
+    return max(1, tokens)
+
+
+@pytest.mark.parametrize('text', [
+    "Hello, world!",
+    "What's the status of order #1234? It's been 3 days...",
+    "naïve café — déjà vu; 東京 is big",
+    "   ",
+    "a" * 50
+])
+def test_single_pass_estimate_matches_previous_estimate(text):
+    assert estimate_token_count(text) == _two_pass_estimate(text)
+    assert estimate_token_count(text, claude=True) == _two_pass_estimate(text, claude=True)
+    assert estimate_tokens(text, 'claude', 'spanish') == _two_pass_estimate(text, 1.5, claude=True)
+
+
+def test_batch_counts_only_uncached_texts(monkeypatch):
+    counter = TokenCounter(use_bpe=False)
+    batches = []
+    count_uncached = counter._count_uncached
+
+    def record(texts, model, encoding):
+        batches.append(list(texts))
+        return count_uncached(texts, model, encoding)
+
+    monkeypatch.setattr(counter, '_count_uncached', record)
+
+    first = counter.count_batch(["one two", "three", "one two", ""], 'gpt-4o')
+    second = counter.count_batch(["three", "four five six"], 'gpt-4o')
+
+    assert first == [2, 1, 2, 0]
+    assert second == [1, 3]
+    assert batches == [["one two", "three"], ["four five six"]]
+    assert counter.get_stats()['hits'] == 1
+    assert counter.get_stats()['misses'] == 3
+
+
+def test_cache_is_bounded_and_per_model():
+    counter = TokenCounter(cache_size=2, use_bpe=False)
+
+    counter.count_batch(["a b c", "d e f", "g h i"], 'gpt-4o')
+    assert counter.get_stats()['cache_entries'] == 2
+
+    assert counter.count("word " * 10, 'claude-3-5-sonnet-20241022') > counter.count("word " * 10, 'gpt-4o')
+
+
+def test_message_counts_match_previous_formulas(monkeypatch):
+    monkeypatch.setattr(token_estimation, 'token_counter', TokenCounter(use_bpe=False))
+    messages = [
+        {'role': 'system', 'content': "You are helpful."},
+        {'role': 'user', 'content': [{'type': 'text', 'text': "What is this?"}, {'type': 'image_url'}]},
+        {'role': 'assistant', 'content': "A cat, probably.", 'name': 'bot'}
+    ]
+
+    expected_openai = 3 + sum(4 + len(m['role']) + len(m.get('name', '')) for m in messages) + 1000 + sum(
+        _two_pass_estimate(text) for text in ["You are helpful.", "What is this?", "A cat, probably."]
+    )
+    expected_anthropic = 5 + sum(len(m['role']) for m in messages) + sum(
+        _two_pass_estimate(text, claude=True) for text in ["You are helpful.", "What is this?", "A cat, probably."]
+    )
+
+    assert calculate_openai_tokens(messages) == expected_openai
+    assert calculate_anthropic_tokens(messages) == expected_anthropic
@@ -0,0 +1,350 @@
+"""
+Tests for the workflow engine
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from automation.core.tracing import JSONLTraceHook, LatencyHistogramHook, WorkflowHook, get_execution_record
+from automation.core.workflow_engine import (Workflow, WorkflowEngine, WorkflowStep,
+                                            WorkflowTimeoutError, get_remaining_time)
+
+
+def make_step(name, required=None, optional=None, outputs=None, delay=0.0, log=None):
+    """Create a step that records when it ran and writes its output keys"""
+    async def handler(context):
+        if log is not None:
+            log.append(('start', name))
+        if delay:
+            await asyncio.sleep(delay)
+        if log is not None:
+            log.append(('end', name))
+        return {key: name for key in (outputs or [])}
+    return WorkflowStep(name, handler, required_inputs=required,
+                        optional_inputs=optional, output_keys=outputs)
+
+
+def test_dependencies_resolved_from_declared_keys():
+    workflow = Workflow('deps')
+    workflow.add_step(make_step('a', required=['input'], outputs=['x']))
+    workflow.add_step(make_step('b', required=['input'], outputs=['y']))
+    workflow.add_step(make_step('c', required=['x', 'y'], outputs=['z']))
+
+    assert workflow.dependencies == [set(), set(), {0, 1}]
+    assert not workflow.is_sequential
+
+
+def test_chain_stays_sequential():
+    workflow = Workflow('chain')
+    workflow.add_step(make_step('a', required=['input'], outputs=['x']))
+    workflow.add_step(make_step('b', required=['x'], outputs=['y']))
+
+    assert workflow.is_sequential
+
+
+def test_opaque_step_is_a_barrier():
+    workflow = Workflow('barrier')
+    workflow.add_step(make_step('a', outputs=['x']))
+    workflow.add_step(make_step('opaque'))
+    workflow.add_step(make_step('b', outputs=['y']))
+
+    assert workflow.dependencies == [set(), {0}, {1}]
+
+
+def test_independent_steps_run_concurrently():
+    workflow = Workflow('parallel')
+    workflow.add_step(make_step('a', required=['input'], outputs=['x'], delay=0.1))
+    workflow.add_step(make_step('b', required=['input'], outputs=['y'], delay=0.1))
+    workflow.add_step(make_step('c', required=['x', 'y'], outputs=['z']))
+
+    start = time.perf_counter()
+    context = asyncio.run(workflow.execute({'input': 1}))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.18
+    assert context['z'] == 'c'
+    assert context['_metadata']['execution']['workflow']['status'] == 'success'
+
+
+
+def test_result_metadata_is_serializable():
+    seen = []
+
+    async def handler(context):
+        seen.append(get_execution_record(context).workflow)
+        return {'x': 1}
+
+    engine = WorkflowEngine()
+    workflow = Workflow('serializable')
+    workflow.add_step(WorkflowStep('a', handler, required_inputs=['input'], output_keys=['x']))
+    engine.register_workflow(workflow)
+
+    context = asyncio.run(engine.execute_workflow('serializable', {'input': 1}))
+
+    assert seen == ['serializable']
+    assert get_execution_record(context) is None
+    assert json.loads(json.dumps(context['_metadata']))['execution']['workflow']['status'] == 'success'
+
+def test_dependent_step_waits_for_its_inputs():
+    log = []
+    workflow = Workflow('ordered')
+    workflow.add_step(make_step('a', required=['input'], outputs=['x'], delay=0.02, log=log))
+    workflow.add_step(make_step('b', required=['input'], outputs=['y'], log=log))
+    workflow.add_step(make_step('c', required=['x'], outputs=['z'], log=log))
+
+    asyncio.run(workflow.execute({'input': 1}))
+
+    assert log.index(('end', 'a')) < log.index(('start', 'c'))
+
+
+def test_failure_cancels_independent_steps():
+    async def failing(context):
+        raise RuntimeError('boom')
+
+    workflow = Workflow('failing')
+    workflow.add_step(WorkflowStep('fail', failing, required_inputs=['input'], output_keys=['x']))
+    workflow.add_step(make_step('slow', required=['input'], outputs=['y'], delay=5))
+
+    engine = WorkflowEngine()
+    engine.register_workflow(workflow)
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError):
+        asyncio.run(engine.execute_workflow('failing', {'input': 1}))
+    assert time.perf_counter() - start < 1
+
+
+def make_engine(*steps, name='bulk'):
+    workflow = Workflow(name)
+    for step in steps:
+        workflow.add_step(step)
+    engine = WorkflowEngine()
+    engine.register_workflow(workflow)
+    return engine
+
+
+def test_execute_many_bounds_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def handler(context):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {'doubled': context['value'] * 2}
+
+    engine = make_engine(WorkflowStep('double', handler, required_inputs=['value'], output_keys=['doubled']))
+
+    async def collect():
+        return [item async for item in engine.execute_many('bulk', ({'value': i} for i in range(20)), max_concurrency=4)]
+
+    results = asyncio.run(collect())
+
+    assert peak == 4
+    assert sorted(index for index, _ in results) == list(range(20))
+    assert all(context['doubled'] == index * 2 for index, context in results)
+
+
+def test_execute_many_applies_backpressure_to_producer():
+    pulled = 0
+
+    async def producer():
+        nonlocal pulled
+        for i in range(10):
+            pulled += 1
+            yield {'value': i}
+
+    engine = make_engine(make_step('noop', required=['value'], outputs=['out'], delay=0.01))
+
+    async def first_result():
+        results = engine.execute_many('bulk', producer(), max_concurrency=3)
+        item = await results.__anext__()
+        await results.aclose()
+        return item
+
+    asyncio.run(first_result())
+
+    assert pulled == 3
+
+
+def test_execute_many_yields_failures():
+    async def handler(context):
+        if context['value'] == 1:
+            raise RuntimeError('bad value')
+        return {'out': context['value']}
+
+    engine = make_engine(WorkflowStep('maybe_fail', handler, required_inputs=['value'], output_keys=['out']))
+
+    async def collect():
+        return dict([item async for item in engine.execute_many('bulk', [{'value': i} for i in range(3)])])
+
+    results = asyncio.run(collect())
+
+    assert results[1]['error'] == 'bad value'
+    assert results[1]['_metadata']['execution']['workflow']['status'] == 'error'
+    assert results[2]['out'] == 2
+
+
+def test_step_timeout_is_recorded():
+    workflow = Workflow('slow')
+    workflow.add_step(WorkflowStep('hang', lambda context: asyncio.sleep(5),
+                                   required_inputs=['input'], output_keys=['x'], timeout=0.05))
+    context = {'input': 1}
+
+    with pytest.raises(WorkflowTimeoutError):
+        asyncio.run(workflow.execute(context))
+
+    execution = context['_metadata']['execution']
+    assert execution['step_execution']['hang']['status'] == 'timeout'
+    assert execution['workflow']['status'] == 'timeout'
+
+
+def test_handler_timeouts_are_not_step_timeouts():
+    async def handler(context):
+        raise TimeoutError("read timed out")
+
+    for timeout in (None, 5):
+        step = WorkflowStep('fetch', handler, required_inputs=['input'], output_keys=['x'], timeout=timeout)
+        context = {'input': 1}
+
+        with pytest.raises(TimeoutError) as error:
+            asyncio.run(step.execute(context))
+
+        assert not isinstance(error.value, WorkflowTimeoutError)
+        assert str(error.value) == "read timed out"
+        assert get_execution_record(context).steps['fetch'].status == 'error'
+
+
+def test_deadline_cancels_in_flight_steps():
+    workflow = Workflow('deadline', timeout=0.05)
+    workflow.add_step(make_step('a', required=['input'], outputs=['x'], delay=5))
+    workflow.add_step(make_step('b', required=['input'], outputs=['y'], delay=5))
+    context = {'input': 1}
+
+    start = time.perf_counter()
+    with pytest.raises(WorkflowTimeoutError):
+        asyncio.run(workflow.execute(context))
+
+    assert time.perf_counter() - start < 1
+    statuses = {step['status'] for step in context['_metadata']['execution']['step_execution'].values()}
+    assert statuses <= {'timeout', 'cancelled'}
+
+
+def test_deadline_is_visible_to_handlers():
+    seen = []
+
+    async def handler(context):
+        seen.append(get_remaining_time(context))
+        return {'x': 1}
+
+    workflow = Workflow('budget')
+    workflow.add_step(WorkflowStep('budget', handler, required_inputs=['input'], output_keys=['x']))
+
+    engine = WorkflowEngine()
+    engine.register_workflow(workflow)
+    asyncio.run(engine.execute_workflow('budget', {'input': 1}, timeout=10))
+
+    assert 0 < seen[0] <= 10
+
+
+def test_hooks_receive_step_and_workflow_events(tmp_path):
+    events = []
+
+    class RecordingHook(WorkflowHook):
+        def on_step_start(self, execution, step):
+            events.append(('start', step.name))
+
+        def on_step_end(self, execution, step):
+            events.append(('end', step.name, step.status))
+
+        def on_workflow_end(self, execution):
+            events.append(('workflow', execution.workflow, execution.status))
+
+    histogram = LatencyHistogramHook()
+    trace_path = tmp_path / 'trace.jsonl'
+    trace = JSONLTraceHook(str(trace_path))
+
+    engine = make_engine(make_step('a', required=['input'], outputs=['x']),
+                         make_step('b', required=['x'], outputs=['y']), name='traced')
+    for hook in (RecordingHook(), histogram, trace):
+        engine.register_hook(hook)
+
+    context = asyncio.run(engine.execute_workflow('traced', {'input': 1}))
+    trace.close()
+
+    assert events == [('start', 'a'), ('end', 'a', 'success'), ('start', 'b'),
+                      ('end', 'b', 'success'), ('workflow', 'traced', 'success')]
+    assert histogram.get_stats()['steps']['traced.a']['count'] == 1
+
+    lines = trace_path.read_text().splitlines()
+    assert len(lines) == 1
+    exported = json.loads(lines[0])
+    assert exported['workflow']['execution_id'] == context['_metadata']['execution_id']
+    assert set(exported['step_execution']) == {'a', 'b'}
+
+
+def test_failing_hook_does_not_break_execution():
+    class BrokenHook(WorkflowHook):
+        def on_step_end(self, execution, step):
+            raise RuntimeError('exporter down')
+
+    engine = make_engine(make_step('a', required=['input'], outputs=['x']), name='resilient')
+    engine.register_hook(BrokenHook())
+
+    context = asyncio.run(engine.execute_workflow('resilient', {'input': 1}))
+
+    assert context['x'] == 'a'
+
+
+def count_words(inputs):
+    """CPU-bound step handler run in the process pool"""
+    return {'word_count': len(inputs['text'].split()), 'pid': os.getpid()}
+
+
+def test_thread_executor_runs_off_the_event_loop():
+    loop_thread = threading.get_ident()
+
+    def handler(inputs):
+        return {'thread': threading.get_ident(), 'keys': sorted(inputs)}
+
+    engine = make_engine(WorkflowStep('threaded', handler, required_inputs=['text'],
+                                      optional_inputs=['missing'], output_keys=['thread', 'keys'],
+                                      executor='thread'), name='threaded')
+
+    context = asyncio.run(engine.execute_workflow('threaded', {'text': 'a b', 'unrelated': object()}))
+    stats = engine.get_executor_stats()
+    engine.shutdown()
+
+    assert context['thread'] != loop_thread
+    assert context['keys'] == ['text']
+    assert stats['thread']['completed'] == 1
+    assert stats['thread']['active'] == 0
+    assert not stats['process']['started']
+
+
+def test_process_executor_runs_in_another_process():
+    engine = WorkflowEngine(max_processes=1)
+    workflow = Workflow('processed')
+    workflow.add_step(WorkflowStep('count', count_words, required_inputs=['text'],
+                                   output_keys=['word_count'], executor='process'))
+    engine.register_workflow(workflow)
+
+    context = asyncio.run(engine.execute_workflow('processed', {'text': 'one two three'}))
+    stats = engine.get_executor_stats()
+    engine.shutdown()
+
+    assert context['word_count'] == 3
+    assert context['pid'] != os.getpid()
+    assert stats['process']['max_workers'] == 1
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(ValueError):
+        WorkflowStep('bad', count_words, executor='gpu')
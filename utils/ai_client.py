@@ -10,12 +10,185 @@ import os
 import logging
 import json
 import time
+import copy
 import random
-from typing import Dict, List, Any, Optional, Tuple, Union, Callable
+import asyncio
+import threading
+import weakref
+from typing import Dict, List, Any, Optional, Tuple, Union, Callable, Awaitable, AsyncIterator
+
+from utils.completion_cache import DEFAULT_MAX_TEMPERATURE, get_completion_cache, make_cache_keys
+from utils.prompt_assembler import AssembledPrompt, format_knowledge_context, prompt_assembler
+from utils.ai_resilience import (
+    AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitOpenError,
+    circuit_breakers, concurrency_limiters, hedging_policy, is_rate_limit_error
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Model used for each provider
+PROVIDER_MODELS = {
+    'openai': "gpt-4o",  # The newest model
+    'anthropic': "claude-3-5-sonnet-20241022"
+}
+
+class CompletionStream:
+    """
+    Async iterator over the text deltas of a streamed completion
+    
+    Iterate it once; afterwards content holds the full text and the timing
+    attributes are set.
+    """
+    
+    def __init__(self, deltas: AsyncIterator[str]):
+        self._deltas = deltas
+        self._parts: List[str] = []
+        self.model: Optional[str] = None
+        self.provider: Optional[str] = None
+        self.cached = False
+        self.started_at = time.perf_counter()
+        self.time_to_first_token: Optional[float] = None
+        self.duration: Optional[float] = None
+        
+    def __aiter__(self):
+        return self._iterate()
+        
+    @property
+    def content(self) -> str:
+        """Text streamed so far"""
+        return "".join(self._parts)
+        
+    async def _iterate(self):
+        try:
+            async for delta in self._deltas:
+                if not delta:
+                    continue
+                if self.time_to_first_token is None:
+                    self.time_to_first_token = time.perf_counter() - self.started_at
+                self._parts.append(delta)
+                yield delta
+        finally:
+            self.duration = time.perf_counter() - self.started_at
+            
+    def to_response(self) -> Dict[str, Any]:
+        """
+        Get the finished stream as a response in the send_chat_request format
+        
+        Returns:
+            Dictionary with response details
+        """
+        return {
+            'content': self.content,
+            'model': self.model,
+            'metadata': {
+                'streamed': True,
+                'cached': self.cached,
+                'time_to_first_token': self.time_to_first_token,
+                'duration': self.duration
+            }
+        }
+        
+        
+class RequestCoalescer:
+    """
+    Provider calls in flight by request key, shared by all AI clients
+    
+    Calls are tracked per event loop, since a task can only be awaited on
+    the loop that runs it.
+    """
+    
+    def __init__(self):
+        """Initialize the coalescer"""
+        # Event loop -> request key -> [task, callers waiting]
+        self._in_flight: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, List[Any]]]' = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.coalesced_requests = 0
+        self.leader_requests = 0
+        
+    def _calls(self, loop: asyncio.AbstractEventLoop) -> Dict[str, List[Any]]:
+        """Get the calls in flight on an event loop"""
+        with self._lock:
+            calls = self._in_flight.get(loop)
+            if calls is None:
+                calls = self._in_flight[loop] = {}
+            return calls
+            
+    async def run(self, key: str, operation: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Run an operation once for all concurrent callers with the same key
+        
+        The first caller starts the operation; callers arriving while it is in
+        flight await the same result instead of calling the provider again.
+        A cancelled caller only cancels the operation if no one else waits for it.
+        
+        Args:
+            key: Request key (the normalized cache key)
+            operation: Coroutine function making the provider call
+            
+        Returns:
+            The operation's response (a copy for coalesced callers)
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._calls(loop)
+        entry = calls.get(key)
+        
+        leader = entry is None
+        if leader:
+            task = loop.create_task(operation())
+            entry = [task, 0]
+            calls[key] = entry
+            self.leader_requests += 1
+            
+            def forget(done_task, key=key):
+                if calls.get(key, [None])[0] is done_task:
+                    del calls[key]
+                    
+            task.add_done_callback(forget)
+        else:
+            task = entry[0]
+            self.coalesced_requests += 1
+            
+        entry[1] += 1
+        try:
+            response = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()
+            raise
+        entry[1] -= 1
+        
+        if leader:
+            return response
+        response = copy.deepcopy(response)
+        response.setdefault('metadata', {})['coalesced'] = True
+        return response
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request coalescing statistics
+        
+        Returns:
+            Provider calls started, requests that joined an in-flight call,
+            and calls currently in flight
+        """
+        with self._lock:
+            in_flight = sum(len(calls) for calls in self._in_flight.values())
+        total = self.leader_requests + self.coalesced_requests
+        return {
+            'provider_calls': self.leader_requests,
+            'coalesced_requests': self.coalesced_requests,
+            'coalesced_rate': self.coalesced_requests / total if total else 0.0,
+            'in_flight': in_flight
+        }
+        
+        
+# Global coalescer shared by all AI clients
+request_coalescer = RequestCoalescer()
+        
+        
 class AIClient:
     """Unified client for AI services"""
     
@@ -30,8 +203,9 @@ class AIClient:
         openai_api_key = os.environ.get('OPENAI_API_KEY')
         if openai_api_key:
             try:
-                from openai import OpenAI
+                from openai import OpenAI, AsyncOpenAI
                 self.openai_client = OpenAI(api_key=openai_api_key)
+                self.async_openai_client = AsyncOpenAI(api_key=openai_api_key)
                 self.providers['openai'] = True
                 self.default_provider = 'openai'
                 self.primary_provider = 'openai'
@@ -47,8 +221,9 @@ class AIClient:
         anthropic_api_key = os.environ.get('ANTHROPIC_API_KEY')
         if anthropic_api_key:
             try:
-                from anthropic import Anthropic
+                from anthropic import Anthropic, AsyncAnthropic
                 self.anthropic_client = Anthropic(api_key=anthropic_api_key)
+                self.async_anthropic_client = AsyncAnthropic(api_key=anthropic_api_key)
                 self.providers['anthropic'] = True
                 if not self.default_provider:
                     self.default_provider = 'anthropic'
@@ -67,6 +242,24 @@ class AIClient:
         if not any(self.providers.values()):
             logger.warning("No AI clients were successfully initialized")
             
+        # Shared cache of completions (None if disabled)
+        self.completion_cache = get_completion_cache()
+        
+        # Provider calls in flight, shared by identical concurrent requests (of all clients)
+        self.coalescer = request_coalescer
+        
+        # Sends slow requests to the fallback provider as well (shared by all clients)
+        self.hedging = hedging_policy
+        
+        # Adaptive concurrency limits of the async path, by provider (shared by all clients)
+        self.concurrency_limiters = concurrency_limiters
+        
+        # Circuit breakers by provider and model (shared by all clients)
+        self.circuit_breakers = circuit_breakers
+        
+        # Packs history and knowledge into each model's prompt token budget
+        self.prompt_assembler = prompt_assembler
+            
     def available_providers(self) -> Dict[str, bool]:
         """
         Get a dictionary of available AI providers
@@ -76,50 +269,98 @@ class AIClient:
         """
         return self.providers
         
-    async def enhance_with_knowledge(
-                        self,
-                        message: str,
-                        user_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+    @staticmethod
+    def apply_knowledge_context(message: str, knowledge_items: List[Dict[str, Any]]) -> str:
         """
-        Enhance a message with relevant knowledge from the knowledge base
+        Append knowledge base snippets to a message
         
         Args:
             message: Original user message
+            knowledge_items: Knowledge items returned by the knowledge base search
+            
+        Returns:
+            The message followed by the formatted knowledge context
+        """
+        if not knowledge_items:
+            return message
+            
+        return f"{message}\n{format_knowledge_context(knowledge_items)}"
+        
+    def assemble_prompt(self,
+                        system_message: str,
+                        user_message: str,
+                        conversation_history: Optional[List[Dict[str, str]]] = None,
+                        knowledge_items: Optional[List[Dict[str, Any]]] = None,
+                        provider: Optional[str] = None) -> AssembledPrompt:
+        """
+        Pack a prompt into the token budget of the model that will answer it
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            knowledge_items: Knowledge items in rank order
+            provider: Specific provider to use
+            
+        Returns:
+            The assembled prompt
+        """
+        selected_provider, _ = self._select_providers(provider)
+        return self.prompt_assembler.assemble(
+            system_message,
+            user_message,
+            conversation_history=conversation_history,
+            knowledge_items=knowledge_items,
+            model=PROVIDER_MODELS.get(selected_provider)
+        )
+        
+    async def search_knowledge(self, message: str, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Search the knowledge base for items relevant to a message
+        
+        Args:
+            message: User message
             user_id: User ID for knowledge base access
             
         Returns:
-            Tuple of enhanced message and list of knowledge items used
+            Knowledge items in rank order (empty if the search fails)
         """
         try:
             # Import here to avoid circular imports
             from automation.knowledge.database import search_knowledge_base
             
-            # Search the knowledge base for relevant content
-            knowledge_items = await search_knowledge_base(user_id, message, max_results=3)
-            
-            if not knowledge_items:
-                # No relevant knowledge found
-                return message, []
-                
-            # Prepare knowledge context to add to the message
-            knowledge_context = "\n\nRelevant information from knowledge base:\n"
-            for idx, item in enumerate(knowledge_items):
-                # Add source information
-                knowledge_context += f"\n[Source {idx+1}: {item.get('file_name', 'unnamed')}]\n"
-                # Add content snippet if available
-                if 'snippet' in item:
-                    knowledge_context += f"{item['snippet']}\n"
-                    
-            # Combine the original message with the knowledge context
-            enhanced_message = f"{message}\n{knowledge_context}"
-            
-            logger.info(f"Enhanced prompt with {len(knowledge_items)} knowledge items")
-            return enhanced_message, knowledge_items
+            return await search_knowledge_base(user_id, message, max_results=3) or []
             
         except Exception as e:
-            logger.error(f"Error enhancing with knowledge: {str(e)}", exc_info=True)
-            # Return original message if enhancement fails
+            logger.error(f"Error searching knowledge base: {str(e)}", exc_info=True)
+            return []
+        
+    async def enhance_with_knowledge(
+                        self,
+                        message: str,
+                        user_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Enhance a message with relevant knowledge from the knowledge base
+        
+        Args:
+            message: Original user message
+            user_id: User ID for knowledge base access
+            
+        Returns:
+            Tuple of enhanced message and list of knowledge items used
+        """
+        # Search the knowledge base for relevant content
+        knowledge_items = await self.search_knowledge(message, user_id)
+        
+        if not knowledge_items:
+            # No relevant knowledge found
             return message, []
+            
+        # Combine the original message with the knowledge context
+        enhanced_message = self.apply_knowledge_context(message, knowledge_items)
+        
+        logger.info(f"Enhanced prompt with {len(knowledge_items)} knowledge items")
+        return enhanced_message, knowledge_items
     
     async def generate_response(self, 
                         message: str, 
@@ -127,10 +368,14 @@ class AIClient:
                         conversation_history: Optional[List[Dict[str, str]]] = None,
                         provider: Optional[str] = None,
                         user_id: Optional[str] = None,
-                        enhance_with_knowledge: bool = True) -> Dict[str, Any]:
+                        enhance_with_knowledge: bool = True,
+                        knowledge_items: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Generate an AI response to a message
         
+        The system prompt, the most recent history and the best knowledge
+        snippets are packed into the model's prompt token budget.
+        
         Args:
             message: User message to respond to
             system_prompt: System prompt to set context
@@ -138,6 +383,7 @@ class AIClient:
             provider: Specific provider to use
             user_id: User ID for knowledge base access (required for knowledge enhancement)
             enhance_with_knowledge: Whether to enhance the prompt with knowledge base content
+            knowledge_items: Already retrieved knowledge items (no search is made)
             
         Returns:
             Dictionary with response content and metadata
@@ -153,28 +399,34 @@ class AIClient:
             unless asked specifically about sources.
             """
         
-        enhanced_message = message
-        knowledge_items = []
-        
-        # Enhance with knowledge if requested and user_id is provided
-        if enhance_with_knowledge and user_id:
-            enhanced_message, knowledge_items = await self.enhance_with_knowledge(message, user_id)
+        # Search for knowledge if requested and user_id is provided
+        if knowledge_items is None:
+            knowledge_items = []
+            if enhance_with_knowledge and user_id:
+                knowledge_items = await self.search_knowledge(message, user_id)
+                
+        prompt = self.assemble_prompt(system_prompt, message, conversation_history, knowledge_items, provider)
+        if prompt.knowledge_items:
+            logger.info(f"Enhanced prompt with {len(prompt.knowledge_items)} knowledge items")
             
-        # Send request via unified client
-        response = self.send_chat_request(
-            system_message=system_prompt,
-            user_message=enhanced_message,
-            conversation_history=conversation_history,
-            provider=provider
+        # Send request via unified client without blocking the event loop
+        response = await self.send_chat_request_async(
+            system_message=prompt.system_message,
+            user_message=prompt.user_message,
+            conversation_history=prompt.conversation_history,
+            provider=provider,
+            user_id=user_id
         )
         
+        if 'metadata' not in response:
+            response['metadata'] = {}
+        response['metadata']['prompt'] = prompt.to_dict()
+        
         # Add knowledge items to response metadata
-        if knowledge_items:
-            if 'metadata' not in response:
-                response['metadata'] = {}
+        if prompt.knowledge_items:
             response['metadata']['knowledge_items'] = [
                 {'id': item.get('id'), 'file_name': item.get('file_name')} 
-                for item in knowledge_items
+                for item in prompt.knowledge_items
             ]
         
         return response
@@ -256,30 +508,16 @@ class AIClient:
                 'content': response.get('content', '')
             }
     
-    def send_chat_request(self, 
-                         system_message: str,
-                         user_message: str,
-                         conversation_history: Optional[List[Dict[str, str]]] = None,
-                         max_tokens: int = 1000,
-                         temperature: float = 0.7,
-                         json_format: bool = False,
-                         provider: Optional[str] = None) -> Dict[str, Any]:
+    def _select_providers(self, provider: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
         """
-        Send chat request to AI provider with automatic fallback
+        Choose the provider for a request and the one to fall back to
         
         Args:
-            system_message: System message/instructions
-            user_message: User message/query
-            conversation_history: Previous conversation messages
-            max_tokens: Maximum tokens in response
-            temperature: Creativity parameter (0.0-1.0)
-            json_format: Whether to request JSON format response
-            provider: Specific provider to use ('openai' or 'anthropic')
+            provider: Specific provider requested, if any
             
         Returns:
-            Dictionary with response details
+            Tuple of selected and fallback provider names (None if unavailable)
         """
-        # Determine which provider to use
         selected_provider = None
         fallback_provider = None
         
@@ -323,260 +561,844 @@ class AIClient:
                     if self.providers[p]:
                         selected_provider = p
                         break
+                        
+        return selected_provider, fallback_provider
         
-        # If no providers are available
-        if not selected_provider:
-            return {
-                'content': "No AI providers are currently available.",
-                'model': "none",
-                'error': "No AI providers available"
-            }
+    @staticmethod
+    def _should_fallback(response: Dict[str, Any]) -> bool:
+        """Whether a failed response is worth retrying on the fallback provider"""
+        error_msg = response.get('error', '')
+        # Only fallback for certain error types (rate limits, capacity issues)
+        rate_limit_indicators = ["rate limit", "capacity", "quota", "too many requests", "server overloaded", "circuit open"]
+        return any(indicator in error_msg.lower() for indicator in rate_limit_indicators)
         
-        # Try to call the selected provider
-        try:
-            if selected_provider == 'openai':
-                response = self._openai_chat_request(
-                    system_message=system_message,
-                    user_message=user_message,
-                    conversation_history=conversation_history,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    json_format=json_format
-                )
-            elif selected_provider == 'anthropic':
-                response = self._anthropic_chat_request(
-                    system_message=system_message,
-                    user_message=user_message,
-                    conversation_history=conversation_history,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    json_format=json_format
-                )
-            else:
-                return {
-                    'content': "Selected provider is not supported.",
-                    'model': "none",
-                    'error': f"Provider '{selected_provider}' not supported"
-                }
-                
-            # Check if the response has an error and fallback is available
-            if 'error' in response and fallback_provider:
-                error_msg = response.get('error', '')
-                # Only fallback for certain error types (rate limits, capacity issues)
-                rate_limit_indicators = ["rate limit", "capacity", "quota", "too many requests", "server overloaded"]
-                should_fallback = any(indicator in error_msg.lower() for indicator in rate_limit_indicators)
-                
-                if should_fallback:
-                    logger.warning(f"Primary provider '{selected_provider}' failed with error: {error_msg}. Trying fallback provider '{fallback_provider}'")
-                    
-                    # Call the fallback provider
-                    if fallback_provider == 'openai':
-                        fallback_response = self._openai_chat_request(
-                            system_message=system_message,
-                            user_message=user_message,
-                            conversation_history=conversation_history,
-                            max_tokens=max_tokens,
-                            temperature=temperature,
-                            json_format=json_format
-                        )
-                    elif fallback_provider == 'anthropic':
-                        fallback_response = self._anthropic_chat_request(
-                            system_message=system_message,
-                            user_message=user_message,
-                            conversation_history=conversation_history,
-                            max_tokens=max_tokens,
-                            temperature=temperature,
-                            json_format=json_format
-                        )
-                    else:
-                        logger.error(f"Fallback provider '{fallback_provider}' is not supported")
-                        return response  # Return original response if fallback not supported
-                    
-                    # Check if fallback was successful
-                    if 'error' not in fallback_response:
-                        # Add metadata about the fallback
-                        if 'metadata' not in fallback_response:
-                            fallback_response['metadata'] = {}
-                        fallback_response['metadata']['fallback_from'] = selected_provider
-                        fallback_response['metadata']['original_error'] = error_msg
-                        logger.info(f"Successfully used fallback provider '{fallback_provider}'")
-                        return fallback_response
-                    else:
-                        logger.error(f"Both primary and fallback providers failed. Primary error: {error_msg}, Fallback error: {fallback_response.get('error', '')}")
-                        
-            # Return the original response if no fallback was needed or fallback failed
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error with provider {selected_provider}: {str(e)}")
-            # Try fallback if available
-            if fallback_provider:
-                logger.warning(f"Primary provider '{selected_provider}' threw exception. Trying fallback provider '{fallback_provider}'")
-                try:
-                    if fallback_provider == 'openai':
-                        return self._openai_chat_request(
-                            system_message=system_message,
-                            user_message=user_message,
-                            conversation_history=conversation_history,
-                            max_tokens=max_tokens,
-                            temperature=temperature,
-                            json_format=json_format
-                        )
-                    elif fallback_provider == 'anthropic':
-                        return self._anthropic_chat_request(
-                            system_message=system_message,
-                            user_message=user_message,
-                            conversation_history=conversation_history,
-                            max_tokens=max_tokens,
-                            temperature=temperature,
-                            json_format=json_format
-                        )
-                except Exception as fallback_e:
-                    logger.error(f"Fallback provider '{fallback_provider}' also failed: {str(fallback_e)}")
-            
-            # Return error details if both failed or no fallback available
-            return {
-                'content': f"Error generating response: {str(e)}",
-                'model': "error",
-                'error': str(e)
-            }
-    
-    def analyze_image(self, image_base64: str, prompt: Optional[str] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _mark_fallback(fallback_response: Dict[str, Any], selected_provider: str, error_msg: str) -> Dict[str, Any]:
+        """Add metadata about the fallback to a response"""
+        if 'metadata' not in fallback_response:
+            fallback_response['metadata'] = {}
+        fallback_response['metadata']['fallback_from'] = selected_provider
+        fallback_response['metadata']['original_error'] = error_msg
+        return fallback_response
+        
+    def circuit_breaker(self, provider: str) -> CircuitBreaker:
         """
-        Analyze image using multimodal capabilities
+        Get the circuit breaker of a provider and its model
         
         Args:
-            image_base64: Base64-encoded image data
-            prompt: Optional prompt to guide the analysis
+            provider: Provider name
             
         Returns:
-            Dictionary with analysis results
+            The provider's breaker
         """
-        # Default prompt if not provided
-        if not prompt:
-            prompt = """
-            Analyze this image in detail. Describe what you see, including objects, people, 
-            scenes, colors, text, and any other noteworthy elements. Provide a clear and 
-            comprehensive description.
-            """
-            
-        # Check if OpenAI is available (required for image analysis)
-        if not self.providers.get('openai', False):
-            return {
-                'description': "Image analysis is currently unavailable.",
-                'error': "OpenAI provider required for image analysis is not available"
-            }
-            
-        try:
-            # Prepare the image URL with base64 data
-            image_url = f"data:image/jpeg;base64,{image_base64}"
-            
-            # Call OpenAI with multimodal request
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",  # Using the newest model supporting vision
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": image_url}
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=800
-            )
-            
-            # Extract the response content
-            description = response.choices[0].message.content
-            
-            # Structure the response
-            return {
-                'description': description,
-                'objects': [],  # For future image object detection capabilities
-                'text': "",  # For future OCR capabilities
-                'model': "gpt-4o"
-            }
-            
-        except Exception as e:
-            logger.error(f"Error analyzing image: {str(e)}")
-            return {
-                'description': "Error analyzing image.",
-                'objects': [],
-                'text': "",
-                'error': str(e)
-            }
-    
-    def _with_retry(self, operation: Callable, max_attempts: int = 5) -> Dict[str, Any]:
+        return self.circuit_breakers.get(provider, PROVIDER_MODELS.get(provider))
+        
+    def get_circuit_breaker_stats(self) -> Dict[str, Any]:
         """
-        Execute an operation with retry logic and exponential backoff
+        Get the circuit breaker state and health of each provider and model
+        
+        Returns:
+            Breaker statistics by provider and model
+        """
+        return self.circuit_breakers.get_stats()
+        
+    def _route_by_health(self, selected_provider: Optional[str],
+                         fallback_provider: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Swap to the fallback provider while the selected provider's circuit is open
         
         Args:
-            operation: Callable function to execute
-            max_attempts: Maximum number of retry attempts
+            selected_provider: Provider chosen for the request
+            fallback_provider: Provider to fall back to
             
         Returns:
-            Result from the operation or error details
+            Tuple of selected and fallback provider names
         """
-        base_delay = 1.0  # Base delay in seconds
-        error_messages = []
+        if (selected_provider and fallback_provider
+                and not self.circuit_breaker(selected_provider).is_available()
+                and self.circuit_breaker(fallback_provider).is_available()):
+            logger.info(f"Circuit for provider '{selected_provider}' is open, using '{fallback_provider}'")
+            return fallback_provider, selected_provider
+        return selected_provider, fallback_provider
         
-        for attempt in range(1, max_attempts + 1):
-            try:
-                # Attempt the operation
-                result = operation()
-                
-                # If we get here, the operation succeeded
-                if attempt > 1:
-                    logger.info(f"Operation succeeded on attempt {attempt} after previous failures")
-                return result
+    @staticmethod
+    def _circuit_open_response(error: CircuitOpenError, error_messages: List[str]) -> Dict[str, Any]:
+        """Build the error response of a call refused by an open circuit"""
+        logger.warning(f"{str(error)}, not calling the provider")
+        response = {
+            'content': "Service temporarily unavailable. Please try again later.",
+            'model': "error",
+            'error': str(error)
+        }
+        if error_messages:
+            response['error_details'] = "\n".join(error_messages)
+        return response
+        
+    def _chat_request(self, provider: str, **request) -> Dict[str, Any]:
+        """Send a chat request to the given provider"""
+        if provider == 'openai':
+            return self._openai_chat_request(**request)
+        if provider == 'anthropic':
+            return self._anthropic_chat_request(**request)
+        return {
+            'content': "Selected provider is not supported.",
+            'model': "none",
+            'error': f"Provider '{provider}' not supported"
+        }
+        
+    async def _chat_request_async(self, provider: str, **request) -> Dict[str, Any]:
+        """Send a chat request to the given provider without blocking the event loop"""
+        if provider == 'openai':
+            return await self._openai_chat_request_async(**request)
+        if provider == 'anthropic':
+            return await self._anthropic_chat_request_async(**request)
+        return {
+            'content': "Selected provider is not supported.",
+            'model': "none",
+            'error': f"Provider '{provider}' not supported"
+        }
+        
+    def _cache_keys(self, user_id: Optional[str], provider: Optional[str], request: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """
+        Get the completion cache keys of a request, if it may be cached or coalesced
+        
+        Args:
+            user_id: Tenant the request is made for
+            provider: Specific provider requested, if any
+            request: Chat request arguments
+            
+        Returns:
+            Exact and normalized cache keys, or None if the request's answer
+            should not be shared
+        """
+        if user_id is None:
+            # Without a tenant, answers could leak between businesses
+            if self.completion_cache is not None:
+                self.completion_cache.record_skip()
+            return None
+            
+        if self.completion_cache is None:
+            if request['temperature'] > DEFAULT_MAX_TEMPERATURE:
+                return None
+        elif not self.completion_cache.is_cacheable(request['temperature']):
+            self.completion_cache.record_skip()
+            return None
+            
+        selected_provider, _ = self._select_providers(provider)
+        if not selected_provider:
+            return None
+        return make_cache_keys(user_id, selected_provider, PROVIDER_MODELS.get(selected_provider, ''), **request)
+        
+    def send_chat_request(self, 
+                         system_message: str,
+                         user_message: str,
+                         conversation_history: Optional[List[Dict[str, str]]] = None,
+                         max_tokens: int = 1000,
+                         temperature: float = 0.7,
+                         json_format: bool = False,
+                         provider: Optional[str] = None,
+                         user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Send chat request to AI provider with automatic fallback
+        
+        Completions are served from and stored in the completion cache when the
+        temperature allows it. This call blocks; use send_chat_request_async
+        from the event loop.
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
+            provider: Specific provider to use ('openai' or 'anthropic')
+            user_id: Tenant the request is made for (cached completions are per tenant)
+            
+        Returns:
+            Dictionary with response details
+        """
+        request = {
+            'system_message': system_message,
+            'user_message': user_message,
+            'conversation_history': conversation_history,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'json_format': json_format
+        }
+        
+        cache_keys = self._cache_keys(user_id, provider, request) if self.completion_cache else None
+        if cache_keys:
+            cached = self.completion_cache.get(cache_keys, user_id)
+            if cached is not None:
+                return cached
+                
+        start_time = time.perf_counter()
+        response = self._send_chat_request(provider=provider, **request)
+        
+        if cache_keys:
+            self.completion_cache.set(cache_keys, response, time.perf_counter() - start_time, user_id)
+        return response
+        
+    async def send_chat_request_async(self, 
+                                      system_message: str,
+                                      user_message: str,
+                                      conversation_history: Optional[List[Dict[str, str]]] = None,
+                                      max_tokens: int = 1000,
+                                      temperature: float = 0.7,
+                                      json_format: bool = False,
+                                      provider: Optional[str] = None,
+                                      user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Send chat request to AI provider with automatic fallback, without blocking
+        
+        Uses the async provider clients and sleeps between retries with
+        asyncio.sleep, so other work on the event loop keeps running while a
+        request waits out a rate limit. Cancelling the calling task cancels
+        the request and any pending retry. Completions are served from and
+        stored in the completion cache when the temperature allows it, and
+        identical concurrent requests share a single provider call.
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
+            provider: Specific provider to use ('openai' or 'anthropic')
+            user_id: Tenant the request is made for (cached completions are per tenant)
+            
+        Returns:
+            Dictionary with response details
+        """
+        request = {
+            'system_message': system_message,
+            'user_message': user_message,
+            'conversation_history': conversation_history,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'json_format': json_format
+        }
+        
+        cache_keys = self._cache_keys(user_id, provider, request)
+        if not cache_keys:
+            return await self._send_chat_request_async(provider=provider, **request)
+            
+        if self.completion_cache is not None:
+            cached = await self.completion_cache.get_async(cache_keys, user_id)
+            if cached is not None:
+                return cached
                 
+        async def call_provider():
+            start_time = time.perf_counter()
+            response = await self._send_chat_request_async(provider=provider, **request)
+            if self.completion_cache is not None:
+                await self.completion_cache.set_async(cache_keys, response, time.perf_counter() - start_time,
+                                                      user_id)
+            return response
+            
+        return await self.coalescer.run(cache_keys[1], call_provider)
+        
+    def stream_chat_request(self,
+                            system_message: str,
+                            user_message: str,
+                            conversation_history: Optional[List[Dict[str, str]]] = None,
+                            max_tokens: int = 1000,
+                            temperature: float = 0.7,
+                            json_format: bool = False,
+                            provider: Optional[str] = None,
+                            user_id: Optional[str] = None) -> CompletionStream:
+        """
+        Stream a chat completion as it is generated
+        
+        Failures before the first token are retried with backoff and then
+        tried on the fallback provider; once text has been streamed, errors are
+        raised to the caller. A cached completion is streamed as one delta, and
+        the finished completion is stored in the cache.
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
+            provider: Specific provider to use ('openai' or 'anthropic')
+            user_id: Tenant the request is made for (cached completions are per tenant)
+            
+        Returns:
+            Async iterator of text deltas
+        """
+        request = {
+            'system_message': system_message,
+            'user_message': user_message,
+            'conversation_history': conversation_history,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'json_format': json_format
+        }
+        stream = None
+        
+        async def deltas():
+            cache_keys = self._cache_keys(user_id, provider, request) if self.completion_cache else None
+            if cache_keys:
+                cached = await self.completion_cache.get_async(cache_keys, user_id)
+                if cached is not None:
+                    stream.cached = True
+                    stream.model = cached.get('model')
+                    yield cached.get('content', '')
+                    return
+                    
+            selected_provider, fallback_provider = self._route_by_health(*self._select_providers(provider))
+            if not selected_provider:
+                raise RuntimeError("No AI providers available")
+                
+            for attempt_provider in [p for p in (selected_provider, fallback_provider) if p]:
+                error_messages = []
+                for attempt in range(1, 6):
+                    streamed = False
+                    stream.provider = attempt_provider
+                    stream.model = PROVIDER_MODELS.get(attempt_provider)
+                    # Read the provider on its own task, so the limiter slot and the
+                    # breaker's latency cover the provider and not a slow consumer
+                    buffer: asyncio.Queue = asyncio.Queue()
+                    reader = asyncio.get_running_loop().create_task(
+                        self._read_provider_stream(attempt_provider, request, buffer)
+                    )
+                    try:
+                        while True:
+                            delta = await buffer.get()
+                            if delta is None:
+                                break
+                            streamed = True
+                            yield delta
+                        await reader
+                    except CircuitOpenError as e:
+                        logger.warning(f"{str(e)}, not streaming from '{attempt_provider}'")
+                        break
+                    except Exception as e:
+                        # Text already sent cannot be taken back, so only retry before it
+                        if streamed:
+                            raise
+                        outcome = self._retry_outcome(e, attempt, 5, error_messages)
+                        if isinstance(outcome, dict):
+                            logger.warning(f"Streaming from '{attempt_provider}' failed: {outcome['error']}")
+                            break
+                        await asyncio.sleep(outcome)
+                        continue
+                    finally:
+                        if not reader.done():
+                            reader.cancel()
+                        
+                    if cache_keys:
+                        await self.completion_cache.set_async(cache_keys,
+                                                              {'content': stream.content, 'model': stream.model},
+                                                              time.perf_counter() - stream.started_at, user_id)
+                    return
+                    
+            raise RuntimeError("All AI providers failed to stream a response")
+            
+        stream = CompletionStream(deltas())
+        return stream
+        
+    async def _read_provider_stream(self, provider: str, request: Dict[str, Any], buffer: asyncio.Queue):
+        """
+        Stream text deltas from a provider into a queue, then put None
+        
+        Holds a concurrency slot and records the call in the circuit breaker
+        while the provider streams; provider errors are raised when the task
+        is awaited.
+        
+        Args:
+            provider: Provider name
+            request: Chat request arguments
+            buffer: Queue the deltas are put in
+        """
+        try:
+            async with self.concurrency_limiter(provider).slot():
+                with self.circuit_breaker(provider).call():
+                    async for delta in self._provider_stream(provider, request):
+                        buffer.put_nowait(delta)
+        finally:
+            buffer.put_nowait(None)
+            
+    async def _provider_stream(self, provider: str, request: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream text deltas from a provider
+        
+        Args:
+            provider: Provider name
+            request: Chat request arguments
+            
+        Returns:
+            Async iterator of text deltas
+        """
+        if provider == 'openai':
+            request_params = self._openai_request_params(**request)
+            response = await self.async_openai_client.chat.completions.create(stream=True, **request_params)
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        elif provider == 'anthropic':
+            request_params = self._anthropic_request_params(**request)
+            async with self.async_anthropic_client.messages.stream(**request_params) as response:
+                async for text in response.text_stream:
+                    yield text
+        else:
+            raise ValueError(f"Provider '{provider}' not supported")
+            
+    async def _timed_chat_request_async(self, provider: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a chat request and record the provider's latency if it succeeds"""
+        start_time = time.perf_counter()
+        response = await self._chat_request_async(provider, **request)
+        if 'error' not in response:
+            self.hedging.record_latency(provider, time.perf_counter() - start_time)
+        return response
+        
+    async def _hedged_chat_request_async(self,
+                                         selected_provider: str,
+                                         fallback_provider: Optional[str],
+                                         request: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Send a chat request, hedging it to the fallback provider if the primary is slow
+        
+        If the primary has not answered within the hedge delay (a percentile of
+        its recent latency), the request is also sent to the fallback. The first
+        successful response wins and the other request is cancelled. A primary
+        cancelled after the hedge still records its time so far, as a lower
+        bound of its latency, so slow primaries keep raising the hedge delay.
+        
+        Args:
+            selected_provider: Primary provider
+            fallback_provider: Provider to hedge to, if any
+            request: Chat request arguments
+            
+        Returns:
+            Tuple of the response and whether the request was hedged
+        """
+        if not (self.hedging.enabled and fallback_provider):
+            return await self._timed_chat_request_async(selected_provider, request), False
+            
+        started_at = time.perf_counter()
+        primary = asyncio.ensure_future(self._timed_chat_request_async(selected_provider, request))
+        tasks = {primary: selected_provider}
+        try:
+            delay = self.hedging.hedge_delay(selected_provider)
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                self.hedging.record_outcome(hedged=False)
+                return primary.result(), False
+                
+            logger.info(f"Provider '{selected_provider}' has not answered in {delay:.2f}s, hedging to '{fallback_provider}'")
+            hedge = asyncio.ensure_future(self._timed_chat_request_async(fallback_provider, request))
+            tasks[hedge] = fallback_provider
+            
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        logger.error(f"Error with provider {tasks[task]}: {str(e)}")
+                        continue
+                    if 'error' not in response:
+                        self.hedging.record_outcome(hedged=True, winner_is_hedge=task is hedge)
+                        response.setdefault('metadata', {})['hedged'] = True
+                        response['metadata']['provider'] = tasks[task]
+                        if task is hedge:
+                            response['metadata']['fallback_from'] = selected_provider
+                        return response, True
+                        
+            # Both providers failed; report the primary's error
+            self.hedging.record_outcome(hedged=True)
+            try:
+                return primary.result(), True
             except Exception as e:
-                error_message = str(e)
-                error_messages.append(f"Attempt {attempt}: {error_message}")
+                return {
+                    'content': f"Error generating response: {str(e)}",
+                    'model': "error",
+                    'error': str(e)
+                }, True
+        finally:
+            # A primary that lost to the hedge took at least this long
+            if len(tasks) > 1 and not primary.done():
+                self.hedging.record_latency(selected_provider, time.perf_counter() - started_at)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """
+        Get request hedging statistics
+        
+        Returns:
+            Hedge rate, hedge win rate and hedge delays per provider
+        """
+        return self.hedging.get_stats()
+        
+    def concurrency_limiter(self, provider: str) -> AdaptiveConcurrencyLimiter:
+        """
+        Get the adaptive concurrency limiter of a provider
+        
+        Args:
+            provider: Provider name
+            
+        Returns:
+            The provider's limiter
+        """
+        return self.concurrency_limiters.get(provider)
+        
+    def get_concurrency_stats(self) -> Dict[str, Any]:
+        """
+        Get the concurrency limits, load and queue times per provider
+        
+        Returns:
+            Limiter statistics by provider
+        """
+        return self.concurrency_limiters.get_stats()
+        
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """
+        Get request coalescing statistics (shared by all clients)
+        
+        Returns:
+            Provider calls started, requests that joined an in-flight call,
+            and calls currently in flight
+        """
+        return self.coalescer.get_stats()
+        
+    def _send_chat_request(self, 
+                         system_message: str,
+                         user_message: str,
+                         conversation_history: Optional[List[Dict[str, str]]] = None,
+                         max_tokens: int = 1000,
+                         temperature: float = 0.7,
+                         json_format: bool = False,
+                         provider: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Send chat request to AI provider with automatic fallback, bypassing the cache
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
+            provider: Specific provider to use ('openai' or 'anthropic')
+            
+        Returns:
+            Dictionary with response details
+        """
+        selected_provider, fallback_provider = self._route_by_health(*self._select_providers(provider))
+        
+        # If no providers are available
+        if not selected_provider:
+            return {
+                'content': "No AI providers are currently available.",
+                'model': "none",
+                'error': "No AI providers available"
+            }
+            
+        request = {
+            'system_message': system_message,
+            'user_message': user_message,
+            'conversation_history': conversation_history,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'json_format': json_format
+        }
+        
+        # Try to call the selected provider
+        try:
+            response = self._chat_request(selected_provider, **request)
+            
+            # Check if the response has an error and fallback is available
+            if 'error' in response and fallback_provider and self._should_fallback(response):
+                error_msg = response.get('error', '')
+                logger.warning(f"Primary provider '{selected_provider}' failed with error: {error_msg}. Trying fallback provider '{fallback_provider}'")
+                
+                # Call the fallback provider
+                fallback_response = self._chat_request(fallback_provider, **request)
+                
+                # Check if fallback was successful
+                if 'error' not in fallback_response:
+                    logger.info(f"Successfully used fallback provider '{fallback_provider}'")
+                    return self._mark_fallback(fallback_response, selected_provider, error_msg)
+                else:
+                    logger.error(f"Both primary and fallback providers failed. Primary error: {error_msg}, Fallback error: {fallback_response.get('error', '')}")
+                    
+            # Return the original response if no fallback was needed or fallback failed
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error with provider {selected_provider}: {str(e)}")
+            # Try fallback if available
+            if fallback_provider:
+                logger.warning(f"Primary provider '{selected_provider}' threw exception. Trying fallback provider '{fallback_provider}'")
+                try:
+                    return self._chat_request(fallback_provider, **request)
+                except Exception as fallback_e:
+                    logger.error(f"Fallback provider '{fallback_provider}' also failed: {str(fallback_e)}")
+            
+            # Return error details if both failed or no fallback available
+            return {
+                'content': f"Error generating response: {str(e)}",
+                'model': "error",
+                'error': str(e)
+            }
+            
+    async def _send_chat_request_async(self, 
+                                      system_message: str,
+                                      user_message: str,
+                                      conversation_history: Optional[List[Dict[str, str]]] = None,
+                                      max_tokens: int = 1000,
+                                      temperature: float = 0.7,
+                                      json_format: bool = False,
+                                      provider: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Send chat request to AI provider with automatic fallback, without blocking
+        and bypassing the cache
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
+            provider: Specific provider to use ('openai' or 'anthropic')
+            
+        Returns:
+            Dictionary with response details
+        """
+        selected_provider, fallback_provider = self._route_by_health(*self._select_providers(provider))
+        
+        # If no providers are available
+        if not selected_provider:
+            return {
+                'content': "No AI providers are currently available.",
+                'model': "none",
+                'error': "No AI providers available"
+            }
+            
+        request = {
+            'system_message': system_message,
+            'user_message': user_message,
+            'conversation_history': conversation_history,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'json_format': json_format
+        }
+        
+        # Try to call the selected provider
+        try:
+            # A caller that asked for a provider gets that provider's answer, so it is not hedged
+            hedge_provider = None if provider else fallback_provider
+            response, hedged = await self._hedged_chat_request_async(selected_provider, hedge_provider, request)
+            
+            # Check if the response has an error and fallback is available (and was not already tried)
+            if 'error' in response and fallback_provider and not hedged and self._should_fallback(response):
+                error_msg = response.get('error', '')
+                logger.warning(f"Primary provider '{selected_provider}' failed with error: {error_msg}. Trying fallback provider '{fallback_provider}'")
+                
+                # Call the fallback provider
+                fallback_response = await self._chat_request_async(fallback_provider, **request)
+                
+                # Check if fallback was successful
+                if 'error' not in fallback_response:
+                    logger.info(f"Successfully used fallback provider '{fallback_provider}'")
+                    return self._mark_fallback(fallback_response, selected_provider, error_msg)
+                else:
+                    logger.error(f"Both primary and fallback providers failed. Primary error: {error_msg}, Fallback error: {fallback_response.get('error', '')}")
+                    
+            # Return the original response if no fallback was needed or fallback failed
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error with provider {selected_provider}: {str(e)}")
+            # Try fallback if available
+            if fallback_provider:
+                logger.warning(f"Primary provider '{selected_provider}' threw exception. Trying fallback provider '{fallback_provider}'")
+                try:
+                    return await self._chat_request_async(fallback_provider, **request)
+                except Exception as fallback_e:
+                    logger.error(f"Fallback provider '{fallback_provider}' also failed: {str(fallback_e)}")
+            
+            # Return error details if both failed or no fallback available
+            return {
+                'content': f"Error generating response: {str(e)}",
+                'model': "error",
+                'error': str(e)
+            }
+    
+    def analyze_image(self, image_base64: str, prompt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analyze image using multimodal capabilities
+        
+        Args:
+            image_base64: Base64-encoded image data
+            prompt: Optional prompt to guide the analysis
+            
+        Returns:
+            Dictionary with analysis results
+        """
+        # Default prompt if not provided
+        if not prompt:
+            prompt = """
+            Analyze this image in detail. Describe what you see, including objects, people, 
+            scenes, colors, text, and any other noteworthy elements. Provide a clear and 
+            comprehensive description.
+            """
+            
+        # Check if OpenAI is available (required for image analysis)
+        if not self.providers.get('openai', False):
+            return {
+                'description': "Image analysis is currently unavailable.",
+                'error': "OpenAI provider required for image analysis is not available"
+            }
+            
+        try:
+            # Prepare the image URL with base64 data
+            image_url = f"data:image/jpeg;base64,{image_base64}"
+            
+            # Call OpenAI with multimodal request
+            response = self.openai_client.chat.completions.create(
+                model="gpt-4o",  # Using the newest model supporting vision
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {
+                                "type": "image_url",
+                                "image_url": {"url": image_url}
+                            }
+                        ]
+                    }
+                ],
+                max_tokens=800
+            )
+            
+            # Extract the response content
+            description = response.choices[0].message.content
+            
+            # Structure the response
+            return {
+                'description': description,
+                'objects': [],  # For future image object detection capabilities
+                'text': "",  # For future OCR capabilities
+                'model': "gpt-4o"
+            }
+            
+        except Exception as e:
+            logger.error(f"Error analyzing image: {str(e)}")
+            return {
+                'description': "Error analyzing image.",
+                'objects': [],
+                'text': "",
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _retry_outcome(error: Exception, attempt: int, max_attempts: int,
+                       error_messages: List[str]) -> Union[float, Dict[str, Any]]:
+        """
+        Decide what to do after a failed attempt
+        
+        Args:
+            error: Exception raised by the attempt
+            attempt: Number of the failed attempt, starting at 1
+            max_attempts: Maximum number of attempts
+            error_messages: Errors of the attempts so far (appended to)
+            
+        Returns:
+            Seconds to wait before the next attempt, or the error response
+            once all attempts have failed
+        """
+        base_delay = 1.0  # Base delay in seconds
+        error_message = str(error)
+        error_messages.append(f"Attempt {attempt}: {error_message}")
+        
+        # Check for rate limiting or quota errors
+        is_rate_limit = is_rate_limit_error(error_message)
+        
+        if is_rate_limit:
+            logger.warning(f"Rate limit encountered: {error_message}")
+            
+            # For rate limits, use a longer delay with more randomness
+            if attempt < max_attempts:
+                # Calculate delay with exponential backoff and jitter
+                delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 1)
+                logger.info(f"Rate limit hit, retrying in {delay:.2f} seconds (attempt {attempt}/{max_attempts})")
+                return delay
                 
-                # Check for specific error types
-                error_type = type(e).__name__
+            # Last attempt failed, return detailed error
+            logger.error(f"All {max_attempts} retry attempts failed due to rate limiting")
+            return {
+                'content': f"Service temporarily unavailable due to high demand. Please try again later.",
+                'model': "error",
+                'error': "Rate limit exceeded after multiple retries",
+                'error_details': "\n".join(error_messages)
+            }
+            
+        # For other errors, use a shorter delay
+        if attempt < max_attempts:
+            delay = base_delay * (1.5 ** (attempt - 1)) + random.uniform(0, 0.5)
+            logger.warning(f"Request failed with error: {error_message}, retrying in {delay:.2f} seconds (attempt {attempt}/{max_attempts})")
+            return delay
+            
+        # Last attempt failed, return detailed error
+        logger.error(f"All {max_attempts} retry attempts failed")
+        return {
+            'content': f"Error generating response: {error_message}",
+            'model': "error",
+            'error': error_message,
+            'error_details': "\n".join(error_messages)
+        }
+        
+    def _with_retry(self, operation: Callable, max_attempts: int = 5,
+                    provider: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Execute an operation with retry logic and exponential backoff
+        
+        Each attempt passes through the provider's circuit breaker; once the
+        circuit opens, the remaining attempts are skipped.
+        
+        Args:
+            operation: Callable function to execute
+            max_attempts: Maximum number of retry attempts
+            provider: Provider whose circuit breaker applies
+            
+        Returns:
+            Result from the operation or error details
+        """
+        error_messages = []
+        breaker = self.circuit_breaker(provider) if provider else None
+        
+        for attempt in range(1, max_attempts + 1):
+            try:
+                # Attempt the operation
+                if breaker is not None:
+                    with breaker.call():
+                        result = operation()
+                else:
+                    result = operation()
                 
-                # Check for rate limiting or quota errors
-                is_rate_limit = any(term in error_message.lower() for term in 
-                                   ["rate limit", "ratelimit", "too many requests", "quota", "capacity"])
+                # If we get here, the operation succeeded
+                if attempt > 1:
+                    logger.info(f"Operation succeeded on attempt {attempt} after previous failures")
+                return result
                 
-                if is_rate_limit:
-                    logger.warning(f"Rate limit encountered: {error_message}")
-                    
-                    # For rate limits, use a longer delay with more randomness
-                    if attempt < max_attempts:
-                        # Calculate delay with exponential backoff and jitter
-                        delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 1)
-                        logger.info(f"Rate limit hit, retrying in {delay:.2f} seconds (attempt {attempt}/{max_attempts})")
-                        time.sleep(delay)
-                    else:
-                        # Last attempt failed, return detailed error
-                        logger.error(f"All {max_attempts} retry attempts failed due to rate limiting")
-                        return {
-                            'content': f"Service temporarily unavailable due to high demand. Please try again later.",
-                            'model': "error",
-                            'error': "Rate limit exceeded after multiple retries",
-                            'error_details': "\n".join(error_messages)
-                        }
-                else:
-                    # For other errors, use a shorter delay
-                    if attempt < max_attempts:
-                        delay = base_delay * (1.5 ** (attempt - 1)) + random.uniform(0, 0.5)
-                        logger.warning(f"Request failed with error: {error_message}, retrying in {delay:.2f} seconds (attempt {attempt}/{max_attempts})")
-                        time.sleep(delay)
-                    else:
-                        # Last attempt failed, return detailed error
-                        logger.error(f"All {max_attempts} retry attempts failed")
-                        return {
-                            'content': f"Error generating response: {error_message}",
-                            'model': "error",
-                            'error': error_message,
-                            'error_details': "\n".join(error_messages)
-                        }
+            except CircuitOpenError as e:
+                return self._circuit_open_response(e, error_messages)
+            except Exception as e:
+                outcome = self._retry_outcome(e, attempt, max_attempts, error_messages)
+                if isinstance(outcome, dict):
+                    return outcome
+                time.sleep(outcome)
         
         # This should never be reached due to the return in the last attempt failure
         return {
@@ -584,28 +1406,69 @@ class AIClient:
             'model': "error",
             'error': "Unexpected retry error"
         }
-
-    def _openai_chat_request(self,
-                            system_message: str,
-                            user_message: str,
-                            conversation_history: Optional[List[Dict[str, str]]] = None,
-                            max_tokens: int = 1000,
-                            temperature: float = 0.7,
-                            json_format: bool = False) -> Dict[str, Any]:
+        
+    async def _with_retry_async(self, operation: Callable[[], Awaitable[Dict[str, Any]]],
+                                max_attempts: int = 5,
+                                provider: Optional[str] = None) -> Dict[str, Any]:
         """
-        Send chat request to OpenAI with retry logic
+        Execute a coroutine operation with retry logic and exponential backoff
+        
+        Backoff waits with asyncio.sleep, so the event loop keeps serving other
+        requests. Cancellation is not retried: it propagates to the caller.
+        Each attempt holds a slot of the provider's concurrency limiter and
+        passes through its circuit breaker; once the circuit opens, the
+        remaining attempts are skipped.
         
         Args:
-            system_message: System message/instructions
-            user_message: User message/query
-            conversation_history: Previous conversation messages
-            max_tokens: Maximum tokens in response
-            temperature: Creativity parameter (0.0-1.0)
-            json_format: Whether to request JSON format response
+            operation: Function returning a new awaitable for each attempt
+            max_attempts: Maximum number of retry attempts
+            provider: Provider whose concurrency limit and circuit breaker apply
             
         Returns:
-            Dictionary with response details
+            Result from the operation or error details
         """
+        error_messages = []
+        limiter = self.concurrency_limiter(provider) if provider else None
+        breaker = self.circuit_breaker(provider) if provider else None
+        
+        for attempt in range(1, max_attempts + 1):
+            try:
+                # Attempt the operation
+                if limiter is not None:
+                    async with limiter.slot():
+                        with breaker.call():
+                            result = await operation()
+                else:
+                    result = await operation()
+                
+                # If we get here, the operation succeeded
+                if attempt > 1:
+                    logger.info(f"Operation succeeded on attempt {attempt} after previous failures")
+                return result
+                
+            except CircuitOpenError as e:
+                return self._circuit_open_response(e, error_messages)
+            except Exception as e:
+                outcome = self._retry_outcome(e, attempt, max_attempts, error_messages)
+                if isinstance(outcome, dict):
+                    return outcome
+                await asyncio.sleep(outcome)
+        
+        # This should never be reached due to the return in the last attempt failure
+        return {
+            'content': "An unexpected error occurred during retry handling",
+            'model': "error",
+            'error': "Unexpected retry error"
+        }
+        
+    @staticmethod
+    def _openai_request_params(system_message: str,
+                               user_message: str,
+                               conversation_history: Optional[List[Dict[str, str]]] = None,
+                               max_tokens: int = 1000,
+                               temperature: float = 0.7,
+                               json_format: bool = False) -> Dict[str, Any]:
+        """Build the parameters of an OpenAI chat completion request"""
         # Format messages for OpenAI
         messages = [{"role": "system", "content": system_message}]
         
@@ -621,7 +1484,7 @@ class AIClient:
         
         # Prepare request parameters
         request_params = {
-            "model": "gpt-4o",  # The newest model
+            "model": PROVIDER_MODELS['openai'],
             "messages": messages,
             "max_tokens": max_tokens,
             "temperature": temperature
@@ -631,37 +1494,67 @@ class AIClient:
         if json_format:
             request_params["response_format"] = {"type": "json_object"}
             
+        return request_params
+        
+    @staticmethod
+    def _openai_result(response: Any) -> Dict[str, Any]:
+        """Extract the response details from an OpenAI chat completion"""
+        # Extract response content
+        content = response.choices[0].message.content
+        
+        # Return response details
+        return {
+            'content': content,
+            'model': response.model,
+            'usage': {
+                'prompt_tokens': response.usage.prompt_tokens,
+                'completion_tokens': response.usage.completion_tokens,
+                'total_tokens': response.usage.total_tokens
+            }
+        }
+        
+    def _openai_chat_request(self,
+                            system_message: str,
+                            user_message: str,
+                            conversation_history: Optional[List[Dict[str, str]]] = None,
+                            max_tokens: int = 1000,
+                            temperature: float = 0.7,
+                            json_format: bool = False) -> Dict[str, Any]:
+        """
+        Send chat request to OpenAI with retry logic
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
+            
+        Returns:
+            Dictionary with response details
+        """
+        request_params = self._openai_request_params(
+            system_message, user_message, conversation_history, max_tokens, temperature, json_format
+        )
+        
         # Define the operation to retry
         def openai_operation():
             # Send request to OpenAI
-            response = self.openai_client.chat.completions.create(**request_params)
-            
-            # Extract response content
-            content = response.choices[0].message.content
-            
-            # Return response details
-            return {
-                'content': content,
-                'model': response.model,
-                'usage': {
-                    'prompt_tokens': response.usage.prompt_tokens,
-                    'completion_tokens': response.usage.completion_tokens,
-                    'total_tokens': response.usage.total_tokens
-                }
-            }
+            return self._openai_result(self.openai_client.chat.completions.create(**request_params))
         
         # Execute with retry logic
-        return self._with_retry(openai_operation)
-    
-    def _anthropic_chat_request(self,
-                              system_message: str,
-                              user_message: str,
-                              conversation_history: Optional[List[Dict[str, str]]] = None,
-                              max_tokens: int = 1000,
-                              temperature: float = 0.7,
-                              json_format: bool = False) -> Dict[str, Any]:
+        return self._with_retry(openai_operation, provider='openai')
+        
+    async def _openai_chat_request_async(self,
+                                         system_message: str,
+                                         user_message: str,
+                                         conversation_history: Optional[List[Dict[str, str]]] = None,
+                                         max_tokens: int = 1000,
+                                         temperature: float = 0.7,
+                                         json_format: bool = False) -> Dict[str, Any]:
         """
-        Send chat request to Anthropic with retry logic
+        Send chat request to OpenAI with the async client and retry logic
         
         Args:
             system_message: System message/instructions
@@ -674,6 +1567,26 @@ class AIClient:
         Returns:
             Dictionary with response details
         """
+        request_params = self._openai_request_params(
+            system_message, user_message, conversation_history, max_tokens, temperature, json_format
+        )
+        
+        # Define the operation to retry
+        async def openai_operation():
+            # Send request to OpenAI
+            return self._openai_result(await self.async_openai_client.chat.completions.create(**request_params))
+        
+        # Execute with retry logic
+        return await self._with_retry_async(openai_operation, provider='openai')
+        
+    @staticmethod
+    def _anthropic_request_params(system_message: str,
+                                  user_message: str,
+                                  conversation_history: Optional[List[Dict[str, str]]] = None,
+                                  max_tokens: int = 1000,
+                                  temperature: float = 0.7,
+                                  json_format: bool = False) -> Dict[str, Any]:
+        """Build the parameters of an Anthropic messages request"""
         # Format messages for Anthropic
         messages = []
         
@@ -699,7 +1612,7 @@ class AIClient:
         
         # Prepare request parameters - using claude-3-5-sonnet-20241022 which was released after your knowledge cutoff
         request_params = {
-            "model": "claude-3-5-sonnet-20241022",  # The newest model
+            "model": PROVIDER_MODELS['anthropic'],
             "messages": messages,
             "max_tokens": max_tokens,
             "temperature": temperature,
@@ -709,27 +1622,90 @@ class AIClient:
         # Adjust for JSON format if requested
         if json_format:
             request_params["system"] = system_message + "\nAlways respond in valid JSON format that can be parsed by json.loads() in Python."
+            
+        return request_params
+        
+    @staticmethod
+    def _anthropic_result(response: Any) -> Dict[str, Any]:
+        """Extract the response details from an Anthropic message"""
+        # Extract response content
+        content = response.content[0].text
+        
+        # Return response details
+        usage = {
+            'input_tokens': response.usage.input_tokens,
+            'output_tokens': response.usage.output_tokens,
+            'total_tokens': response.usage.input_tokens + response.usage.output_tokens
+        }
+        
+        return {
+            'content': content,
+            'model': response.model,
+            'usage': usage
+        }
+        
+    def _anthropic_chat_request(self,
+                              system_message: str,
+                              user_message: str,
+                              conversation_history: Optional[List[Dict[str, str]]] = None,
+                              max_tokens: int = 1000,
+                              temperature: float = 0.7,
+                              json_format: bool = False) -> Dict[str, Any]:
+        """
+        Send chat request to Anthropic with retry logic
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
+            
+        Returns:
+            Dictionary with response details
+        """
+        request_params = self._anthropic_request_params(
+            system_message, user_message, conversation_history, max_tokens, temperature, json_format
+        )
         
         # Define the operation to retry
         def anthropic_operation():
             # Send request to Anthropic
-            response = self.anthropic_client.messages.create(**request_params)
-            
-            # Extract response content
-            content = response.content[0].text
-            
-            # Return response details
-            usage = {
-                'input_tokens': response.usage.input_tokens,
-                'output_tokens': response.usage.output_tokens,
-                'total_tokens': response.usage.input_tokens + response.usage.output_tokens
-            }
+            return self._anthropic_result(self.anthropic_client.messages.create(**request_params))
+        
+        # Execute with retry logic
+        return self._with_retry(anthropic_operation, provider='anthropic')
+        
+    async def _anthropic_chat_request_async(self,
+                                            system_message: str,
+                                            user_message: str,
+                                            conversation_history: Optional[List[Dict[str, str]]] = None,
+                                            max_tokens: int = 1000,
+                                            temperature: float = 0.7,
+                                            json_format: bool = False) -> Dict[str, Any]:
+        """
+        Send chat request to Anthropic with the async client and retry logic
+        
+        Args:
+            system_message: System message/instructions
+            user_message: User message/query
+            conversation_history: Previous conversation messages
+            max_tokens: Maximum tokens in response
+            temperature: Creativity parameter (0.0-1.0)
+            json_format: Whether to request JSON format response
             
-            return {
-                'content': content,
-                'model': response.model,
-                'usage': usage
-            }
+        Returns:
+            Dictionary with response details
+        """
+        request_params = self._anthropic_request_params(
+            system_message, user_message, conversation_history, max_tokens, temperature, json_format
+        )
+        
+        # Define the operation to retry
+        async def anthropic_operation():
+            # Send request to Anthropic
+            return self._anthropic_result(await self.async_anthropic_client.messages.create(**request_params))
         
         # Execute with retry logic
-        return self._with_retry(anthropic_operation)
\ No newline at end of file
+        return await self._with_retry_async(anthropic_operation, provider='anthropic')
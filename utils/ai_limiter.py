@@ -18,6 +18,7 @@ from utils.token_estimation import (
     calculate_openai_tokens, 
     calculate_anthropic_tokens
 )
+from utils.token_counter import count_tokens
 from utils.auth import get_user_from_token
 
 logger = logging.getLogger(__name__)
@@ -90,17 +91,15 @@ def limit_ai_usage(f):
                         model = original_request_data.get('model', 'gpt-4o')
                         messages = original_request_data.get('messages', [])
                         
-                        # Estimate tokens based on model
+                        # Estimate tokens based on model (message counts are cached across requests)
                         if 'claude' in model.lower():
                             request_tokens = calculate_anthropic_tokens(messages, model)
-                            # Estimate response tokens based on response content
-                            content = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                            response_tokens = len(content.split()) * 1.3  # rough estimate
                         else:
                             request_tokens = calculate_openai_tokens(messages, model)
-                            # Estimate response tokens based on response content
-                            content = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                            response_tokens = len(content.split()) * 1.3  # rough estimate
+                            
+                        # Count response tokens from the response content
+                        content = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
+                        response_tokens = count_tokens(content, model)
                     
                     # Get the model and endpoint
                     model = original_request_data.get('model', 'unknown')
@@ -0,0 +1,833 @@
+"""
+AI Provider Resilience
+
+This module keeps per-provider latency statistics for the AI client and
+decides when to hedge a request: if the primary provider has not answered
+within a percentile of its recent latency, the same request is sent to the
+fallback provider and whichever answers first wins.
+
+It also limits how many requests run against each provider at once. The
+limit adapts like TCP congestion control (AIMD): it grows additively while
+requests succeed and is cut multiplicatively when the provider reports a
+rate limit, and requests over the limit wait in a queue instead of adding
+to a retry storm.
+
+Finally, a circuit breaker per provider and model tracks the rolling error
+rate and latency of its calls. When either gets too high the circuit opens:
+requests go straight to a healthy provider instead of paying the retry
+schedule of one that is down, and after a cool-down a few probe requests
+decide whether the circuit closes again.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Deque
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Hedging configuration
+HEDGE_ENABLED = os.environ.get('AI_HEDGE_ENABLED', 'true').lower() == 'true'
+DEFAULT_HEDGE_PERCENTILE = float(os.environ.get('AI_HEDGE_PERCENTILE', 0.95))
+DEFAULT_HEDGE_MIN_DELAY = float(os.environ.get('AI_HEDGE_MIN_DELAY', 1.0))  # Seconds
+DEFAULT_HEDGE_MAX_DELAY = float(os.environ.get('AI_HEDGE_MAX_DELAY', 15.0))  # Seconds
+DEFAULT_HEDGE_INITIAL_DELAY = 5.0  # Seconds, until enough latencies are known
+DEFAULT_LATENCY_WINDOW = 200  # Recent latencies kept per provider
+DEFAULT_MIN_SAMPLES = 20  # Latencies needed before the percentile is trusted
+
+# Concurrency limiter configuration
+DEFAULT_INITIAL_CONCURRENCY = int(os.environ.get('AI_CONCURRENCY_INITIAL', 8))
+DEFAULT_MIN_CONCURRENCY = int(os.environ.get('AI_CONCURRENCY_MIN', 1))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('AI_CONCURRENCY_MAX', 64))
+DEFAULT_DECREASE_FACTOR = 0.5
+
+# Circuit breaker configuration
+CIRCUIT_BREAKER_ENABLED = os.environ.get('AI_CIRCUIT_BREAKER_ENABLED', 'true').lower() == 'true'
+DEFAULT_CIRCUIT_ERROR_RATE = float(os.environ.get('AI_CIRCUIT_ERROR_RATE', 0.5))
+DEFAULT_CIRCUIT_SLOW_CALL = float(os.environ.get('AI_CIRCUIT_SLOW_CALL', 30.0))  # Seconds
+DEFAULT_CIRCUIT_SLOW_RATE = float(os.environ.get('AI_CIRCUIT_SLOW_RATE', 0.8))
+DEFAULT_CIRCUIT_WINDOW = float(os.environ.get('AI_CIRCUIT_WINDOW', 60.0))  # Seconds
+DEFAULT_CIRCUIT_MIN_CALLS = int(os.environ.get('AI_CIRCUIT_MIN_CALLS', 10))
+DEFAULT_CIRCUIT_OPEN_SECONDS = float(os.environ.get('AI_CIRCUIT_OPEN_SECONDS', 30.0))
+DEFAULT_CIRCUIT_PROBES = int(os.environ.get('AI_CIRCUIT_PROBES', 3))
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+# Error message fragments that indicate a provider rate limit or quota error
+RATE_LIMIT_TERMS = ("rate limit", "ratelimit", "too many requests", "quota", "capacity")
+
+
+def is_rate_limit_error(error: Any) -> bool:
+    """
+    Check whether an error reports a provider rate limit or quota
+
+    Args:
+        error: Exception or error message
+
+    Returns:
+        True for rate limit and quota errors
+    """
+    message = str(error).lower()
+    return any(term in message for term in RATE_LIMIT_TERMS)
+
+
+class LatencyWindow:
+    """
+    Latencies of a provider's most recent successful requests
+    """
+
+    def __init__(self, size: int = DEFAULT_LATENCY_WINDOW):
+        """
+        Initialize the window
+
+        Args:
+            size: Number of recent latencies kept
+        """
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """
+        Record the latency of a request
+
+        Args:
+            seconds: Request latency in seconds
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Get a latency percentile
+
+        Args:
+            fraction: Percentile as a fraction (0.95 for p95)
+
+        Returns:
+            The percentile in seconds, or None without samples
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class HedgingPolicy:
+    """
+    Decides when a request to the primary provider is hedged to the fallback
+    """
+
+    def __init__(self,
+                 enabled: bool = HEDGE_ENABLED,
+                 percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 min_delay: float = DEFAULT_HEDGE_MIN_DELAY,
+                 max_delay: float = DEFAULT_HEDGE_MAX_DELAY,
+                 initial_delay: float = DEFAULT_HEDGE_INITIAL_DELAY,
+                 min_samples: int = DEFAULT_MIN_SAMPLES,
+                 window_size: int = DEFAULT_LATENCY_WINDOW):
+        """
+        Initialize the policy
+
+        Args:
+            enabled: Whether requests are hedged at all
+            percentile: Latency percentile of the primary after which to hedge
+            min_delay: Lower bound of the hedge delay in seconds
+            max_delay: Upper bound of the hedge delay in seconds
+            initial_delay: Hedge delay while fewer than min_samples latencies are known
+            min_samples: Latencies needed before the percentile is used
+            window_size: Number of recent latencies kept per provider
+        """
+        if not 0 < percentile <= 1:
+            raise ValueError("percentile must be between 0 and 1")
+        if min_delay > max_delay:
+            raise ValueError("min_delay must not exceed max_delay")
+
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+
+    def _window(self, provider: str) -> LatencyWindow:
+        with self._lock:
+            window = self._latencies.get(provider)
+            if window is None:
+                window = self._latencies[provider] = LatencyWindow(self.window_size)
+            return window
+
+    def record_latency(self, provider: str, seconds: float):
+        """
+        Record the latency of a successful request, or a lower bound of it
+        for a request cancelled after it was hedged
+
+        Args:
+            provider: Provider that answered
+            seconds: Request latency in seconds
+        """
+        self._window(provider).record(seconds)
+
+    def hedge_delay(self, provider: str) -> float:
+        """
+        Get how long to wait for a provider before hedging
+
+        Args:
+            provider: Primary provider of the request
+
+        Returns:
+            Seconds to wait
+        """
+        window = self._window(provider)
+        if len(window) < self.min_samples:
+            delay = self.initial_delay
+        else:
+            delay = window.percentile(self.percentile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def record_outcome(self, hedged: bool, winner_is_hedge: bool = False):
+        """
+        Count a finished request
+
+        Args:
+            hedged: Whether the request was hedged
+            winner_is_hedge: Whether the hedge answered first
+        """
+        self.requests += 1
+        if hedged:
+            self.hedged += 1
+            if winner_is_hedge:
+                self.hedge_wins += 1
+            else:
+                self.primary_wins += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hedging statistics
+
+        Returns:
+            Hedge rate, win rate of hedges and current hedge delays per provider
+        """
+        return {
+            'enabled': self.enabled,
+            'percentile': self.percentile,
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+            'hedge_wins': self.hedge_wins,
+            'primary_wins_after_hedge': self.primary_wins,
+            'hedge_win_rate': self.hedge_wins / self.hedged if self.hedged else 0.0,
+            'providers': {
+                provider: {
+                    'samples': len(window),
+                    'p50_seconds': window.percentile(0.5),
+                    'p95_seconds': window.percentile(0.95),
+                    'hedge_delay_seconds': self.hedge_delay(provider)
+                }
+                for provider, window in list(self._latencies.items())
+            }
+        }
+
+
+class _LimiterSlot:
+    """Async context manager holding one slot of a limiter"""
+
+    __slots__ = ('limiter', 'started_at')
+
+    def __init__(self, limiter: 'AdaptiveConcurrencyLimiter'):
+        self.limiter = limiter
+        self.started_at = 0.0
+
+    async def __aenter__(self) -> '_LimiterSlot':
+        self.started_at = await self.limiter.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if exc is None:
+            outcome = 'success'
+        elif is_rate_limit_error(exc):
+            outcome = 'rate_limited'
+        else:
+            outcome = 'error'
+        self.limiter.release(self.started_at, outcome)
+        return False
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit for the requests to one provider
+
+    Each success raises the limit by increase / limit, so it grows by about
+    `increase` per limit's worth of successful requests. A rate limit error
+    multiplies it by decrease_factor, at most once per round of requests:
+    errors from requests started before the last cut do not cut again.
+
+    One limiter is shared by all event loops of the process (Flask runs each
+    async view on its own loop), so queued requests are woken on their own loop.
+    """
+
+    def __init__(self,
+                 initial_limit: int = DEFAULT_INITIAL_CONCURRENCY,
+                 min_limit: int = DEFAULT_MIN_CONCURRENCY,
+                 max_limit: int = DEFAULT_MAX_CONCURRENCY,
+                 increase: float = 1.0,
+                 decrease_factor: float = DEFAULT_DECREASE_FACTOR):
+        """
+        Initialize the limiter
+
+        Args:
+            initial_limit: Concurrent requests allowed at first
+            min_limit: Lowest the limit is cut to
+            max_limit: Highest the limit grows to
+            increase: Additive increase per limit's worth of successes
+            decrease_factor: Multiplier applied on a rate limit error
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self._limit = float(initial_limit)
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+        self.requests = 0
+        self.queued_requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.decreases = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent requests allowed"""
+        return max(self.min_limit, int(self._limit))
+
+    def slot(self) -> _LimiterSlot:
+        """
+        Get a context manager that holds a slot while a request runs
+
+        The request's outcome is taken from the exception leaving the block.
+
+        Returns:
+            Async context manager
+        """
+        return _LimiterSlot(self)
+
+    async def acquire(self) -> float:
+        """
+        Wait for a free slot
+
+        Returns:
+            Monotonic time the slot was granted
+        """
+        requested_at = time.monotonic()
+        waiter = None
+        with self._lock:
+            self.requests += 1
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+            else:
+                self.queued_requests += 1
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            try:
+                # The releasing request hands its slot over by resolving the future
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter.done() and not waiter.cancelled():
+                        self.in_flight -= 1
+                        self._wake()
+                    else:
+                        # Still queued; if a slot is already on its way, _grant returns it
+                        try:
+                            self._waiters.remove(waiter)
+                        except ValueError:
+                            pass
+                raise
+
+        granted_at = time.monotonic()
+        wait = granted_at - requested_at
+        with self._lock:
+            self.total_queue_wait += wait
+            if wait > self.max_queue_wait:
+                self.max_queue_wait = wait
+        return granted_at
+
+    def release(self, started_at: float, outcome: str = 'success'):
+        """
+        Free a slot and adapt the limit to the request's outcome
+
+        Args:
+            started_at: Time returned by acquire()
+            outcome: 'success', 'rate_limited' or 'error' (other errors leave the limit alone)
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if outcome == 'success':
+                self.successes += 1
+                self._limit = min(self.max_limit, self._limit + self.increase / max(self._limit, 1.0))
+            elif outcome == 'rate_limited':
+                self.rate_limited += 1
+                if started_at >= self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+                    self.decreases += 1
+                    logger.warning(f"Provider rate limited, concurrency limit cut to {self.limit}")
+            else:
+                self.errors += 1
+            self._wake()
+
+    def _wake(self):
+        """Hand free slots to queued requests in arrival order (lock held)"""
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            try:
+                waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+            except RuntimeError:
+                # The waiter's loop is closed
+                self.in_flight -= 1
+
+    def _grant(self, waiter: asyncio.Future):
+        """Resolve a woken waiter on its own loop, or return its slot if it gave up"""
+        if waiter.cancelled():
+            with self._lock:
+                self.in_flight -= 1
+                self._wake()
+        elif not waiter.done():
+            waiter.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current limit, load and queue times
+
+        Returns:
+            Limiter statistics
+        """
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'queued': len(self._waiters),
+            'requests': self.requests,
+            'queued_requests': self.queued_requests,
+            'successes': self.successes,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'decreases': self.decreases,
+            'avg_queue_wait_seconds': self.total_queue_wait / self.requests if self.requests else 0.0,
+            'max_queue_wait_seconds': self.max_queue_wait
+        }
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because its circuit is open"""
+
+
+class _BreakerCall:
+    """Context manager recording the outcome and latency of one call"""
+
+    __slots__ = ('breaker', 'started_at')
+
+    def __init__(self, breaker: 'CircuitBreaker'):
+        self.breaker = breaker
+        self.started_at = 0.0
+
+    def __enter__(self) -> '_BreakerCall':
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for {self.breaker.name}")
+        self.started_at = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        latency = time.monotonic() - self.started_at
+        if exc_type is None:
+            self.breaker.record_success(latency)
+        elif issubclass(exc_type, Exception):
+            self.breaker.record_failure(latency)
+        else:
+            # Cancelled or abandoned: no outcome, but free a probe slot
+            self.breaker.release()
+        return False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one provider and model
+
+    Closed: calls pass and their outcomes fill a rolling window. The circuit
+    opens when the window holds at least min_calls calls and the error rate or
+    the rate of calls slower than slow_call reaches its threshold.
+    Open: calls are refused until open_seconds have passed.
+    Half-open: up to `probes` calls pass at a time; that many successes in a
+    row close the circuit, a failure opens it again.
+    """
+
+    def __init__(self,
+                 name: str,
+                 enabled: bool = CIRCUIT_BREAKER_ENABLED,
+                 error_rate: float = DEFAULT_CIRCUIT_ERROR_RATE,
+                 slow_call: float = DEFAULT_CIRCUIT_SLOW_CALL,
+                 slow_rate: float = DEFAULT_CIRCUIT_SLOW_RATE,
+                 window: float = DEFAULT_CIRCUIT_WINDOW,
+                 min_calls: int = DEFAULT_CIRCUIT_MIN_CALLS,
+                 open_seconds: float = DEFAULT_CIRCUIT_OPEN_SECONDS,
+                 probes: int = DEFAULT_CIRCUIT_PROBES):
+        """
+        Initialize the breaker
+
+        Args:
+            name: Name used in logs and errors, e.g. 'openai:gpt-4o'
+            enabled: Whether calls are ever refused
+            error_rate: Error rate that opens the circuit
+            slow_call: Seconds after which a call counts as slow
+            slow_rate: Rate of slow calls that opens the circuit
+            window: Seconds of calls the rates are computed over
+            min_calls: Calls needed in the window before the circuit can open
+            open_seconds: Seconds the circuit stays open before probing
+            probes: Concurrent probe calls, and successes needed to close
+        """
+        if not 0 < error_rate <= 1 or not 0 < slow_rate <= 1:
+            raise ValueError("error_rate and slow_rate must be between 0 and 1")
+        if min_calls < 1 or probes < 1:
+            raise ValueError("min_calls and probes must be at least 1")
+
+        self.name = name
+        self.enabled = enabled
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.probes = probes
+
+        self._state = CIRCUIT_CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # (finished_at, failed, slow) of recent calls
+        self._calls: Deque[tuple] = deque()
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _rates(self) -> tuple:
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        errors = sum(1 for _, failed, _ in self._calls if failed)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        return errors / total, slow / total
+
+    def _open(self, now: float, reason: str):
+        self._state = CIRCUIT_OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.opened += 1
+        logger.warning(f"Circuit for {self.name} opened: {reason}")
+
+    def _current_state(self, now: float) -> str:
+        if self._state == CIRCUIT_OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = CIRCUIT_HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"Circuit for {self.name} half-open, probing")
+        return self._state
+
+    @property
+    def state(self) -> str:
+        """Current state: 'closed', 'open' or 'half_open'"""
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def is_available(self) -> bool:
+        """
+        Check whether a call would be let through, without reserving it
+
+        Returns:
+            True unless the circuit is open or all probe slots are taken
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CIRCUIT_OPEN:
+                return False
+            return state == CIRCUIT_CLOSED or self._probes_in_flight < self.probes
+
+    def allow_request(self) -> bool:
+        """
+        Reserve a call; in the half-open state this takes a probe slot
+
+        Returns:
+            True if the call may proceed (its outcome must then be recorded)
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CIRCUIT_CLOSED:
+                return True
+            if state == CIRCUIT_HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def call(self) -> _BreakerCall:
+        """
+        Get a context manager guarding one call
+
+        Entering raises CircuitOpenError if the call is refused; the outcome is
+        taken from the exception leaving the block.
+
+        Returns:
+            Context manager
+        """
+        return _BreakerCall(self)
+
+    def record_success(self, latency: float):
+        """
+        Record a successful call
+
+        Args:
+            latency: Call duration in seconds
+        """
+        self._record(False, latency)
+
+    def record_failure(self, latency: Optional[float] = None):
+        """
+        Record a failed call
+
+        Args:
+            latency: Call duration in seconds, if known
+        """
+        self._record(True, latency)
+
+    def _record(self, failed: bool, latency: Optional[float]):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        slow = latency is not None and latency >= self.slow_call
+        with self._lock:
+            state = self._current_state(now)
+            if state == CIRCUIT_HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._open(now, "probe failed" if failed else f"probe took {latency:.1f}s")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self._state = CIRCUIT_CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit for {self.name} closed after {self.probes} successful probes")
+                return
+            if state == CIRCUIT_OPEN:
+                # A call started before the circuit opened
+                return
+
+            self._calls.append((now, failed, slow))
+            self._trim(now)
+            if len(self._calls) >= self.min_calls:
+                error_rate, slow_rate = self._rates()
+                if error_rate >= self.error_rate:
+                    self._open(now, f"error rate {error_rate:.0%} over {len(self._calls)} calls")
+                elif slow_rate >= self.slow_rate:
+                    self._open(now, f"{slow_rate:.0%} of {len(self._calls)} calls slower than {self.slow_call}s")
+
+    def release(self):
+        """Free a probe slot of a call that finished without an outcome"""
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def health_score(self) -> float:
+        """
+        Score the recent health of the provider
+
+        Returns:
+            Share of calls in the window that succeeded without being slow
+            (1.0 without calls, 0.0 while the circuit is open)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == CIRCUIT_OPEN:
+                return 0.0
+            self._trim(now)
+            if not self._calls:
+                return 1.0
+            healthy = sum(1 for _, failed, slow in self._calls if not failed and not slow)
+            return healthy / len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the breaker state and rolling rates
+
+        Returns:
+            Breaker statistics
+        """
+        health = self.health_score()
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._trim(now)
+            error_rate, slow_rate = self._rates()
+            return {
+                'state': state,
+                'health': health,
+                'calls': len(self._calls),
+                'error_rate': error_rate,
+                'slow_rate': slow_rate,
+                'opened': self.opened,
+                'rejected': self.rejected,
+                'retry_in_seconds': max(0.0, self.open_seconds - (now - self._opened_at)) if state == CIRCUIT_OPEN else 0.0
+            }
+
+
+class CircuitBreakerRegistry:
+    """
+    Circuit breakers by provider and model, shared by all AI clients
+    """
+
+    def __init__(self, **breaker_options):
+        """
+        Initialize the registry
+
+        Args:
+            **breaker_options: Options passed to each CircuitBreaker
+        """
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, model: Optional[str] = None) -> CircuitBreaker:
+        """
+        Get the breaker of a provider and model
+
+        Args:
+            provider: Provider name
+            model: Model name
+
+        Returns:
+            The breaker, created on first use
+        """
+        name = f"{provider}:{model}" if model else provider
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self.breaker_options)
+            return breaker
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the state of every breaker
+
+        Returns:
+            Breaker statistics by name
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.get_stats() for name, breaker in breakers.items()}
+
+
+# Global registry instance
+circuit_breakers = CircuitBreakerRegistry()
+
+# Global hedging policy, so every client learns from all requests to a provider
+hedging_policy = HedgingPolicy()
+
+
+class ConcurrencyLimiterRegistry:
+    """
+    Adaptive concurrency limiters by provider, shared by all AI clients
+    """
+
+    def __init__(self, **limiter_options):
+        """
+        Initialize the registry
+
+        Args:
+            **limiter_options: Options passed to each AdaptiveConcurrencyLimiter
+        """
+        self.limiter_options = limiter_options
+        self._limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> AdaptiveConcurrencyLimiter:
+        """
+        Get the limiter of a provider
+
+        Args:
+            provider: Provider name
+
+        Returns:
+            The limiter, created on first use
+        """
+        with self._lock:
+            limiter = self._limiters.get(provider)
+            if limiter is None:
+                limiter = self._limiters[provider] = AdaptiveConcurrencyLimiter(**self.limiter_options)
+            return limiter
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the limit, load and queue times of every limiter
+
+        Returns:
+            Limiter statistics by provider
+        """
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {provider: limiter.get_stats() for provider, limiter in limiters.items()}
+
+
+# Global limiter registry instance
+concurrency_limiters = ConcurrencyLimiterRegistry()
+
+
+def get_circuit_breaker_stats() -> Dict[str, Any]:
+    """
+    Get the circuit breaker state of the AI providers
+
+    Returns:
+        Breaker statistics by provider and model
+    """
+    return circuit_breakers.get_stats()
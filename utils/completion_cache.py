@@ -0,0 +1,445 @@
+"""
+AI Completion Cache
+
+This module caches chat completions so near-identical prompts, such as
+FAQ-style customer questions sent with the same knowledge snippets, are
+answered without another model call. Entries are keyed by tenant, provider,
+model, sampling parameters, system prompt, conversation history and message,
+and looked up both exactly and with whitespace and case normalized.
+
+There are two tiers: an in-memory LRU and an optional SQLite file shared by
+processes and kept across restarts. Completions requested with a temperature
+above the configured maximum are never cached. Async callers use get_async()
+and set_async(), which run the SQLite queries in a thread (asyncio.to_thread)
+so a slow disk never stalls the event loop.
+"""
+
+import os
+import re
+import asyncio
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+DEFAULT_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 3600))  # 1 hour in seconds
+DEFAULT_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 1000))  # Entries kept in memory
+DEFAULT_MAX_DISK_ENTRIES = int(os.environ.get('AI_CACHE_MAX_DISK_ENTRIES', 100000))  # Entries kept on disk
+DEFAULT_MAX_TEMPERATURE = float(os.environ.get('AI_CACHE_MAX_TEMPERATURE', 0.7))  # Hotter requests are not cached
+DEFAULT_PRUNE_INTERVAL = 100  # Stores between checks of the disk tier size
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s\.\!\?]+$')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Normalize prompt text for matching near-identical prompts
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Lowercase text with whitespace collapsed and trailing punctuation removed
+    """
+    if not text:
+        return ''
+    return _TRAILING_PUNCTUATION.sub('', _WHITESPACE.sub(' ', text).strip().lower())
+
+
+def make_cache_keys(tenant_id: Optional[str],
+                    provider: str,
+                    model: str,
+                    system_message: str,
+                    user_message: str,
+                    conversation_history: Optional[List[Dict[str, str]]] = None,
+                    temperature: float = 0.7,
+                    max_tokens: int = 1000,
+                    json_format: bool = False) -> Tuple[str, str]:
+    """
+    Build the exact and normalized cache keys of a chat request
+
+    Args:
+        tenant_id: Tenant the completion belongs to (entries are never shared across tenants)
+        provider: AI provider name
+        model: Model name
+        system_message: System prompt
+        user_message: User message
+        conversation_history: Previous conversation messages
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens in the response
+        json_format: Whether a JSON response was requested
+
+    Returns:
+        Tuple of exact and normalized keys (hex digests)
+    """
+    history = [(msg.get('role', 'user'), msg.get('content', '')) for msg in conversation_history or []]
+    params = [tenant_id, provider, model, temperature, max_tokens, bool(json_format)]
+
+    exact = json.dumps(params + [system_message, history, user_message])
+    normalized = json.dumps(params + [
+        normalize_text(system_message),
+        [(role, normalize_text(content)) for role, content in history],
+        normalize_text(user_message)
+    ])
+    return (hashlib.sha256(exact.encode('utf-8')).hexdigest(),
+            hashlib.sha256(normalized.encode('utf-8')).hexdigest())
+
+
+class CompletionCache:
+    """
+    Two-tier cache of chat completions
+    """
+
+    def __init__(self,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_CACHE_TTL,
+                 max_temperature: float = DEFAULT_MAX_TEMPERATURE,
+                 path: Optional[str] = None,
+                 max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+                 prune_interval: int = DEFAULT_PRUNE_INTERVAL):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum completions kept in memory
+            ttl: Seconds a completion stays valid
+            max_temperature: Highest temperature whose completions are cached
+            path: SQLite file of the on-disk tier, or None for memory only
+            max_disk_entries: Maximum completions kept on disk (exceeded by fewer
+                than prune_interval entries between prunes)
+            prune_interval: Stores between checks of the disk tier size
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.prune_interval = max(1, prune_interval)
+        self._stores_until_prune = 0
+
+        # key -> (stored_at, tenant_id, value, saved_seconds)
+        self._memory: 'OrderedDict[str, Tuple[float, Optional[str], str, float]]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        if path:
+            self._open_disk(path)
+
+        self.hits = {'memory': 0, 'disk': 0}
+        self.normalized_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.latency_saved = 0.0
+
+    def _open_disk(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completion_cache (
+                key TEXT PRIMARY KEY,
+                tenant_id TEXT,
+                value TEXT NOT NULL,
+                saved_seconds REAL NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS completion_cache_accessed ON completion_cache (accessed_at)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS completion_cache_tenant ON completion_cache (tenant_id)"
+        )
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """
+        Check whether completions at a temperature may be cached
+
+        Args:
+            temperature: Sampling temperature of the request
+
+        Returns:
+            True if the temperature is at or below the maximum
+        """
+        return temperature <= self.max_temperature
+
+    def _remember(self, key: str, tenant_id: Optional[str], value: str, saved_seconds: float, stored_at: float):
+        """Put an entry in the memory tier, evicting the least recently used"""
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous[2])
+        self._memory[key] = (stored_at, tenant_id, value, saved_seconds)
+        self._memory_bytes += len(value)
+        while len(self._memory) > self.max_entries:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted[2])
+            self.evictions += 1
+
+    def _lookup_key(self, key: str, tenant_id: Optional[str]) -> Optional[Tuple[str, str, float]]:
+        """Find a live entry as (tier, value, saved_seconds)"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            stored_at, _, value, saved_seconds = entry
+            if now - stored_at <= self.ttl:
+                self._memory.move_to_end(key)
+                return 'memory', value, saved_seconds
+            del self._memory[key]
+            self._memory_bytes -= len(value)
+
+        if self._connection is None:
+            return None
+
+        row = self._connection.execute(
+            "SELECT value, saved_seconds, stored_at FROM completion_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, saved_seconds, stored_at = row
+        if now - stored_at > self.ttl:
+            self._connection.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+            return None
+
+        self._connection.execute("UPDATE completion_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        # Promote to memory so the next hit skips the disk
+        self._remember(key, tenant_id, value, saved_seconds, stored_at)
+        return 'disk', value, saved_seconds
+
+    def get(self, keys: Tuple[str, str], tenant_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached completion
+
+        Args:
+            keys: Exact and normalized keys from make_cache_keys()
+            tenant_id: Tenant the completion belongs to
+
+        Returns:
+            The cached response with cache metadata, or None
+        """
+        exact_key, normalized_key = keys
+        with self._lock:
+            found = self._lookup_key(exact_key, tenant_id)
+            normalized = False
+            if found is None and normalized_key != exact_key:
+                found = self._lookup_key(normalized_key, tenant_id)
+                normalized = found is not None
+
+            if found is None:
+                self.misses += 1
+                return None
+
+            tier, value, saved_seconds = found
+            self.hits[tier] += 1
+            if normalized:
+                self.normalized_hits += 1
+            self.latency_saved += saved_seconds
+
+        response = json.loads(value)
+        response.setdefault('metadata', {})['cache'] = {
+            'tier': tier,
+            'normalized': normalized,
+            'saved_seconds': saved_seconds
+        }
+        return response
+
+    def set(self, keys: Tuple[str, str], response: Dict[str, Any], latency: float,
+            tenant_id: Optional[str] = None):
+        """
+        Store a completion
+
+        Error responses are not stored.
+
+        Args:
+            keys: Exact and normalized keys from make_cache_keys()
+            response: Response returned by the AI client
+            latency: Seconds the model call took (reported as saved on hits)
+            tenant_id: Tenant the completion belongs to
+        """
+        if 'error' in response:
+            return
+
+        try:
+            value = json.dumps(response)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Completion is not JSON-serializable, not caching: {str(e)}")
+            return
+
+        now = time.time()
+        with self._lock:
+            self.stores += 1
+            for key in set(keys):
+                self._remember(key, tenant_id, value, latency, now)
+
+            if self._connection is not None:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO completion_cache "
+                    "(key, tenant_id, value, saved_seconds, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(key, tenant_id, value, latency, now, now) for key in set(keys)]
+                )
+                # Counting the table is a full scan, so only check its size now and then
+                self._stores_until_prune -= 1
+                if self._stores_until_prune <= 0:
+                    self._stores_until_prune = self.prune_interval
+                    self._prune_disk()
+
+    async def get_async(self, keys: Tuple[str, str], tenant_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached completion from a coroutine
+
+        A memory-only cache is read directly; with the on-disk tier the
+        lookup runs in a thread.
+
+        Args:
+            keys: Exact and normalized keys from make_cache_keys()
+            tenant_id: Tenant the completion belongs to
+
+        Returns:
+            The cached response with cache metadata, or None
+        """
+        if self._connection is None:
+            return self.get(keys, tenant_id)
+        return await asyncio.to_thread(self.get, keys, tenant_id)
+
+    async def set_async(self, keys: Tuple[str, str], response: Dict[str, Any], latency: float,
+                        tenant_id: Optional[str] = None):
+        """
+        Store a completion from a coroutine
+
+        A memory-only cache is written directly; with the on-disk tier the
+        write runs in a thread.
+
+        Args:
+            keys: Exact and normalized keys from make_cache_keys()
+            response: Response returned by the AI client
+            latency: Seconds the model call took (reported as saved on hits)
+            tenant_id: Tenant the completion belongs to
+        """
+        if self._connection is None:
+            self.set(keys, response, latency, tenant_id)
+        else:
+            await asyncio.to_thread(self.set, keys, response, latency, tenant_id)
+
+    def _prune_disk(self):
+        """Delete the least recently used disk entries over the limit"""
+        count = self._connection.execute("SELECT COUNT(*) FROM completion_cache").fetchone()[0]
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._connection.execute(
+                "DELETE FROM completion_cache WHERE key IN "
+                "(SELECT key FROM completion_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            )
+
+    def record_skip(self):
+        """Count a request that was not cacheable"""
+        self.skipped += 1
+
+    def clear(self, tenant_id: Optional[str] = None):
+        """
+        Remove cached completions, e.g. after a tenant's knowledge base changed
+
+        Args:
+            tenant_id: Tenant whose completions to remove, or None for all
+        """
+        with self._lock:
+            if tenant_id is None:
+                self._memory.clear()
+                self._memory_bytes = 0
+            else:
+                for key in [key for key, entry in self._memory.items() if entry[1] == tenant_id]:
+                    self._memory_bytes -= len(self._memory.pop(key)[2])
+
+            if self._connection is not None:
+                if tenant_id is None:
+                    self._connection.execute("DELETE FROM completion_cache")
+                else:
+                    self._connection.execute("DELETE FROM completion_cache WHERE tenant_id = ?", (tenant_id,))
+
+        logger.info(f"Completion cache cleared{f' for tenant {tenant_id}' if tenant_id else ''}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics
+
+        Returns:
+            Hit rates per tier, sizes in entries and bytes, and model time saved
+        """
+        hits = self.hits['memory'] + self.hits['disk']
+        lookups = hits + self.misses
+        stats = {
+            'hits': hits,
+            'memory_hits': self.hits['memory'],
+            'disk_hits': self.hits['disk'],
+            'normalized_hits': self.normalized_hits,
+            'misses': self.misses,
+            'skipped': self.skipped,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'latency_saved_seconds': self.latency_saved,
+            'ttl': self.ttl,
+            'max_temperature': self.max_temperature
+        }
+        if self._connection is not None:
+            with self._lock:
+                entries, size = self._connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM completion_cache"
+                ).fetchone()
+            stats['disk_entries'] = entries
+            stats['disk_bytes'] = size
+        return stats
+
+    def close(self):
+        """Close the on-disk tier"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+_completion_cache: Optional[CompletionCache] = None
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """
+    Get the shared completion cache
+
+    Configured with the AI_CACHE_BACKEND ('memory', 'sqlite' or 'none'),
+    AI_CACHE_PATH, AI_CACHE_TTL, AI_CACHE_MAX_ENTRIES,
+    AI_CACHE_MAX_DISK_ENTRIES and AI_CACHE_MAX_TEMPERATURE environment variables.
+
+    Returns:
+        The shared cache, or None if caching is disabled
+    """
+    global _completion_cache
+    backend = os.environ.get('AI_CACHE_BACKEND', 'memory')
+    if _completion_cache is None and backend != 'none':
+        path = None
+        if backend == 'sqlite':
+            path = os.environ.get('AI_CACHE_PATH', os.path.join('instance', 'completion_cache.db'))
+        _completion_cache = CompletionCache(path=path)
+        logger.info(f"Initialized {backend} completion cache")
+    return _completion_cache
@@ -0,0 +1,323 @@
+"""
+Prompt Assembler
+
+This module packs a chat prompt into a per-model token budget. The system
+prompt and the current message are always kept; the knowledge snippets with
+the best rank and the most recent conversation history share what is left.
+Older history that no longer fits is dropped or, when a summarizer is
+configured, replaced by a summary appended to the system prompt.
+
+Snippets whose text duplicates an earlier snippet are skipped. Tokens are
+counted with utils.token_counter, which caches counts by content hash, so
+each turn only counts what is new.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from utils.completion_cache import normalize_text
+from utils.token_counter import token_counter as default_token_counter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Prompt token budget per model (the response's max_tokens is not included)
+MODEL_PROMPT_BUDGETS = {
+    'gpt-4o': 8000,
+    'claude-3-5-sonnet-20241022': 8000
+}
+DEFAULT_PROMPT_BUDGET = int(os.environ.get('AI_PROMPT_TOKEN_BUDGET', 4000))
+DEFAULT_KNOWLEDGE_SHARE = float(os.environ.get('AI_PROMPT_KNOWLEDGE_SHARE', 0.5))
+DEFAULT_SUMMARY_CACHE_SIZE = 500  # Summaries of dropped history kept
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators of each message
+SUMMARY_HEADER = "\n\nSummary of the earlier conversation:\n"
+KNOWLEDGE_HEADER = "\n\nRelevant information from knowledge base:\n"
+
+
+def format_knowledge_context(knowledge_items: List[Dict[str, Any]]) -> str:
+    """
+    Format knowledge base snippets for a prompt
+
+    Args:
+        knowledge_items: Knowledge items returned by the knowledge base search
+
+    Returns:
+        The formatted knowledge context, or an empty string without items
+    """
+    if not knowledge_items:
+        return ""
+
+    knowledge_context = KNOWLEDGE_HEADER
+    for idx, item in enumerate(knowledge_items):
+        # Add source information
+        knowledge_context += f"\n[Source {idx+1}: {item.get('file_name', 'unnamed')}]\n"
+        # Add content snippet if available
+        if 'snippet' in item:
+            knowledge_context += f"{item['snippet']}\n"
+    return knowledge_context
+
+
+class AssembledPrompt:
+    """
+    A prompt packed into a token budget
+    """
+
+    __slots__ = ('system_message', 'user_message', 'conversation_history', 'knowledge_items',
+                 'tokens', 'budget', 'dropped_messages', 'dropped_snippets', 'summarized')
+
+    def __init__(self,
+                 system_message: str,
+                 user_message: str,
+                 conversation_history: List[Dict[str, str]],
+                 knowledge_items: List[Dict[str, Any]],
+                 tokens: int,
+                 budget: int,
+                 dropped_messages: int = 0,
+                 dropped_snippets: int = 0,
+                 summarized: bool = False):
+        self.system_message = system_message
+        self.user_message = user_message
+        self.conversation_history = conversation_history
+        self.knowledge_items = knowledge_items
+        self.tokens = tokens
+        self.budget = budget
+        self.dropped_messages = dropped_messages
+        self.dropped_snippets = dropped_snippets
+        self.summarized = summarized
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'tokens': self.tokens,
+            'budget': self.budget,
+            'history_messages': len(self.conversation_history),
+            'knowledge_items': len(self.knowledge_items),
+            'dropped_messages': self.dropped_messages,
+            'dropped_snippets': self.dropped_snippets,
+            'summarized': self.summarized
+        }
+
+
+class PromptAssembler:
+    """
+    Packs system prompt, history and knowledge into a per-model token budget
+    """
+
+    def __init__(self,
+                 budgets: Optional[Dict[str, int]] = None,
+                 default_budget: int = DEFAULT_PROMPT_BUDGET,
+                 knowledge_share: float = DEFAULT_KNOWLEDGE_SHARE,
+                 summarizer: Optional[Callable[[List[Dict[str, str]]], str]] = None,
+                 token_counter: Optional[Callable[[List[str], Optional[str]], List[int]]] = None):
+        """
+        Initialize the assembler
+
+        Args:
+            budgets: Prompt token budget by model name
+            default_budget: Budget of models without their own
+            knowledge_share: Largest share of the free budget given to knowledge snippets
+            summarizer: Function summarizing dropped history messages, or None to drop them
+            token_counter: Function counting the tokens of a list of texts for a model;
+                defaults to the shared cached counter
+        """
+        if not 0 <= knowledge_share <= 1:
+            raise ValueError("knowledge_share must be between 0 and 1")
+
+        self.budgets = dict(MODEL_PROMPT_BUDGETS if budgets is None else budgets)
+        self.default_budget = default_budget
+        self.knowledge_share = knowledge_share
+        self.summarizer = summarizer
+        self.token_counter = token_counter or default_token_counter.count_batch
+        self._summaries: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.assembled = 0
+        self.trimmed = 0
+
+    def get_budget(self, model: Optional[str]) -> int:
+        """
+        Get the prompt token budget of a model
+
+        Args:
+            model: Model name
+
+        Returns:
+            Budget in tokens
+        """
+        return self.budgets.get(model, self.default_budget)
+
+    def count_tokens(self, text: str, model: Optional[str] = None) -> int:
+        """
+        Count the tokens of a text
+
+        Args:
+            text: Text to count
+            model: Model the text is sent to
+
+        Returns:
+            Token count
+        """
+        return self.token_counter([text], model)[0] if text else 0
+
+    def _pack_knowledge(self, knowledge_items: List[Dict[str, Any]], budget: int,
+                        model: Optional[str]) -> Tuple[List[Dict[str, Any]], int, int]:
+        """Take snippets in rank order, skipping duplicates and those over budget"""
+        if not knowledge_items:
+            return [], 0, 0
+
+        seen = set()
+        packed = []
+        used = self.count_tokens(KNOWLEDGE_HEADER, model)
+        dropped = 0
+        for item in knowledge_items:
+            snippet = item.get('snippet', '')
+            fingerprint = normalize_text(snippet)
+            if fingerprint and fingerprint in seen:
+                dropped += 1
+                continue
+            source = f"\n[Source {len(packed) + 1}: {item.get('file_name', 'unnamed')}]\n"
+            tokens = self.count_tokens(source, model) + self.count_tokens(snippet, model)
+            if used + tokens > budget:
+                dropped += 1
+                continue
+            seen.add(fingerprint)
+            packed.append(item)
+            used += tokens
+
+        if not packed:
+            return [], 0, dropped
+        return packed, used, dropped
+
+    def _summarize(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """Summarize dropped history, reusing the summary of the same messages"""
+        digest = hashlib.sha256()
+        for message in messages:
+            digest.update(message.get('role', 'user').encode('utf-8'))
+            digest.update(b'\0')
+            digest.update(message.get('content', '').encode('utf-8'))
+            digest.update(b'\0')
+        key = digest.hexdigest()
+
+        with self._lock:
+            summary = self._summaries.get(key)
+        if summary is not None:
+            return summary
+
+        try:
+            summary = self.summarizer(messages)
+        except Exception as e:
+            logger.warning(f"Could not summarize conversation history: {str(e)}")
+            return None
+
+        with self._lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > DEFAULT_SUMMARY_CACHE_SIZE:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def assemble(self,
+                 system_message: str,
+                 user_message: str,
+                 conversation_history: Optional[List[Dict[str, str]]] = None,
+                 knowledge_items: Optional[List[Dict[str, Any]]] = None,
+                 model: Optional[str] = None,
+                 budget: Optional[int] = None) -> AssembledPrompt:
+        """
+        Pack a prompt into the model's token budget
+
+        Args:
+            system_message: System prompt (always kept)
+            user_message: Current user message (always kept)
+            conversation_history: Previous conversation messages, oldest first
+            knowledge_items: Knowledge items in rank order
+            model: Model the prompt is sent to
+            budget: Token budget overriding the model's
+
+        Returns:
+            The assembled prompt
+        """
+        history = conversation_history or []
+        budget = self.get_budget(model) if budget is None else budget
+
+        # Count the prompt and the whole history in one batch (mostly cache hits)
+        counts = self.token_counter(
+            [system_message, user_message] + [message.get('content', '') for message in history], model
+        )
+        message_tokens = [count + MESSAGE_OVERHEAD_TOKENS for count in counts[2:]]
+        fixed = counts[0] + counts[1] + 2 * MESSAGE_OVERHEAD_TOKENS
+        free = max(0, budget - fixed)
+
+        knowledge, knowledge_tokens, dropped_snippets = self._pack_knowledge(
+            knowledge_items or [], int(free * self.knowledge_share), model
+        )
+        free -= knowledge_tokens
+
+        # Keep the most recent history that fits
+        start = len(history)
+        history_tokens = 0
+        while start > 0 and history_tokens + message_tokens[start - 1] <= free:
+            start -= 1
+            history_tokens += message_tokens[start]
+        dropped = history[:start]
+
+        summarized = False
+        if dropped and self.summarizer is not None:
+            summary = self._summarize(dropped)
+            if summary:
+                summary_tokens = self.count_tokens(SUMMARY_HEADER + summary, model)
+                # Make room for the summary by dropping more of the oldest kept history
+                trimmed_start, trimmed_tokens = start, history_tokens
+                while trimmed_start < len(history) and trimmed_tokens + summary_tokens > free:
+                    trimmed_tokens -= message_tokens[trimmed_start]
+                    trimmed_start += 1
+                if trimmed_tokens + summary_tokens <= free:
+                    start, history_tokens = trimmed_start, trimmed_tokens
+                    system_message = f"{system_message}{SUMMARY_HEADER}{summary}"
+                    fixed += summary_tokens
+                    summarized = True
+
+        if knowledge:
+            user_message = f"{user_message}\n{format_knowledge_context(knowledge)}"
+
+        recent = history[start:]
+        dropped_messages = start
+        with self._lock:
+            self.assembled += 1
+            if dropped_messages or dropped_snippets:
+                self.trimmed += 1
+
+        if dropped_messages:
+            logger.debug(f"Prompt for {model} trimmed to {len(recent)} of {len(history)} history messages")
+
+        return AssembledPrompt(
+            system_message=system_message,
+            user_message=user_message,
+            conversation_history=recent,
+            knowledge_items=knowledge,
+            tokens=fixed + knowledge_tokens + history_tokens,
+            budget=budget,
+            dropped_messages=dropped_messages,
+            dropped_snippets=dropped_snippets,
+            summarized=summarized
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get assembler statistics
+
+        Returns:
+            Prompts assembled and trimmed, and summaries cached
+        """
+        return {
+            'assembled': self.assembled,
+            'trimmed': self.trimmed,
+            'summaries_cached': len(self._summaries)
+        }
+
+
+# Global prompt assembler instance
+prompt_assembler = PromptAssembler()
@@ -0,0 +1,304 @@
+"""
+Token Counting Engine
+
+This module counts prompt tokens for the AI providers. It uses the tiktoken
+BPE tokenizer when it is installed and falls back to a single-pass estimate
+otherwise. Counts are cached by a hash of the text, so a conversation resent
+on every turn is only counted for its new messages, and lists of texts are
+counted in one batch call.
+"""
+
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    # Handle case where tiktoken is not installed
+    tiktoken = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Token counter configuration
+DEFAULT_CACHE_SIZE = int(os.environ.get('AI_TOKEN_COUNT_CACHE_SIZE', 50000))  # Texts whose counts are kept
+USE_BPE = os.environ.get('AI_TOKEN_COUNT_BPE', 'true').lower() == 'true'
+BATCH_THREADS = 4  # Threads tiktoken uses for batch encoding
+
+DEFAULT_ENCODING = 'o200k_base'
+CLAUDE_ENCODING = 'cl100k_base'  # Anthropic has no local tokenizer; closest public BPE
+CLAUDE_TOKEN_FACTOR = 1.1  # Claude uses about 10% more tokens than GPT
+
+# Same ratios as utils.token_estimation.TOKEN_MULTIPLIERS for English
+WORD_TOKEN_MULTIPLIER = 1.3
+
+_WORDS = re.compile(r'\w+')
+
+
+def is_claude_model(model: Optional[str]) -> bool:
+    """
+    Check whether a model is an Anthropic model
+
+    Args:
+        model: Model name
+
+    Returns:
+        True for Claude models
+    """
+    return bool(model) and 'claude' in model.lower()
+
+
+def estimate_token_count(text: str, multiplier: float = WORD_TOKEN_MULTIPLIER, claude: bool = False) -> int:
+    """
+    Estimate the tokens of a text without a tokenizer, in a single regex pass
+
+    About `multiplier` tokens per word plus one per two special characters.
+    Special characters are the non-whitespace characters outside words, so
+    they are counted from lengths instead of a second regex.
+
+    Args:
+        text: Input text
+        multiplier: Tokens per word
+        claude: Whether to count for a Claude model (10% more per word)
+
+    Returns:
+        Estimated token count (at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+    word_list = _WORDS.findall(text)
+    words = len(word_list)
+    special_chars = len("".join(text.split())) - sum(map(len, word_list))
+    if claude:
+        tokens = int(words * multiplier * CLAUDE_TOKEN_FACTOR)
+    else:
+        tokens = int(words * multiplier)
+    return max(1, tokens + special_chars // 2)
+
+
+class TokenCounter:
+    """
+    Cached, batched token counter
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE, use_bpe: bool = USE_BPE):
+        """
+        Initialize the counter
+
+        Args:
+            cache_size: Number of texts whose counts are cached
+            use_bpe: Whether to use tiktoken when it is installed
+        """
+        if cache_size < 1:
+            raise ValueError("cache_size must be at least 1")
+
+        self.cache_size = cache_size
+        self.use_bpe = use_bpe and tiktoken is not None
+        self._encodings: Dict[str, Any] = {}
+        # (method, text length, text hash) -> token count
+        self._cache: 'OrderedDict[Tuple[str, int, int], int]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _encoding(self, model: Optional[str]) -> Optional[Any]:
+        """Get the BPE encoding of a model, or None to estimate"""
+        if not self.use_bpe:
+            return None
+        name = model or ''
+        encoding = self._encodings.get(name)
+        if encoding is None:
+            try:
+                if is_claude_model(model):
+                    encoding = tiktoken.get_encoding(CLAUDE_ENCODING)
+                else:
+                    try:
+                        encoding = tiktoken.encoding_for_model(name)
+                    except KeyError:
+                        encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception as e:
+                # Encodings are downloaded on first use; estimate if that fails
+                logger.warning(f"Could not load tokenizer for {model}, estimating tokens: {str(e)}")
+                self.use_bpe = False
+                return None
+            self._encodings[name] = encoding
+        return encoding
+
+    def _method(self, model: Optional[str]) -> Tuple[str, Optional[Any]]:
+        """Cache namespace and encoding used for a model"""
+        encoding = self._encoding(model)
+        claude = is_claude_model(model)
+        if encoding is None:
+            return ('estimate-claude' if claude else 'estimate'), None
+        return (f"{encoding.name}-claude" if claude else encoding.name), encoding
+
+    def _count_uncached(self, texts: List[str], model: Optional[str], encoding: Optional[Any]) -> List[int]:
+        claude = is_claude_model(model)
+        if encoding is None:
+            return [estimate_token_count(text, claude=claude) for text in texts]
+
+        if len(texts) == 1:
+            lengths = [len(encoding.encode_ordinary(texts[0]))]
+        else:
+            lengths = [len(tokens) for tokens in encoding.encode_ordinary_batch(texts, num_threads=BATCH_THREADS)]
+        if claude:
+            return [int(round(length * CLAUDE_TOKEN_FACTOR)) for length in lengths]
+        return lengths
+
+    def count_batch(self, texts: List[str], model: Optional[str] = None) -> List[int]:
+        """
+        Count the tokens of several texts in one call
+
+        Cached texts are not counted again; the others are encoded together.
+
+        Args:
+            texts: Texts to count
+            model: Model the texts are sent to
+
+        Returns:
+            Token counts in the order of the texts
+        """
+        method, encoding = self._method(model)
+        counts: List[Optional[int]] = [None] * len(texts)
+        missing: Dict[Tuple[str, int, int], List[int]] = {}
+        # Strings cache their hash, so messages resent every turn are not rehashed
+        keys = [(method, len(text), hash(text)) if text else None for text in texts]
+
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key is None:
+                    counts[index] = 0
+                    continue
+                count = self._cache.get(key)
+                if count is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    counts[index] = count
+                else:
+                    missing.setdefault(key, []).append(index)
+
+        if missing:
+            new_keys = list(missing)
+            new_counts = self._count_uncached([texts[missing[key][0]] for key in new_keys], model, encoding)
+            with self._lock:
+                self.misses += len(new_keys)
+                for key, count in zip(new_keys, new_counts):
+                    for index in missing[key]:
+                        counts[index] = count
+                    self._cache[key] = count
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return counts
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """
+        Count the tokens of a text
+
+        Args:
+            text: Text to count
+            model: Model the text is sent to
+
+        Returns:
+            Token count
+        """
+        return self.count_batch([text], model)[0]
+
+    def count_messages(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+        """
+        Count the prompt tokens of a chat request
+
+        Text parts of all messages are counted in one batch; images use the
+        same flat estimates as utils.token_estimation.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            model: Model the messages are sent to
+
+        Returns:
+            Token count including per-message overhead
+        """
+        claude = is_claude_model(model)
+        texts = []
+        token_count = 5 if claude else 3
+
+        for message in messages:
+            if not claude:
+                # Each message has a base cost of 4 tokens for message format
+                token_count += 4 + len(message.get('name', ''))
+            token_count += len(message.get('role', ''))
+
+            content = message.get('content')
+            if isinstance(content, str):
+                texts.append(content)
+            elif isinstance(content, list):
+                for content_item in content:
+                    if not isinstance(content_item, dict):
+                        continue
+                    if content_item.get('type') == 'text':
+                        texts.append(content_item.get('text', ''))
+                    elif content_item.get('type') == 'image_url' and not claude:
+                        token_count += 1000  # ~1000 tokens per image
+                    elif content_item.get('type') == 'image' and claude:
+                        token_count += 1200  # ~1200 tokens per typical image
+
+        return token_count + sum(self.count_batch(texts, model))
+
+    def clear(self):
+        """Drop all cached counts"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get counter statistics
+
+        Returns:
+            Tokenizer in use, cache size and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'tokenizer': 'tiktoken' if self.use_bpe else 'estimate',
+            'cache_entries': len(self._cache),
+            'cache_size': self.cache_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global token counter instance
+token_counter = TokenCounter()
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of a text with the global counter
+
+    Args:
+        text: Text to count
+        model: Model the text is sent to
+
+    Returns:
+        Token count
+    """
+    return token_counter.count(text, model)
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+    """
+    Count the prompt tokens of a chat request with the global counter
+
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+        model: Model the messages are sent to
+
+    Returns:
+        Token count
+    """
+    return token_counter.count_messages(messages, model)
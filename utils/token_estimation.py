@@ -4,9 +4,10 @@ Token Estimation Utilities
 This module provides functions for estimating token counts for different models.
 """
 
-import re
 import logging
 
+from utils.token_counter import estimate_token_count, token_counter
+
 logger = logging.getLogger(__name__)
 
 # Average token counts per word for different languages
@@ -35,30 +36,17 @@ def estimate_tokens(text, model_type='gpt', language='english'):
     
     multiplier = TOKEN_MULTIPLIERS.get(language.lower(), TOKEN_MULTIPLIERS['default'])
     
-    # For accurate results, we would use tiktoken or a similar library
-    # This is a simplified estimate based on words and characters
-    words = len(re.findall(r'\b\w+\b', text))
-    chars = len(text)
-    
-    # Adjust based on model type
-    if model_type.lower() == 'claude':
-        # Claude tokenization is slightly different
-        tokens = int(words * multiplier * 1.1)  # 10% more tokens than GPT on average
-    else:
-        # GPT and other models
-        tokens = int(words * multiplier)
-    
-    # Add a factor for punctuation and special characters
-    special_chars = len(re.findall(r'[^\w\s]', text))
-    tokens += special_chars // 2  # Every ~2 special chars is about 1 token
-    
-    # Minimum token count should be at least 1
-    return max(1, tokens)
+    # Words and special characters are counted in a single pass; use
+    # utils.token_counter for tokenizer-accurate, cached counts
+    return estimate_token_count(text, multiplier, claude=model_type.lower() == 'claude')
 
 def calculate_openai_tokens(messages, model="gpt-4o"):
     """
     Calculate the approximate token count for a series of OpenAI messages
     
+    Message texts are counted in one batch and cached, so resending a
+    conversation only counts its new messages.
+    
     Args:
         messages: List of message dictionaries with 'role' and 'content'
         model: OpenAI model name
@@ -66,42 +54,15 @@ def calculate_openai_tokens(messages, model="gpt-4o"):
     Returns:
         int: Estimated token count
     """
-    # Base token count for the messages format
-    token_count = 3  # Every OpenAI API call starts with 3 tokens
-    
-    for message in messages:
-        # Each message has a base cost of 4 tokens for message format
-        token_count += 4
-        
-        # Add tokens for content
-        if 'content' in message:
-            if isinstance(message['content'], str):
-                token_count += estimate_tokens(message['content'], 'gpt')
-            elif isinstance(message['content'], list):
-                # Handle multimodal messages
-                for content_item in message['content']:
-                    if isinstance(content_item, dict):
-                        if content_item.get('type') == 'text':
-                            token_count += estimate_tokens(content_item.get('text', ''), 'gpt')
-                        elif content_item.get('type') == 'image_url':
-                            # Images cost tokens based on size and resolution
-                            # This is a rough estimate for a typical image
-                            token_count += 1000  # ~1000 tokens per image
-        
-        # Add tokens for role
-        if 'role' in message:
-            token_count += len(message['role'])
-        
-        # Add tokens for name if present
-        if 'name' in message:
-            token_count += len(message['name'])
-    
-    return token_count
+    return token_counter.count_messages(messages, model)
 
 def calculate_anthropic_tokens(messages, model="claude-3-5-sonnet-20241022"):
     """
     Calculate the approximate token count for an Anthropic messages API call
     
+    Message texts are counted in one batch and cached, so resending a
+    conversation only counts its new messages.
+    
     Args:
         messages: List of message dictionaries with 'role' and 'content'
         model: Anthropic model name
@@ -109,30 +70,7 @@ def calculate_anthropic_tokens(messages, model="claude-3-5-sonnet-20241022"):
     Returns:
         int: Estimated token count
     """
-    # Base token count
-    token_count = 5  # Anthropic has a slightly different base cost
-    
-    for message in messages:
-        # Add tokens for content
-        if 'content' in message:
-            if isinstance(message['content'], str):
-                token_count += estimate_tokens(message['content'], 'claude')
-            elif isinstance(message['content'], list):
-                # Handle multimodal messages
-                for content_item in message['content']:
-                    if isinstance(content_item, dict):
-                        if content_item.get('type') == 'text':
-                            token_count += estimate_tokens(content_item.get('text', ''), 'claude')
-                        elif content_item.get('type') == 'image':
-                            # Images cost tokens based on size
-                            # Claude charges based on resolution tiers
-                            token_count += 1200  # ~1200 tokens per typical image
-        
-        # Add tokens for role
-        if 'role' in message:
-            token_count += len(message['role'])
-    
-    return token_count
+    return token_counter.count_messages(messages, model)
 
 def optimize_image_for_tokens(width, height, max_tokens=1000):
     """